@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+自定义动作参数层
+每个动作声明自己的参数结构（ParamSchema），参数字符串解析、校验、默认值填充和
+类型转换只做一次，结果放在有界 LRU 缓存中；启动时可预先校验资源包中的全部参数
+"""
+
+import hashlib
+import json
+import logging
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 参数缓存容量（不同参数字符串的数量）
+PARAM_CACHE_SIZE = 256
+
+# 必填字段的默认值占位
+REQUIRED = object()
+
+
+class ParamError(ValueError):
+    """动作参数错误"""
+    pass
+
+
+class Field:
+    """
+    参数字段声明
+
+    Args:
+        name: 字段名
+        kind: 期望类型（float 同时接受整数；可以是类型元组）
+        default: 默认值，REQUIRED 表示必填
+        aliases: 兼容的旧字段名
+        choices: 允许的取值
+        check: 额外校验函数，返回 False 时报错
+        convert: 转换函数（如按键名称 -> 虚拟键码），抛出 ValueError 时报错
+        dest: 转换结果的字段名，默认覆盖原字段
+    """
+
+    def __init__(
+        self,
+        name: str,
+        kind: Union[type, Tuple[type, ...]],
+        default: Any = REQUIRED,
+        aliases: Tuple[str, ...] = (),
+        choices: Optional[Iterable] = None,
+        check: Optional[Callable[[Any], bool]] = None,
+        convert: Optional[Callable[[Any], Any]] = None,
+        dest: Optional[str] = None,
+    ):
+        self.name = name
+        self.kinds = kind if isinstance(kind, tuple) else (kind,)
+        self.default = default
+        self.aliases = aliases
+        self.choices = None if choices is None else frozenset(choices)
+        self.check = check
+        self.convert = convert
+        self.dest = dest or name
+
+    def _type_ok(self, value) -> bool:
+        # bool 是 int 的子类，需要单独排除
+        if isinstance(value, bool) and bool not in self.kinds:
+            return False
+        if float in self.kinds and isinstance(value, int):
+            return True
+        return isinstance(value, self.kinds)
+
+    def apply(self, raw: dict, out: dict):
+        """从原始参数中取值、校验并写入 out"""
+        value = raw.get(self.name, REQUIRED)
+        for alias in self.aliases:
+            if value is REQUIRED:
+                value = raw.get(alias, REQUIRED)
+
+        if value is REQUIRED:
+            if self.default is REQUIRED:
+                raise ParamError(f"缺少参数 '{self.name}'")
+            value = self.default
+
+        if not self._type_ok(value):
+            expected = "/".join(kind.__name__ for kind in self.kinds)
+            raise ParamError(f"参数 '{self.name}' 类型错误: 期望 {expected}，实际 {type(value).__name__} ({value!r})")
+        if self.choices is not None and value not in self.choices:
+            raise ParamError(f"参数 '{self.name}' 取值无效: {value!r}，仅支持 {sorted(self.choices)}")
+        if self.check is not None and not self.check(value):
+            raise ParamError(f"参数 '{self.name}' 取值无效: {value!r}")
+
+        if isinstance(value, list):
+            value = tuple(value)
+        out[self.name] = value
+
+        if self.convert is not None:
+            try:
+                out[self.dest] = self.convert(value)
+            except (ValueError, TypeError, KeyError) as e:
+                raise ParamError(f"参数 '{self.name}' 无法转换: {e}") from e
+
+
+# 已声明的参数结构：动作名称 -> ParamSchema
+_SCHEMAS: Dict[str, "ParamSchema"] = {}
+
+
+class ParamSchema:
+    """
+    动作参数结构
+    创建时按动作名称注册，供运行时解析和启动时预校验使用
+    """
+
+    def __init__(self, action_name: str, *fields: Field):
+        self.action_name = action_name
+        self.fields = fields
+        self._known = {name for field in fields for name in (field.name, *field.aliases)}
+        _SCHEMAS[action_name] = self
+
+    def validate(self, raw: Any) -> Mapping[str, Any]:
+        """
+        校验已解码的参数字典
+
+        Returns:
+            只读的参数映射（已填充默认值并完成类型转换）
+        """
+        if raw is None:
+            raw = {}
+        if not isinstance(raw, dict):
+            raise ParamError(f"参数必须是 JSON 对象，实际为 {type(raw).__name__}")
+
+        unknown = set(raw) - self._known
+        if unknown:
+            raise ParamError(f"未知参数: {sorted(unknown)}")
+
+        out = {}
+        for field in self.fields:
+            field.apply(raw, out)
+        return MappingProxyType(out)
+
+    def parse(self, raw: Union[str, dict, None]) -> Mapping[str, Any]:
+        """
+        解析动作参数（custom_action_param）
+
+        字符串参数按内容缓存，相同的参数字符串只解析、校验一次
+
+        Raises:
+            ParamError: 参数无效
+        """
+        if isinstance(raw, str):
+            return _parse_cached(self.action_name, raw)
+        return self.validate(raw)
+
+
+@lru_cache(maxsize=PARAM_CACHE_SIZE)
+def _parse_cached(action_name: str, raw: str) -> Mapping[str, Any]:
+    try:
+        decoded = json.loads(raw) if raw.strip() else {}
+    except json.JSONDecodeError as e:
+        raise ParamError(f"JSON 解析失败: {e}") from e
+    return _SCHEMAS[action_name].validate(decoded)
+
+
+def get_schema(action_name: str) -> Optional[ParamSchema]:
+    """获取动作的参数结构，未声明时返回 None"""
+    return _SCHEMAS.get(action_name)
+
+
+def cache_info():
+    """参数缓存的命中统计"""
+    return _parse_cached.cache_info()
+
+
+def _iter_custom_params(resource_dir: Path):
+    """遍历资源包中所有自定义动作/识别节点，产出 (来源, 动作或识别名称, 参数, 节点名)"""
+    for path in sorted((resource_dir / "pipeline").rglob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            nodes = json.load(f)
+        for node_name, node in nodes.items():
+            if not isinstance(node, dict):
+                continue
+            source = f"{path.relative_to(resource_dir)}:{node_name}"
+            if node.get("custom_recognition"):
+                yield source, node["custom_recognition"], node.get("custom_recognition_param", {}), None
+            if node.get("custom_action"):
+                yield source, node["custom_action"], node.get("custom_action_param", {}), node_name
+
+
+def bundle_fingerprint(resource_dirs: Iterable[Path], interface_path: Optional[Path],
+                       code_files: Iterable[Path]) -> str:
+    """
+    预校验结果的指纹：pipeline 文件、interface.json 和声明参数结构的代码文件的路径、大小和修改时间摘要
+    （只读取文件状态，不读取内容）
+    """
+    paths = []
+    for resource_dir in resource_dirs:
+        paths.extend(sorted((resource_dir / "pipeline").rglob("*.json")))
+    if interface_path and interface_path.exists():
+        paths.append(interface_path)
+    paths.extend(code_files)
+
+    digest = hashlib.sha1()
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prevalidate_bundle(resource_dirs: Iterable[Path], interface_path: Optional[Path] = None) -> List[str]:
+    """
+    预先校验资源包中全部自定义动作和自定义识别参数（包括 interface.json 选项中的覆盖参数），
+    并预热参数缓存
+
+    Args:
+        resource_dirs: 资源包目录列表
+        interface_path: interface.json 路径（可选）
+
+    Returns:
+        错误信息列表，为空表示全部通过
+    """
+    errors = []
+    checked = 0
+    node_actions = {}
+
+    for resource_dir in resource_dirs:
+        try:
+            entries = list(_iter_custom_params(resource_dir))
+        except (OSError, json.JSONDecodeError) as e:
+            errors.append(f"{resource_dir}: 读取 pipeline 失败: {e}")
+            continue
+
+        for source, action_name, param, node_name in entries:
+            if node_name is not None:
+                node_actions[node_name] = action_name
+            schema = get_schema(action_name)
+            if schema is None:
+                logger.warning(f"[ActionParams] {source}: 动作 '{action_name}' 未声明参数结构，跳过校验")
+                continue
+            checked += 1
+            try:
+                schema.parse(param if isinstance(param, str) else json.dumps(param, ensure_ascii=False))
+            except ParamError as e:
+                errors.append(f"{source} ({action_name}): {e}")
+
+    interface = {}
+    if interface_path and interface_path.exists():
+        try:
+            with open(interface_path, "r", encoding="utf-8") as f:
+                interface = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            errors.append(f"{interface_path}: 读取失败: {e}")
+
+    if interface:
+        for option_name, option in interface.get("option", {}).items():
+            for case in option.get("cases", []):
+                for node_name, override in case.get("pipeline_override", {}).items():
+                    action_name = override.get("custom_action") or node_actions.get(node_name)
+                    schema = get_schema(action_name) if action_name else None
+                    if schema is None or "custom_action_param" not in override:
+                        continue
+                    checked += 1
+                    try:
+                        schema.validate(override["custom_action_param"])
+                    except ParamError as e:
+                        errors.append(f"interface.json 选项 '{option_name}/{case.get('name')}' -> {node_name}: {e}")
+
+    logger.info(f"[ActionParams] 已预校验 {checked} 组动作参数，错误 {len(errors)} 个")
+    return errors
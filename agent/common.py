@@ -8,15 +8,216 @@ from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 import time
+import threading
 import logging
-import json
 import os
 from datetime import datetime
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+from action_params import ParamSchema, Field, ParamError
+from frame_gate import FrameGate
+from frame_access import FrameReader
+from roi_cache import get_roi_cache
+from ocr_index import get_ocr_index
+from runtime_config import get_runtime_config
+from held_keys import release_held_keys
+import tracing
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
 
 
+# wait_for 的自适应轮询间隔（秒）：输入后界面通常很快变化，先密集轮询，随后逐渐放宽，
+# 超出列表长度后保持最后一个间隔
+WAIT_BACKOFF_SCHEDULE = (0.05, 0.05, 0.1, 0.1, 0.2, 0.3, 0.5)
+
+# wait_for_any 的文字目标都已学习到 ROI 时，开始后这段时间内只在 ROI 内识别，不做全屏 OCR（秒）
+ROI_ONLY_PERIOD = 1.0
+
+
+def is_hit(reco_result) -> bool:
+    """识别结果是否命中（box 不为 None 且宽高大于 0）"""
+    return bool(reco_result and reco_result.box and reco_result.box.w > 0 and reco_result.box.h > 0)
+
+
+class WaitTarget(NamedTuple):
+    """
+    wait_for_any 的等待目标：文字（通过 OCR 索引查询）或识别节点。
+    文字目标可以同时指定对应的 OCR 节点，learn_roi 时先用该节点在学习到的 ROI 内识别
+    """
+    label: str                                  # 描述（用于日志）
+    pattern: Optional[str] = None               # 文字正则
+    node: Optional[str] = None                  # 识别节点（文字目标为对应的 OCR 节点，可选）
+    pipeline_override: Optional[Dict] = None    # 识别节点的 pipeline 覆盖
+
+
+def _poll(
+    context: Context,
+    name: str,
+    check: Callable,
+    timeout: float,
+    schedule: Sequence[float],
+    frame_gate: Optional[FrameGate],
+):
+    """
+    轮询引擎：每次轮询截一次图，画面有变化时调用 check(image)，返回非 None 结果即结束
+
+    Returns:
+        check 的结果，超时返回 None
+    """
+    # 复用同一个图像缓冲区，每次轮询借用截图数据而不是拷贝整帧
+    reader = FrameReader(context.tasker.controller)
+    start_time = time.perf_counter()
+    deadline = start_time + timeout
+    gate = frame_gate or FrameGate()
+    polls = 0
+
+    while True:
+        polls += 1
+        image = reader.capture()
+        result = check(image) if gate.should_recognize(image) else None
+
+        now = time.perf_counter()
+        if result is not None:
+            logger.info(f"[wait_for] [OK] '{name}' 命中: 轮询 {polls} 次（{gate.summary()}），"
+                        f"用时 {int((now - start_time) * 1000)}ms")
+            return result
+
+        if now >= deadline:
+            logger.warning(f"[wait_for] [X] '{name}' 超时 {int(timeout * 1000)}ms，"
+                           f"共轮询 {polls} 次（{gate.summary()}）")
+            return None
+
+        interval = schedule[min(polls - 1, len(schedule) - 1)]
+        tracing.sleep(min(interval, deadline - now), "poll_interval")
+
+
+def wait_for(
+    context: Context,
+    node: str,
+    timeout: float,
+    pipeline_override: Optional[Dict] = None,
+    schedule: Sequence[float] = WAIT_BACKOFF_SCHEDULE,
+    frame_gate: Optional[FrameGate] = None,
+    learn_roi: bool = False,
+):
+    """
+    等待节点识别命中
+
+    每次轮询只截一次图并识别一次，命中立即返回；未命中时按 schedule 自适应等待后重试。
+    画面与上一次识别时相比没有明显变化时跳过识别，沿用上一次的未命中结果
+
+    Args:
+        context: 上下文
+        node: 要识别的节点名称
+        timeout: 超时时间（秒）
+        pipeline_override: 识别时使用的 pipeline 覆盖（可选）
+        schedule: 轮询间隔序列（秒）
+        frame_gate: 帧变化门控，默认每次调用新建一个
+        learn_roi: 是否使用自学习 ROI（先在学习到的 ROI 内识别，未命中再全屏识别）
+
+    Returns:
+        命中时返回识别结果，超时返回 None
+    """
+    override = pipeline_override or {}
+
+    def check(image):
+        if learn_roi:
+            reco_result = get_roi_cache().recognize(context, node, node, image, override)
+        else:
+            with tracing.span("run_recognition", "recognition", node=node):
+                reco_result = context.run_recognition(node, image, override)
+        return reco_result if is_hit(reco_result) else None
+
+    return _poll(context, node, check, timeout, schedule, frame_gate)
+
+
+def wait_for_any(
+    context: Context,
+    targets: Sequence[WaitTarget],
+    timeout: float,
+    schedule: Sequence[float] = WAIT_BACKOFF_SCHEDULE,
+    frame_gate: Optional[FrameGate] = None,
+    learn_roi: bool = False,
+) -> Optional[Tuple[int, Tuple[int, int, int, int]]]:
+    """
+    等待多个目标中的任意一个出现
+
+    文字目标共用 OCR 索引：同一画面只做一次全屏 OCR，所有文字目标都从索引中查询。
+    learn_roi 时指定了 OCR 节点的文字目标先在该节点学习到的 ROI 内识别，未命中才查询 OCR 索引，
+    命中框同样用于学习 ROI；所有文字目标都已学习到 ROI 时，前 ROI_ONLY_PERIOD 秒内不做全屏 OCR，
+    这段时间内的未命中只是部分结果，不交给帧变化门控沿用，时间一到下一次轮询就做全屏 OCR。
+    每次轮询按 targets 的顺序检查，返回第一个命中的目标
+
+    Returns:
+        (目标序号, (x, y, w, h))，超时返回 None
+    """
+    ocr_index = get_ocr_index()
+    roi_cache = get_roi_cache()
+    gate = frame_gate or FrameGate()
+    has_text = any(target.pattern for target in targets)
+    start_time = time.perf_counter()
+    index_after = None   # 首次轮询时确定：这个时刻之后才允许全屏 OCR
+
+    def check(image):
+        nonlocal index_after
+        frame_size = (image.shape[1], image.shape[0])
+        if index_after is None:
+            all_learned = learn_roi and all(
+                target.node and roi_cache.learned_roi(target.node, frame_size) is not None
+                for target in targets if target.pattern
+            )
+            index_after = start_time + ROI_ONLY_PERIOD if all_learned else start_time
+        use_index = has_text and time.perf_counter() >= index_after
+        index_elapsed = None
+
+        # 先在学习到的 ROI 内识别所有文字目标，都未命中时才需要全屏 OCR
+        if learn_roi:
+            for index, target in enumerate(targets):
+                if target.pattern and target.node:
+                    reco_result = roi_cache.recognize_in_roi(context, target.node, target.node, image)
+                    if reco_result is not None:
+                        box = reco_result.box
+                        return index, (box.x, box.y, box.w, box.h)
+
+        for index, target in enumerate(targets):
+            if target.pattern:
+                if not use_index:
+                    continue
+                if index_elapsed is None:
+                    # 画面未变化、沿用已有索引时耗时记为 0，不计入全屏识别统计
+                    begin = time.perf_counter()
+                    ran = ocr_index.update(context, image)
+                    index_elapsed = time.perf_counter() - begin if ran else 0.0
+                entry = ocr_index.find(target.pattern)
+                if learn_roi and target.node:
+                    roi_cache.record_full_run(target.node, frame_size, index_elapsed,
+                                              entry.box if entry else None)
+                if entry is not None:
+                    return index, entry.box
+                continue
+
+            override = target.pipeline_override or {}
+            if learn_roi:
+                reco_result = roi_cache.recognize(context, target.node, target.node, image, override)
+            else:
+                with tracing.span("run_recognition", "recognition", node=target.node):
+                    reco_result = context.run_recognition(target.node, image, override)
+            if is_hit(reco_result):
+                box = reco_result.box
+                return index, (box.x, box.y, box.w, box.h)
+
+        if has_text and not use_index:
+            # 只在 ROI 内识别过的画面还没做全屏 OCR，清除签名，同一画面下次轮询仍需识别
+            gate.reset()
+        return None
+
+    name = " | ".join(target.label for target in targets)
+    result = _poll(context, name, check, timeout, schedule, gate)
+    if has_text:
+        logger.info(f"[wait_for] OCR 索引: {ocr_index.summary()}")
+    return result
+
+
 @AgentServer.custom_action("ResetCharacterPosition")
 class ResetCharacterPosition(CustomAction):
     """
@@ -29,64 +230,105 @@ class ResetCharacterPosition(CustomAction):
     4. OCR 识别并点击"复位角色"
     5. OCR 识别并点击"确定"
     
+    每一步都等待菜单出现后立即点击，不再固定等待；文字步骤先在各自 OCR 节点学习到的 ROI 内识别，
+    未命中时共用每帧一次的 OCR 索引，"复位角色"已经可见时直接跳过"设置"/"其他"两步
+    
     参数示例：
     {
         "template_path": "common/其他.png",  // 模板图片路径（可选，默认为"common/其他.png"）
-        "wait_delay": 500,                   // 每步操作后的等待时间（毫秒，可选，默认500ms）
-        "retry_times": 10,                   // 识别重试次数（可选，默认10次）
-        "retry_interval": 500                // 重试间隔（毫秒，可选，默认500ms）
+        "wait_delay": 500,                   // 点击"确定"后等待复位生效的时间（毫秒，可选，默认500ms）
+        "retry_times": 10,                   // 每步最长等待 retry_times * retry_interval（可选，默认10次）
+        "retry_interval": 500                // （毫秒，可选，默认500ms）
     }
     """
 
+    PARAM_SCHEMA = ParamSchema(
+        "ResetCharacterPosition",
+        Field("template_path", str, "common/其他.png"),
+        Field("wait_delay", int, 500, check=lambda v: v >= 0),
+        Field("retry_times", int, 10, check=lambda v: v >= 1),
+        Field("retry_interval", int, 500, check=lambda v: v >= 0),
+    )
+
+    # ESC 键的虚拟键码
+    VK_ESCAPE = 27
+
+    # 可以提前跳转到的步骤（"复位角色"，步骤列表中的序号）
+    LOOKAHEAD_STEP = 2
+
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
+        # 复位前松开上一个移动动作保持的按键
+        release_held_keys("角色复位")
         try:
-            # 解析参数
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                params = {}
+            # 解析参数（按参数字符串缓存）
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
             
             # 获取参数
-            template_path = params.get("template_path", "common/其他.png")
-            wait_delay = params.get("wait_delay", 500)  # 默认每步等待 500ms
-            retry_times = params.get("retry_times", 10)  # 默认重试 10 次
-            retry_interval = params.get("retry_interval", 500)  # 默认重试间隔 500ms
+            template_path = params["template_path"]
+            wait_delay = params["wait_delay"]
+            retry_times = params["retry_times"]
+            retry_interval = params["retry_interval"]
+            step_timeout = retry_times * retry_interval / 1000.0
             
             logger.info("=" * 60)
             logger.info("[ResetCharacterPosition] 开始执行角色复位流程")
             logger.info(f"  模板图片: {template_path}")
-            logger.info(f"  等待延迟: {wait_delay}ms")
-            logger.info(f"  重试次数: {retry_times}")
-            logger.info(f"  重试间隔: {retry_interval}ms")
+            logger.info(f"  复位等待: {wait_delay}ms")
+            logger.info(f"  每步超时: {int(step_timeout * 1000)}ms")
             logger.info("=" * 60)
             
-            # 步骤 1: 按 ESC 键
-            if not self._step1_press_esc(context, wait_delay):
-                return False
+            start_time = time.perf_counter()
             
-            # 步骤 2: OCR 识别并点击"设置"
-            if not self._step2_click_settings(context, wait_delay, retry_times, retry_interval):
-                return False
+            # 步骤 1: 按 ESC 键打开菜单
+            logger.info("[ResetCharacterPosition] 步骤 1: 按 ESC 键...")
+            with tracing.span("post_click_key", "input", key=self.VK_ESCAPE):
+                context.tasker.controller.post_click_key(self.VK_ESCAPE).wait()
             
-            # 步骤 3: 模板匹配并点击"其他"
-            if not self._step3_click_other(context, template_path, wait_delay, retry_times, retry_interval):
-                return False
+            # 步骤 2~5：文字步骤先在对应 OCR 节点学习到的 ROI 内识别，再从 OCR 索引中查询；"其他"分页用模板匹配
+            # 如果需要动态模板路径，使用 pipeline_override 覆盖 Template_Other
+            steps = [
+                WaitTarget("设置", pattern="设置", node="OCR_Settings"),
+                WaitTarget(template_path, node="Template_Other",
+                           pipeline_override={"Template_Other": {"template": template_path}}
+                           if template_path != "common/其他.png" else None),
+                WaitTarget("复位角色", pattern="复位角色", node="OCR_ResetCharacter"),
+                WaitTarget("确定", pattern="确定", node="OCR_Confirm"),
+            ]
             
-            # 步骤 4: OCR 识别并点击"复位角色"
-            if not self._step4_click_reset_character(context, wait_delay, retry_times, retry_interval):
-                return False
+            step = 0
+            while step < len(steps):
+                # 设置页面可能仍停留在"其他"分页，此时"复位角色"已经可见，可以直接跳过前面的步骤
+                candidates = [step]
+                if step < self.LOOKAHEAD_STEP:
+                    candidates.insert(0, self.LOOKAHEAD_STEP)
+                
+                logger.info(f"[ResetCharacterPosition] 步骤 {step + 2}: 识别并点击'{steps[step].label}'...")
+                found = wait_for_any(context, [steps[i] for i in candidates], step_timeout, learn_roi=True)
+                if found is None:
+                    logger.error(f"  [X] 未找到'{steps[step].label}'")
+                    return False
+                
+                target_index, (x, y, w, h) = found
+                matched = candidates[target_index]
+                if matched != step:
+                    logger.info(f"  [OK] '{steps[matched].label}' 已可见，跳过 {matched - step} 个步骤")
+                logger.info(f"  [OK] 找到'{steps[matched].label}': box=({x}, {y}, {w}, {h})")
+                
+                # 点击识别框的中心
+                with tracing.span("post_click", "input", x=x + w // 2, y=y + h // 2):
+                    context.tasker.controller.post_click(x + w // 2, y + h // 2).wait()
+                logger.info(f"  [OK] 已点击'{steps[matched].label}'")
+                step = matched + 1
             
-            # 步骤 5: OCR 识别并点击"确定"
-            if not self._step5_click_confirm(context, wait_delay, retry_times, retry_interval):
-                return False
+            # 等待复位生效
+            tracing.sleep(wait_delay / 1000.0, "reset_delay")
             
-            logger.info("[ResetCharacterPosition] [OK] 角色复位流程执行完成")
+            logger.info(f"[ResetCharacterPosition] [OK] 角色复位流程执行完成，用时 {int((time.perf_counter() - start_time) * 1000)}ms")
             logger.info("=" * 60)
             
             return True
@@ -94,362 +336,125 @@ class ResetCharacterPosition(CustomAction):
         except Exception as e:
             logger.error(f"[ResetCharacterPosition] 执行失败: {e}", exc_info=True)
             return False
-    
-    def _step1_press_esc(self, context: Context, wait_delay: int) -> bool:
-        """步骤 1: 按 ESC 键打开菜单"""
-        logger.info("[ResetCharacterPosition] 步骤 1: 按 ESC 键...")
-        
-        try:
-            # ESC 键的虚拟键码是 27
-            logger.info(f"  [DEBUG] 调用 post_click_key(27)...")
-            click_job = context.tasker.controller.post_click_key(27)
-            click_job.wait()
-            logger.info(f"  [DEBUG] post_click_key(27) 完成")
-            
-            logger.info(f"  [OK] ESC 键已按下，等待 {wait_delay}ms...")
-            time.sleep(wait_delay / 1000.0)
-            
-            # 刷新截图
-            context.tasker.controller.post_screencap().wait()
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"  [X] 按 ESC 键失败: {e}", exc_info=True)
-            return False
-    
-    def _step2_click_settings(self, context: Context, wait_delay: int, retry_times: int, retry_interval: int) -> bool:
-        """步骤 2: OCR 识别并点击"设置" (带重试机制)"""
-        logger.info("[ResetCharacterPosition] 步骤 2: OCR 识别并点击'设置'...")
-        
-        for attempt in range(1, retry_times + 1):
-            try:
-                logger.info(f"  尝试 {attempt}/{retry_times}: OCR 识别'设置'...")
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                image = context.tasker.controller.cached_image
-                
-                # 使用预定义节点 OCR_Settings (在 resetPosition.json 中定义)
-                reco_result = context.run_recognition(
-                    "OCR_Settings",
-                    image
-                )
-                
-                if not reco_result or not reco_result.box or reco_result.box.w == 0:
-                    logger.warning(f"  尝试 {attempt}/{retry_times}: 未找到'设置'文字")
-                    
-                    # 如果不是最后一次尝试，等待后重试
-                    if attempt < retry_times:
-                        logger.info(f"  等待 {retry_interval}ms 后重试...")
-                        time.sleep(retry_interval / 1000.0)
-                        continue
-                    else:
-                        logger.error(f"  [X] 已达最大重试次数 ({retry_times})")
-                        return False
-                
-                logger.info(f"  [OK] 找到'设置': box=({reco_result.box.x}, {reco_result.box.y}, {reco_result.box.w}, {reco_result.box.h})")
-                
-                # 点击识别框的中心
-                click_x = reco_result.box.x + reco_result.box.w // 2
-                click_y = reco_result.box.y + reco_result.box.h // 2
-                
-                click_job = context.tasker.controller.post_click(click_x, click_y)
-                click_job.wait()
-                
-                logger.info(f"  [OK] 已点击'设置'，等待 {wait_delay}ms...")
-                time.sleep(wait_delay / 1000.0)
-                
-                # 刷新截图 - 添加延迟确保缓存更新
-                context.tasker.controller.post_screencap().wait()
-                
-                return True
-                
-            except Exception as e:
-                logger.error(f"  尝试 {attempt}/{retry_times} [X] 点击'设置'失败: {e}", exc_info=True)
-                if attempt < retry_times:
-                    time.sleep(retry_interval / 1000.0)
-                else:
-                    return False
-        
-        return False
-    
-    def _step3_click_other(self, context: Context, template_path: str, wait_delay: int, retry_times: int, retry_interval: int) -> bool:
-        """步骤 3: 模板匹配并点击"其他" (带重试机制)"""
-        logger.info(f"[ResetCharacterPosition] 步骤 3: 模板匹配并点击'{template_path}'...")
-        
-        for attempt in range(1, retry_times + 1):
-            try:
-                logger.info(f"  尝试 {attempt}/{retry_times}: 模板匹配'{template_path}'...")
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                image = context.tasker.controller.cached_image
-                
-                # 使用预定义节点 Template_Other (在 resetPosition.json 中定义)
-                # 如果需要动态模板路径,使用 pipeline_override 覆盖
-                reco_result = context.run_recognition(
-                    "Template_Other",
-                    image,
-                    pipeline_override={
-                        "Template_Other": {
-                            "template": template_path
-                        }
-                    } if template_path != "common/其他.png" else {}
-                )
-                
-                if not reco_result or not reco_result.box or reco_result.box.w == 0:
-                    logger.warning(f"  尝试 {attempt}/{retry_times}: 未找到模板'{template_path}'")
-                    
-                    # 如果不是最后一次尝试，等待后重试
-                    if attempt < retry_times:
-                        logger.info(f"  等待 {retry_interval}ms 后重试...")
-                        time.sleep(retry_interval / 1000.0)
-                        continue
-                    else:
-                        logger.error(f"  [X] 已达最大重试次数 ({retry_times})")
-                        return False
-                
-                logger.info(f"  [OK] 找到模板: box=({reco_result.box.x}, {reco_result.box.y}, {reco_result.box.w}, {reco_result.box.h})")
-                
-                # 点击识别框的中心
-                click_x = reco_result.box.x + reco_result.box.w // 2
-                click_y = reco_result.box.y + reco_result.box.h // 2
-                
-                click_job = context.tasker.controller.post_click(click_x, click_y)
-                click_job.wait()
-                
-                logger.info(f"  [OK] 已点击'{template_path}'，等待 {wait_delay}ms...")
-                time.sleep(wait_delay / 1000.0)
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                return True
-                
-            except Exception as e:
-                logger.error(f"  尝试 {attempt}/{retry_times} [X] 点击'{template_path}'失败: {e}", exc_info=True)
-                if attempt < retry_times:
-                    time.sleep(retry_interval / 1000.0)
-                else:
-                    return False
-        
-        return False
-    
-    def _step4_click_reset_character(self, context: Context, wait_delay: int, retry_times: int, retry_interval: int) -> bool:
-        """步骤 4: OCR 识别并点击"复位角色" (带重试机制)"""
-        logger.info("[ResetCharacterPosition] 步骤 4: OCR 识别并点击'复位角色'...")
-        
-        for attempt in range(1, retry_times + 1):
-            try:
-                logger.info(f"  尝试 {attempt}/{retry_times}: OCR 识别'复位角色'...")
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                image = context.tasker.controller.cached_image
-                
-                # 使用预定义节点 OCR_ResetCharacter (在 resetPosition.json 中定义)
-                reco_result = context.run_recognition(
-                    "OCR_ResetCharacter",
-                    image
-                )
-                
-                if not reco_result or not reco_result.box or reco_result.box.w == 0:
-                    logger.warning(f"  尝试 {attempt}/{retry_times}: 未找到'复位角色'文字")
-                    
-                    # 如果不是最后一次尝试，等待后重试
-                    if attempt < retry_times:
-                        logger.info(f"  等待 {retry_interval}ms 后重试...")
-                        time.sleep(retry_interval / 1000.0)
-                        continue
-                    else:
-                        logger.error(f"  [X] 已达最大重试次数 ({retry_times})")
-                        return False
-                
-                logger.info(f"  [OK] 找到'复位角色': box=({reco_result.box.x}, {reco_result.box.y}, {reco_result.box.w}, {reco_result.box.h})")
-                
-                # 点击识别框的中心
-                click_x = reco_result.box.x + reco_result.box.w // 2
-                click_y = reco_result.box.y + reco_result.box.h // 2
-                
-                click_job = context.tasker.controller.post_click(click_x, click_y)
-                click_job.wait()
-                
-                logger.info(f"  [OK] 已点击'复位角色'，等待 {wait_delay}ms...")
-                time.sleep(wait_delay / 1000.0)
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                return True
-                
-            except Exception as e:
-                logger.error(f"  尝试 {attempt}/{retry_times} [X] 点击'复位角色'失败: {e}", exc_info=True)
-                if attempt < retry_times:
-                    time.sleep(retry_interval / 1000.0)
-                else:
-                    return False
-        
-        return False
-    
-    def _step5_click_confirm(self, context: Context, wait_delay: int, retry_times: int, retry_interval: int) -> bool:
-        """步骤 5: OCR 识别并点击"确定" (带重试机制)"""
-        logger.info("[ResetCharacterPosition] 步骤 5: OCR 识别并点击'确定'...")
-        
-        for attempt in range(1, retry_times + 1):
-            try:
-                logger.info(f"  尝试 {attempt}/{retry_times}: OCR 识别'确定'...")
-                
-                # 刷新截图
-                context.tasker.controller.post_screencap().wait()
-                image = context.tasker.controller.cached_image
-                reco_result = context.run_recognition(
-                    "OCR_Confirm",
-                    image
-                )
-                
-                if not reco_result or not reco_result.box or reco_result.box.w == 0:
-                    logger.warning(f"  尝试 {attempt}/{retry_times}: 未找到'确定'文字")
-                    
-                    # 如果不是最后一次尝试，等待后重试
-                    if attempt < retry_times:
-                        logger.info(f"  等待 {retry_interval}ms 后重试...")
-                        time.sleep(retry_interval / 1000.0)
-                        continue
-                    else:
-                        logger.error(f"  [X] 已达最大重试次数 ({retry_times})")
-                        return False
-                
-                logger.info(f"  [OK] 找到'确定': box=({reco_result.box.x}, {reco_result.box.y}, {reco_result.box.w}, {reco_result.box.h})")
-                
-                # 点击识别框的中心
-                click_x = reco_result.box.x + reco_result.box.w // 2
-                click_y = reco_result.box.y + reco_result.box.h // 2
-                
-                click_job = context.tasker.controller.post_click(click_x, click_y)
-                click_job.wait()
-                
-                logger.info(f"  [OK] 已点击'确定'，等待 {wait_delay}ms...")
-                time.sleep(wait_delay / 1000.0)
-                
-                # 刷新截图 - 添加延迟确保缓存更新
-                context.tasker.controller.post_screencap().wait()
-                time.sleep(0.1)  # 等待控制器缓存更新
-                
-                return True
-                
-            except Exception as e:
-                logger.error(f"  尝试 {attempt}/{retry_times} [X] 点击'确定'失败: {e}", exc_info=True)
-                if attempt < retry_times:
-                    time.sleep(retry_interval / 1000.0)
-                else:
-                    return False
-        
-        return False
+
 
 @AgentServer.custom_action("AutoBattle")
 class AutoBattle(CustomAction):
     """
-    循环检测目标文字，支持超时处理和中断动作
-    当未检测到目标时，执行中断动作（自动战斗）
+    战斗循环：战斗输入与目标检测并行执行
+    战斗输入（按 E 键）在独立线程上按 check_interval 定时执行，
+    当前线程按 detect_interval 检测目标节点，命中后立即停止战斗输入并返回
+    
+    参数说明：
+    {
+        "check_interval": 5000,               // 战斗按键间隔（毫秒）
+        "detect_interval": 500,               // 目标检测间隔（毫秒）
+        "total_timeout": 180000,              // 总超时时间（毫秒）
+        "target_node": "again_for_win",       // 要检测的目标节点
+        "interrupt_node": "autoBattle_for_win"  // 未检测到时的候补节点（仅用于日志）
+    }
     """
 
+    PARAM_SCHEMA = ParamSchema(
+        "AutoBattle",
+        Field("check_interval", int, 5000, check=lambda v: v > 0),        # 战斗按键间隔
+        Field("detect_interval", int, 500, check=lambda v: v > 0),        # 目标检测间隔
+        Field("total_timeout", int, 180000, check=lambda v: v > 0),       # 总超时时间 180s
+        Field("target_node", str, "again_for_win"),                       # 要检测的目标节点
+        Field("interrupt_node", str, "autoBattle_for_win"),               # 未检测到时的候补节点
+    )
+
+    # E 键的虚拟键码
+    VK_E = 69
+
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 从参数中获取配置
-        # custom_action_param 是 JSON 字符串，需要解析为字典
+        # 战斗前松开上一个移动动作保持的按键
+        release_held_keys("自动战斗")
+        
+        # 解析参数（按参数字符串缓存）
         try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[AutoBattle] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[AutoBattle] JSON 解析失败: {e}")
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[AutoBattle] 参数错误: {e}")
             logger.error(f"  参数内容: {argv.custom_action_param}")
             return False
         
-        check_interval = params.get("check_interval", 5000)  # 检测间隔
-        total_timeout = params.get("total_timeout", 180000)  # 总超时时间 180s
-        target_node = params.get("target_node", "again_for_win")  # 要检测的目标节点
-        interrupt_node = params.get("interrupt_node", "autoBattle_for_win")  # 未检测到时的候补节点
+        check_interval = params["check_interval"]
+        detect_interval = params["detect_interval"]
+        total_timeout = params["total_timeout"]
+        target_node = params["target_node"]
+        interrupt_node = params["interrupt_node"]
+        
+        # 从运行时配置获取自动战斗模式（取值已校验为 0 或 1）
+        auto_battle_mode = get_runtime_config().auto_battle_mode
         
         logger.info("=" * 50)
         logger.info("[AutoBattle] 开始战斗循环检测")
-        logger.info(f"  检测间隔: {check_interval}ms, 总超时: {total_timeout}ms")
+        logger.info(f"  战斗按键间隔: {check_interval}ms, 检测间隔: {detect_interval}ms, 总超时: {total_timeout}ms")
         logger.info(f"  目标节点: {target_node}, 中断节点: {interrupt_node}")
+        logger.info(f"  自动战斗模式: {auto_battle_mode} ({'循环按E键' if auto_battle_mode == 0 else '什么也不做'})")
+        
+        stop_event = threading.Event()
+        combat_thread = None
+        start_time = time.perf_counter()
         
         try:
-            # 开始循环检测目标节点
-            start_time = time.time()
-            loop_count = 0
+            if auto_battle_mode == 0:
+                # 模式 0: 在独立线程上循环按 E 键
+                combat_thread = threading.Thread(
+                    target=self._combat_loop,
+                    args=(context.tasker.controller, check_interval / 1000.0, stop_event),
+                    name="AutoBattleInput",
+                    daemon=True,
+                )
+                combat_thread.start()
             
-            while True:
-                loop_count += 1
-                elapsed = (time.time() - start_time) * 1000  # 已经过的时间（毫秒）
-                
-                # 检查是否超时
-                if elapsed >= total_timeout:
-                    logger.warning(f"[AutoBattle] 超时 {total_timeout}ms，跳转到 on_error")
-                    logger.info(f"  总循环次数: {loop_count}")
-                    return False
-                
-                # 尝试检测目标节点
-                logger.info(f"[AutoBattle] 第 {loop_count} 次检测 '{target_node}'... (已用时: {int(elapsed)}ms / {total_timeout}ms)")
-                
-                # 获取最新截图
-                sync_job = context.tasker.controller.post_screencap()
-                sync_job.wait()
-                image = context.tasker.controller.cached_image  # 这是属性,不是方法
-                
-                # 运行目标节点的识别
-                reco_result = context.run_recognition(target_node, image)
-                
-                # 检查识别结果是否有效（box 不为 None 且宽高大于 0）
-                if reco_result and reco_result.box and reco_result.box.w > 0 and reco_result.box.h > 0:
-                    logger.info(f"[AutoBattle] [OK] 检测到 '{target_node}'")
-                    logger.info(f"  识别框: x={reco_result.box.x}, y={reco_result.box.y}, w={reco_result.box.w}, h={reco_result.box.h}")
-                    logger.info(f"  识别算法: {reco_result.algorithm}")
-                    logger.info(f"  总循环次数: {loop_count}, 总用时: {int(elapsed)}ms")
-                    # 动态设置 next 节点
-                    context.override_next(argv.node_name, [target_node])
-                    return True
-                else:
-                    # 详细记录未识别的原因
-                    if not reco_result:
-                        logger.info(f"[AutoBattle] [X] 未检测到 '{target_node}' (reco_result 为 None)")
-                    elif not reco_result.box:
-                        logger.info(f"[AutoBattle] [X] 未检测到 '{target_node}' (box 为 None)")
-                    else:
-                        logger.info(f"[AutoBattle] [X] 未检测到 '{target_node}' (box 无效: w={reco_result.box.w}, h={reco_result.box.h})")
-                    
-                    logger.info(f"[AutoBattle] -> 执行 interrupt '{interrupt_node}'")
-                 
-                    # 从全局配置获取自动战斗模式
-                    import main
-                    auto_battle_mode = main.GAME_CONFIG.get("auto_battle_mode", 0)
-                    
-                    if auto_battle_mode == 0:
-                        # 模式 0: 循环按 E 键（默认）
-                        logger.info(f"[AutoBattle] -> 模式 0: 执行自动战斗（按 E 键）")
-                        click_job = context.tasker.controller.post_click_key(69)  # E 键
-                        click_job.wait()
-                    elif auto_battle_mode == 1:
-                        # 模式 1: 什么也不做
-                        logger.info(f"[AutoBattle] -> 模式 1: 什么也不做，仅等待")
-                    else:
-                        logger.warning(f"[AutoBattle] -> 未知模式 {auto_battle_mode}，默认执行模式 0")
-                        click_job = context.tasker.controller.post_click_key(69)  # E 键
-                        click_job.wait()
-
-                    # 等待检测间隔
-                    logger.info(f"[AutoBattle] -> 等待检测间隔 {check_interval}ms...")
-                    time.sleep(check_interval / 1000.0)
+            # 当前线程按检测间隔检测目标节点
+            reco_result = wait_for(
+                context, target_node, total_timeout / 1000.0,
+                schedule=(detect_interval / 1000.0,),
+            )
+            
+            elapsed = int((time.perf_counter() - start_time) * 1000)
+            if reco_result is None:
+                logger.warning(f"[AutoBattle] 超时 {total_timeout}ms，跳转到 on_error")
+                return False
+            
+            logger.info(f"[AutoBattle] [OK] 检测到 '{target_node}'")
+            logger.info(f"  识别框: x={reco_result.box.x}, y={reco_result.box.y}, w={reco_result.box.w}, h={reco_result.box.h}")
+            logger.info(f"  识别算法: {reco_result.algorithm}")
+            logger.info(f"  总用时: {elapsed}ms")
+            # 动态设置 next 节点
+            context.override_next(argv.node_name, [target_node])
+            return True
                     
         except Exception as e:
             logger.error(f"[AutoBattle] 发生异常: {e}", exc_info=True)
             return False
-
+        
+        finally:
+            # 停止战斗输入线程
+            stop_event.set()
+            if combat_thread is not None:
+                combat_thread.join()
+                logger.info("[AutoBattle] 战斗输入已停止")
+    
+    def _combat_loop(self, controller, interval: float, stop_event: threading.Event):
+        """战斗输入线程：每隔 interval 秒按一次 E 键，直到 stop_event 被设置"""
+        presses = 0
+        try:
+            while not stop_event.is_set():
+                with tracing.span("post_click_key", "input", key=self.VK_E):
+                    controller.post_click_key(self.VK_E).wait()
+                presses += 1
+                if stop_event.wait(interval):
+                    break
+        except Exception as e:
+            logger.error(f"[AutoBattle] 战斗输入线程异常: {e}", exc_info=True)
+        finally:
+            logger.info(f"[AutoBattle] 战斗输入线程结束，共按 E 键 {presses} 次")
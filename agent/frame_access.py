@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+截图帧访问模块
+Controller.cached_image 每次都新建 ImageBuffer，并且 ImageBuffer.get() 会 deepcopy 整帧。
+FrameReader 复用同一个 ImageBuffer，直接返回指向其内存的只读视图（下一次截图前有效），
+需要保留帧时再拷贝到预分配的数组池中
+"""
+
+import ctypes
+import logging
+from typing import List
+
+import numpy as np
+from maa.buffer import ImageBuffer
+from maa.library import Library
+
+import tracing
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+
+def borrow_view(data_ptr: int, height: int, width: int, channels: int) -> np.ndarray:
+    """
+    将原生图像内存包装为只读 ndarray（不拷贝）
+
+    视图与原生内存共享数据，原生缓冲区被改写或释放后视图失效
+    """
+    view = np.ctypeslib.as_array(
+        ctypes.cast(data_ptr, ctypes.POINTER(ctypes.c_uint8)), shape=(height, width, channels)
+    )
+    view.flags.writeable = False
+    return view
+
+
+class FramePool:
+    """
+    预分配的帧数组池
+    按轮转顺序复用 size 个数组，帧尺寸变化时才重新分配
+    """
+
+    def __init__(self, size: int = 2):
+        self.size = size
+        self.allocations = 0
+        self._arrays: List[np.ndarray] = []
+        self._index = 0
+
+    def copy(self, frame: np.ndarray) -> np.ndarray:
+        """将帧拷贝到池中的下一个数组并返回该数组"""
+        if len(self._arrays) < self.size:
+            target = np.empty_like(frame)
+            self._arrays.append(target)
+            self.allocations += 1
+        else:
+            target = self._arrays[self._index]
+            if target.shape != frame.shape:
+                target = self._arrays[self._index] = np.empty_like(frame)
+                self.allocations += 1
+
+        self._index = (self._index + 1) % self.size
+        np.copyto(target, frame)
+        return target
+
+
+class FrameReader:
+    """
+    截图读取器
+    每个读取器持有一个 ImageBuffer，截图后直接借用其中的数据
+    """
+
+    def __init__(self, controller, pool_size: int = 2):
+        """
+        Args:
+            controller: MaaFramework 控制器
+            pool_size: 拷贝模式下的数组池大小
+        """
+        self.controller = controller
+        self.pool = FramePool(pool_size)
+        self._buffer = ImageBuffer()
+
+    def capture(self) -> np.ndarray:
+        """
+        截图并返回只读视图
+
+        视图在同一读取器下一次 capture/latest 之前有效，需要保留时使用 capture_copy
+        """
+        with tracing.span("screencap", "screencap"):
+            self.controller.post_screencap().wait()
+        return self.latest()
+
+    def latest(self) -> np.ndarray:
+        """返回控制器缓存的最新截图（只读视图，不重新截图）"""
+        framework = Library.framework()
+        if not framework.MaaControllerCachedImage(self.controller._handle, self._buffer._handle):
+            raise RuntimeError("Failed to get cached image.")
+
+        data_ptr = framework.MaaImageBufferGetRawData(self._buffer._handle)
+        if not data_ptr:
+            return np.zeros((0, 0, 3), dtype=np.uint8)
+
+        return borrow_view(
+            data_ptr,
+            framework.MaaImageBufferHeight(self._buffer._handle),
+            framework.MaaImageBufferWidth(self._buffer._handle),
+            framework.MaaImageBufferChannels(self._buffer._handle),
+        )
+
+    def capture_copy(self) -> np.ndarray:
+        """截图并拷贝到预分配数组池中（池中数组在轮转 pool_size 次后被复用）"""
+        return self.pool.copy(self.capture())
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+帧变化门控模块
+用缩小后的灰度分块均值作为帧签名，画面没有明显变化时跳过识别，
+直接沿用上一次的未命中结果
+"""
+
+import logging
+from typing import Optional, Tuple
+
+import numpy as np
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+
+def frame_signature(image: np.ndarray, grid: Tuple[int, int] = (18, 32), step: int = 4) -> np.ndarray:
+    """
+    计算帧签名：按 step 抽样后转灰度，再按 grid（行, 列）分块求均值
+
+    Args:
+        image: BGR 或灰度图像
+        grid: 分块数（行, 列）
+        step: 抽样步长
+
+    Returns:
+        float32 分块均值矩阵，形状为 grid
+    """
+    sampled = image[::step, ::step]
+    if sampled.ndim == 3:
+        # BGR -> 灰度（ITU-R BT.601 权重）
+        gray = sampled[..., :3].astype(np.float32) @ np.array([0.114, 0.587, 0.299], dtype=np.float32)
+    else:
+        gray = sampled.astype(np.float32)
+
+    rows, cols = grid
+    height = gray.shape[0] - gray.shape[0] % rows
+    width = gray.shape[1] - gray.shape[1] % cols
+    blocks = gray[:height, :width].reshape(rows, height // rows, cols, width // cols)
+    return blocks.mean(axis=(1, 3))
+
+
+class FrameGate:
+    """
+    帧变化门控
+    与上一次识别时的帧签名比较，任一分块均值变化超过 threshold 视为画面变化
+
+    为避免细微变化被漏掉，连续跳过 max_skips 次后强制识别一次
+    """
+
+    def __init__(self, threshold: float = 1.5, max_skips: int = 4, grid: Tuple[int, int] = (18, 32)):
+        """
+        Args:
+            threshold: 分块灰度均值的最大变化阈值（0~255）
+            max_skips: 最多连续跳过的次数
+            grid: 分块数（行, 列）
+        """
+        self.threshold = threshold
+        self.max_skips = max_skips
+        self.grid = grid
+        self.recognized = 0
+        self.skipped = 0
+        self._signature: Optional[np.ndarray] = None
+        self._consecutive_skips = 0
+
+    def should_recognize(self, image: np.ndarray) -> bool:
+        """
+        判断当前帧是否需要识别
+
+        Returns:
+            True 表示画面有变化（或需要强制刷新），False 表示可以沿用上一次的未命中结果
+        """
+        signature = frame_signature(image, self.grid)
+        previous = self._signature
+
+        if (previous is not None
+                and previous.shape == signature.shape
+                and self._consecutive_skips < self.max_skips
+                and float(np.abs(signature - previous).max()) <= self.threshold):
+            self._consecutive_skips += 1
+            self.skipped += 1
+            return False
+
+        self._signature = signature
+        self._consecutive_skips = 0
+        self.recognized += 1
+        return True
+
+    def reset(self):
+        """清除签名（例如发送输入后，下一帧必须识别）"""
+        self._signature = None
+        self._consecutive_skips = 0
+
+    def summary(self) -> str:
+        """单行统计，用于日志输出"""
+        return f"识别 {self.recognized} 次，跳过 {self.skipped} 次"
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+跨节点保持按键
+连续的移动节点常常按着同一组键（如两个 RunWithShift w 节点）。上一个动作结束时保留下一个节点
+开头也要按下的键，下一个动作开始时只发送差异（释放不再需要的键，跳过已按下的键），
+省去节点切换时的释放/重新按下间隙。保持的时长由下一个动作从时间线开头扣除，总按键时长不变。
+
+保持中的按键在以下情况全部释放：下一个动作不再需要、动作出错、任务停止、
+非移动动作开始、在预计时间内没有动作接管（看门狗超时）、agent 退出
+"""
+
+import threading
+import time
+import logging
+from typing import AbstractSet, FrozenSet, List, Optional, Tuple
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+
+class HeldKeys:
+    """
+    保持按下的按键状态
+
+    只记录按键和用于释放的输入辅助对象（任何提供 key_up(vk_code) 的对象），
+    本模块不依赖 win32，非移动动作可以直接调用 release_all()
+    """
+
+    def __init__(self, poll_interval: float = 0.05):
+        """
+        Args:
+            poll_interval: 看门狗检查间隔（秒）
+        """
+        self.poll_interval = poll_interval
+        self.carried = 0          # 沿用按键的节点切换次数
+        self.saved_presses = 0    # 省去的释放/按下次数
+        self._lock = threading.Lock()
+        self._helper = None
+        self._keys: List[int] = []
+        self._deadline = 0.0
+        self._since = 0.0
+        self._tasker = None
+        self._watchdog: Optional[threading.Thread] = None
+
+    @property
+    def keys(self) -> FrozenSet[int]:
+        """当前保持按下的按键"""
+        with self._lock:
+            return frozenset(self._keys)
+
+    def take(self, helper, wanted: AbstractSet[int]) -> Tuple[FrozenSet[int], float]:
+        """
+        动作开始时接管保持中的按键：wanted 中的按键沿用，其余按键立即释放
+
+        Args:
+            helper: 本次动作的输入辅助对象（窗口句柄不同时不沿用任何按键）
+            wanted: 本次动作开头要沿用的按键
+
+        Returns:
+            (沿用的按键（时间线中对应的第一次按下事件应跳过）, 这些按键已经保持的时间（秒）)
+        """
+        with self._lock:
+            old_helper, keys = self._helper, self._keys
+            held_for = time.perf_counter() - self._since
+            self._helper, self._keys, self._tasker = None, [], None
+        if not keys:
+            return frozenset(), 0.0
+
+        same_window = getattr(old_helper, "hwnd", None) == getattr(helper, "hwnd", None)
+        adopted = frozenset(vk for vk in keys if same_window and vk in wanted)
+        self._release(old_helper, [vk for vk in keys if vk not in adopted])
+        if adopted:
+            self.carried += 1
+            self.saved_presses += len(adopted)
+            logger.info(f"[HeldKeys] 沿用按键 {sorted(adopted)}，已保持 {held_for:.3f}秒")
+        return adopted, (held_for if adopted else 0.0)
+
+    def hold(self, helper, keys: AbstractSet[int], timeout: float, tasker=None):
+        """
+        动作结束时保持按键，等待下一个动作接管
+
+        Args:
+            helper: 用于释放的输入辅助对象
+            keys: 保持按下的按键
+            timeout: 超过该时间（秒）仍未被接管则释放
+            tasker: 任务执行器，正在停止或不再运行时释放
+        """
+        if not keys:
+            return
+        with self._lock:
+            self._helper = helper
+            self._keys = sorted(keys)
+            self._since = time.perf_counter()
+            self._deadline = self._since + timeout
+            self._tasker = tasker
+            if self._watchdog is None or not self._watchdog.is_alive():
+                self._watchdog = threading.Thread(target=self._watch, name="HeldKeysWatchdog", daemon=True)
+                self._watchdog.start()
+        logger.info(f"[HeldKeys] 保持按键 {sorted(keys)}，{timeout:.2f}秒内等待下一个动作接管")
+
+    def release_all(self, reason: str = ""):
+        """释放全部保持中的按键"""
+        with self._lock:
+            helper, keys = self._helper, self._keys
+            self._helper, self._keys, self._tasker = None, [], None
+        if keys:
+            logger.info(f"[HeldKeys] 释放保持中的按键 {keys}{f'（{reason}）' if reason else ''}")
+            self._release(helper, keys)
+
+    @staticmethod
+    def _release(helper, keys: List[int]):
+        for vk_code in reversed(keys):
+            try:
+                helper.key_up(vk_code)
+            except Exception as e:
+                logger.warning(f"[HeldKeys] 释放按键 VK={vk_code} 失败: {e}")
+
+    def _stopping(self, tasker) -> bool:
+        try:
+            return bool(tasker.stopping or not tasker.running)
+        except Exception:
+            return False
+
+    def _watch(self):
+        """看门狗线程：超时或任务停止时释放按键，没有保持中的按键时退出"""
+        while True:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._keys:
+                    self._watchdog = None
+                    return
+                deadline, tasker = self._deadline, self._tasker
+            if time.perf_counter() >= deadline:
+                self.release_all("等待下一个动作超时")
+            elif tasker is not None and self._stopping(tasker):
+                self.release_all("任务停止")
+
+
+_held_keys = HeldKeys()
+
+
+def get_held_keys() -> HeldKeys:
+    """获取进程内共享的按键保持状态"""
+    return _held_keys
+
+
+def release_held_keys(reason: str = ""):
+    """释放全部保持中的按键（非移动动作开始、agent 退出时调用）"""
+    _held_keys.release_all(reason)
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+图片读取模块
+agent 运行环境只有 NumPy（没有 OpenCV / Pillow），这里用 zlib + NumPy 解码资源包中的 PNG 模板，
+并提供灰度转换和缩小等基础处理
+"""
+
+import struct
+import zlib
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 颜色类型 -> 通道数
+_CHANNELS = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+
+
+def _unfilter_average(line: list, prior: list, bpp: int) -> np.ndarray:
+    cur = line[:]
+    for x in range(len(cur)):
+        left = cur[x - bpp] if x >= bpp else 0
+        cur[x] = (cur[x] + ((left + prior[x]) >> 1)) & 0xFF
+    return np.array(cur, dtype=np.int16)
+
+
+def _unfilter_paeth(line: list, prior: list, bpp: int) -> np.ndarray:
+    cur = line[:]
+    for x in range(len(cur)):
+        if x >= bpp:
+            a, c = cur[x - bpp], prior[x - bpp]
+        else:
+            a = c = 0
+        b = prior[x]
+        p = a + b - c
+        pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+        if pa <= pb and pa <= pc:
+            pred = a
+        elif pb <= pc:
+            pred = b
+        else:
+            pred = c
+        cur[x] = (cur[x] + pred) & 0xFF
+    return np.array(cur, dtype=np.int16)
+
+
+def _unfilter(raw: np.ndarray, height: int, stride: int, bpp: int) -> np.ndarray:
+    """还原 PNG 扫描线过滤（None/Sub/Up/Average/Paeth）"""
+    rows = raw.reshape(height, stride + 1)
+    filters = rows[:, 0]
+    data = rows[:, 1:].astype(np.int16)
+    out = np.zeros((height, stride), dtype=np.int16)
+    prior = np.zeros(stride, dtype=np.int16)
+
+    for y in range(height):
+        line = data[y]
+        kind = filters[y]
+        if kind == 0:
+            cur = line
+        elif kind == 1:
+            # Sub：按像素累加（同一通道）
+            cur = line.reshape(-1, bpp).cumsum(axis=0).reshape(-1) & 0xFF
+        elif kind == 2:
+            cur = (line + prior) & 0xFF
+        elif kind == 3:
+            # Average/Paeth 依赖同一行左侧已还原的字节，逐字节处理（Python 整数比小数组运算快）
+            cur = _unfilter_average(line.tolist(), prior.tolist(), bpp)
+        elif kind == 4:
+            cur = _unfilter_paeth(line.tolist(), prior.tolist(), bpp)
+        else:
+            raise ValueError(f"未知的 PNG 过滤类型: {kind}")
+        out[y] = cur
+        prior = cur
+
+    return out.astype(np.uint8)
+
+
+# Adam7 隔行扫描的 7 个子图：(起始行, 起始列, 行步长, 列步长)
+_ADAM7 = ((0, 0, 8, 8), (0, 4, 8, 8), (4, 0, 8, 4), (0, 2, 4, 4), (2, 0, 4, 2), (0, 1, 2, 2), (1, 0, 2, 1))
+
+
+def is_png(data: bytes) -> bool:
+    """是否以 PNG 文件签名开头"""
+    return data.startswith(PNG_SIGNATURE)
+
+
+def _unpack_samples(rows: np.ndarray, width: int, samples: int, bit_depth: int) -> np.ndarray:
+    """把还原过滤后的扫描线拆成样本值：HxW*samples，1/2/4/8 位为 uint8，16 位为 uint16"""
+    if bit_depth == 8:
+        return rows[:, :width * samples]
+    if bit_depth == 16:
+        return rows[:, :width * samples * 2].reshape(rows.shape[0], -1, 2).astype(np.uint16) @ \
+            np.array([256, 1], dtype=np.uint16)
+    # 1/2/4 位：每个字节高位在前打包多个样本
+    bits = np.unpackbits(rows, axis=1)[:, :width * samples * bit_depth]
+    weights = (1 << np.arange(bit_depth - 1, -1, -1)).astype(np.uint8)
+    return bits.reshape(rows.shape[0], -1, bit_depth) @ weights
+
+
+def _read_samples(raw: np.ndarray, width: int, height: int, samples: int, bit_depth: int) -> np.ndarray:
+    """还原一幅（子）图的全部样本：HxW*samples"""
+    stride = (width * samples * bit_depth + 7) // 8
+    bpp = max(1, samples * bit_depth // 8)
+    rows = _unfilter(raw[:height * (stride + 1)], height, stride, bpp)
+    return _unpack_samples(rows, width, samples, bit_depth)
+
+
+def decode_png(data: bytes) -> np.ndarray:
+    """
+    解码 PNG（全部标准位深和颜色类型，支持 Adam7 隔行扫描和 tRNS 透明）
+
+    Returns:
+        uint8 数组：灰度为 HxW，其余为 HxWxC（通道顺序与文件一致，即 RGB/RGBA；
+        调色板图展开为 RGB，带 tRNS 时灰度/RGB/调色板图分别展开为灰度+透明度/RGBA/RGBA）。
+        16 位样本取高 8 位，1/2/4 位灰度拉伸到 0~255
+    """
+    if not is_png(data):
+        raise ValueError("不是 PNG 文件")
+
+    pos = len(PNG_SIGNATURE)
+    header = None
+    palette = None
+    transparency = None
+    idat = []
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if kind == b"IHDR":
+            header = struct.unpack(">IIBBBBB", chunk)
+        elif kind == b"PLTE":
+            palette = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, 3)
+        elif kind == b"tRNS":
+            transparency = chunk
+        elif kind == b"IDAT":
+            idat.append(chunk)
+        elif kind == b"IEND":
+            break
+
+    if header is None:
+        raise ValueError("缺少 IHDR")
+    width, height, bit_depth, color_type, _, _, interlace = header
+    valid_depths = (8, 16) if color_type in (2, 4, 6) else (1, 2, 4, 8) if color_type == 3 else (1, 2, 4, 8, 16)
+    if color_type not in _CHANNELS or bit_depth not in valid_depths or interlace not in (0, 1):
+        raise ValueError(f"不支持的 PNG 格式: 位深 {bit_depth}, 颜色类型 {color_type}, 隔行 {interlace}")
+
+    samples = _CHANNELS[color_type]
+    raw = np.frombuffer(zlib.decompress(b"".join(idat)), dtype=np.uint8)
+    if interlace == 0:
+        values = _read_samples(raw, width, height, samples, bit_depth).reshape(height, width, samples)
+    else:
+        values = np.zeros((height, width, samples), dtype=np.uint16 if bit_depth == 16 else np.uint8)
+        offset = 0
+        for y0, x0, dy, dx in _ADAM7:
+            pass_w = (width - x0 + dx - 1) // dx
+            pass_h = (height - y0 + dy - 1) // dy
+            if pass_w <= 0 or pass_h <= 0:
+                continue
+            stride = (pass_w * samples * bit_depth + 7) // 8
+            sub = _read_samples(raw[offset:], pass_w, pass_h, samples, bit_depth)
+            values[y0::dy, x0::dx] = sub.reshape(pass_h, pass_w, samples)
+            offset += pass_h * (stride + 1)
+
+    if color_type == 3:
+        if palette is None:
+            raise ValueError("调色板图缺少 PLTE")
+        indices = values[..., 0]
+        if indices.max(initial=0) >= len(palette):
+            raise ValueError("调色板索引超出 PLTE 范围")
+        if transparency is None:
+            return palette[indices]
+        alpha = np.full(len(palette), 255, dtype=np.uint8)
+        alpha[:len(transparency)] = np.frombuffer(transparency, dtype=np.uint8)[:len(palette)]
+        return np.concatenate([palette, alpha[:, None]], axis=1)[indices]
+
+    # tRNS（灰度/RGB）：与指定颜色完全相同的像素透明，按原始样本值比较
+    opaque = None
+    if transparency is not None and color_type in (0, 2):
+        key = np.array(struct.unpack(f">{samples}H", transparency[:samples * 2]), dtype=np.uint16)
+        opaque = np.where((values == key).all(axis=2), 0, 255).astype(np.uint8)
+
+    if bit_depth == 16:
+        values = (values >> 8).astype(np.uint8)
+    elif bit_depth < 8:
+        values = values * np.uint8(255 // ((1 << bit_depth) - 1))
+
+    if opaque is not None:
+        values = np.concatenate([values, opaque[..., None]], axis=2)
+    if values.shape[2] == 1:
+        return values[..., 0]
+    return values
+
+
+def load_png(path: Union[str, Path]) -> np.ndarray:
+    """读取并解码 PNG 文件"""
+    with open(path, "rb") as f:
+        return decode_png(f.read())
+
+
+def to_gray(image: np.ndarray, rgb: bool = True) -> np.ndarray:
+    """
+    转为 float32 灰度图（ITU-R BT.601 权重）
+
+    Args:
+        image: 灰度、RGB(A) 或 BGR(A) 图像
+        rgb: True 表示通道顺序为 RGB（PNG 解码结果），False 表示 BGR（截图）
+    """
+    if image.ndim == 2:
+        return image.astype(np.float32)
+    if image.shape[2] < 3:
+        return image[..., 0].astype(np.float32)
+    weights = (0.299, 0.587, 0.114) if rgb else (0.114, 0.587, 0.299)
+    return image[..., :3].astype(np.float32) @ np.array(weights, dtype=np.float32)
+
+
+def downscale(gray: np.ndarray, factor: int) -> np.ndarray:
+    """按 factor x factor 分块求均值缩小（裁掉不能整除的边缘）"""
+    if factor == 1:
+        return gray
+    height = gray.shape[0] - gray.shape[0] % factor
+    width = gray.shape[1] - gray.shape[1] % factor
+    blocks = gray[:height, :width].reshape(height // factor, factor, width // factor, factor)
+    return blocks.mean(axis=(1, 3), dtype=np.float32)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+自定义动作的延迟加载
+注册（AgentServer.custom_action）在导入时完成，实现所在模块（如 postmessage 及其依赖的 win32 模块）
+在第一次执行时才导入；启动完成后可在后台线程中预先导入，避免第一次执行时等待
+"""
+
+import importlib
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from maa.agent.agent_server import AgentServer
+from maa.custom_action import CustomAction
+from maa.context import Context
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 已注册的延迟动作：动作名称 -> (模块名, 类名)
+_targets: Dict[str, Tuple[str, str]] = {}
+_lock = threading.Lock()
+
+
+def resolve(module_name: str, class_name: str) -> type:
+    """导入模块并返回实现类"""
+    with _lock:
+        return getattr(importlib.import_module(module_name), class_name)
+
+
+class LazyAction(CustomAction):
+    """
+    延迟加载的自定义动作
+
+    子类通过 lazy_action 装饰器注册，第一次执行时导入实现类并创建实例，之后直接转发
+    """
+
+    _module_name: str = ""
+    _class_name: str = ""
+
+    def __init__(self):
+        super().__init__()
+        self._impl: Optional[CustomAction] = None
+
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> bool:
+        impl = self._impl
+        if impl is None:
+            impl = self._impl = resolve(self._module_name, self._class_name)()
+        return impl.run(context, argv)
+
+
+def lazy_action(name: str, module_name: str, class_name: str):
+    """
+    注册延迟加载的自定义动作
+
+    用法：
+        @lazy_action("RunWithShift", "postmessage.actions", "RunWithShift")
+        class RunWithShiftAction(LazyAction):
+            pass
+    """
+    def decorator(cls):
+        cls._module_name = module_name
+        cls._class_name = class_name
+        _targets[name] = (module_name, class_name)
+        return AgentServer.custom_action(name)(cls)
+    return decorator
+
+
+def preload() -> List[str]:
+    """
+    导入全部延迟动作的实现模块（供启动完成后在后台调用）
+
+    Returns:
+        导入失败的动作名称
+    """
+    failed = []
+    start = time.perf_counter()
+    for name, (module_name, class_name) in list(_targets.items()):
+        try:
+            resolve(module_name, class_name)
+        except Exception as e:
+            logger.error(f"[LazyLoader] [X] 预加载 '{name}' ({module_name}.{class_name}) 失败: {e}", exc_info=True)
+            failed.append(name)
+    logger.info(f"[LazyLoader] 已预加载 {len(_targets) - len(failed)}/{len(_targets)} 个动作实现，"
+                f"用时 {(time.perf_counter() - start) * 1000:.0f}ms")
+    return failed
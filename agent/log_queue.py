@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+队列日志模块
+根日志记录器只挂一个 QueueHandler，发出日志的线程只做一次入队；
+格式化和写文件 / 控制台都在后台 QueueListener 线程中完成，日志量不会影响按键时序
+"""
+
+import atexit
+import queue
+import threading
+import logging
+import logging.handlers
+from typing import Optional, Sequence
+
+
+class FastQueueHandler(logging.handlers.QueueHandler):
+    """
+    只入队的 QueueHandler
+
+    标准 QueueHandler.prepare() 会在发出日志的线程里调用 Formatter（生成时间字符串、拼接格式），
+    这里只把 %-参数合并进消息（避免入队后参数对象被修改）并展开异常堆栈，格式化留给监听线程
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            # 异常对象持有整个调用栈，提前展开为文本
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_lock = threading.Lock()
+
+
+def start_queued_logging(handlers: Sequence[logging.Handler], level: int = logging.INFO) -> logging.handlers.QueueListener:
+    """
+    把根日志记录器切换为队列模式
+
+    Args:
+        handlers: 实际输出的处理器（文件、控制台），在后台线程中执行
+        level: 根日志记录器级别
+
+    Returns:
+        已启动的 QueueListener（进程退出时自动停止）
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            raise RuntimeError("队列日志已启动")
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(FastQueueHandler(log_queue))
+        root.setLevel(level)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+    atexit.register(stop_queued_logging)
+    return _listener
+
+
+def stop_queued_logging():
+    """停止后台监听线程：写完队列中剩余的日志后关闭输出处理器（可重复调用）"""
+    global _listener
+    with _listener_lock:
+        listener, _listener = _listener, None
+    if listener is None:
+        return
+
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush()
+        handler.close()
@@ -1,6 +1,7 @@
 import sys
 import logging
 import os
+import threading
 from datetime import datetime
 from pathlib import Path
 import locale
@@ -113,6 +114,10 @@ script_dir = Path(__file__).parent.absolute()
 if str(script_dir) not in sys.path:
     sys.path.insert(0, str(script_dir))
 
+# 设置 MDA_STARTUP_PROFILE=1 时记录启动阶段和模块导入耗时（必须在其他导入之前）
+import startup_profile
+startup_profile.start_from_env()
+
 # 设置 GBK 编码（在所有导入之前）
 set_utf8_encoding()
     
@@ -120,21 +125,27 @@ print(f"脚本目录: {script_dir}")
 print(f"工作目录: {os.getcwd()}")
 print(f"Python 路径: {sys.path[:3]}")  # 只打印前3个
 
-from maa.agent.agent_server import AgentServer
-from maa.toolkit import Toolkit
+with startup_profile.phase("导入 maa"):
+    from maa.agent.agent_server import AgentServer
+    from maa.toolkit import Toolkit
 
-# 全局配置变量
-GAME_CONFIG = {
-    # "dodge_key": win32con.VK_RBUTTON  # 默认闪避键为 右键 (0x02)
-    "dodge_key": 160,  # 左 Shift 键 (0xA0)
-    "auto_battle_mode": 0  # 自动战斗模式：0=循环按E键, 1=什么也不做
-}
+from log_queue import start_queued_logging, stop_queued_logging
+from tracing import start_tracing_from_env, stop_tracing
 
 # 重要：必须在 AgentServer.start_up() 之前导入，以便装饰器注册自定义 Action 和 Recognition
-import my_action
-import my_reco
-import common
-import setting
+# （my_action 中的 PostMessage 动作只注册，实现模块在第一次执行或启动后的后台预加载时导入）
+with startup_profile.phase("注册自定义动作和识别"):
+    import my_action
+    import my_reco
+    import common
+    import setting
+
+import lazy_loader
+from storage import get_config_dir, read_json, atomic_write_json
+from held_keys import release_held_keys
+
+# 动作参数预校验结果缓存（资源包和代码都未变化时跳过预校验）
+PREVALIDATE_CACHE_FILE = "prevalidate_cache.json"
 
 
 def is_admin():
@@ -193,22 +204,20 @@ def setup_logging():
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     log_file = os.path.join(log_dir, f"agent_{timestamp}.log")
     
-    # 配置日志格式
-    log_format = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    # 配置日志格式（时间精确到毫秒，时间戳在发出日志时记录）
+    log_format = '%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s'
     date_format = '%Y-%m-%d %H:%M:%S'
-    
-    # 配置根日志记录器
-    logging.basicConfig(
-        level=logging.INFO,
-        format=log_format,
-        datefmt=date_format,
-        handlers=[
-            # 文件处理器
-            logging.FileHandler(log_file, encoding='utf-8'),
-            # 控制台处理器
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = logging.Formatter(log_format, datefmt=date_format)
+
+    # 文件处理器
+    file_handler = logging.FileHandler(log_file, encoding='utf-8')
+    # 控制台处理器
+    console_handler = logging.StreamHandler(sys.stdout)
+    for handler in (file_handler, console_handler):
+        handler.setFormatter(formatter)
+
+    # 根日志记录器只负责入队，文件和控制台写入在后台线程中执行
+    start_queued_logging([file_handler, console_handler], level=logging.INFO)
     
     logger = logging.getLogger(__name__)
     logger.info(f"日志系统已初始化，日志文件: {log_file}")
@@ -216,6 +225,108 @@ def setup_logging():
     return log_file
 
 
+def find_resource_bundle():
+    """
+    查找资源包目录和 interface.json
+
+    依次检查安装目录（agent 的上级目录）和开发目录（assets）
+
+    Returns:
+        (资源包目录列表, interface.json 路径)，未找到时返回 ([], None)
+    """
+    base_dir = Path(sys.executable).parent if getattr(sys, 'frozen', False) else Path(script_dir)
+    for root in (Path.cwd(), base_dir.parent, base_dir.parent / "assets"):
+        resource_dir = root / "resource"
+        if (resource_dir / "pipeline").is_dir():
+            interface_path = root / "interface.json"
+            return [resource_dir], interface_path if interface_path.exists() else None
+    return [], None
+
+
+def prevalidate_action_params(logger):
+    """
+    预校验资源包中全部自定义动作参数，有错误时输出错误日志并返回 False
+
+    参数结构声明在实现类上，调用前需要先导入全部延迟加载的动作（lazy_loader.preload）。
+    错误不阻止运行：参数有误的动作在执行时会再次校验失败，只影响对应的节点
+
+    pipeline、interface.json 和 agent 代码都与上次校验通过时相同时直接跳过
+    """
+    from action_params import prevalidate_bundle, bundle_fingerprint
+
+    resource_dirs, interface_path = find_resource_bundle()
+    if not resource_dirs:
+        logger.warning("[!] 未找到资源包目录，跳过动作参数预校验")
+        return True
+
+    if getattr(sys, 'frozen', False):
+        code_files = [Path(sys.executable)]
+    else:
+        code_files = sorted(Path(script_dir).rglob("*.py"))
+    fingerprint = bundle_fingerprint(resource_dirs, interface_path, code_files)
+    cache_path = get_config_dir() / PREVALIDATE_CACHE_FILE
+    if (read_json(cache_path) or {}).get("fingerprint") == fingerprint:
+        logger.info("资源包和代码未变化，跳过动作参数预校验")
+        return True
+
+    logger.info(f"预校验动作参数: {resource_dirs[0]}")
+    errors = prevalidate_bundle(resource_dirs, interface_path)
+    for error in errors:
+        logger.error(f"[X] {error}")
+    if errors:
+        return False
+
+    try:
+        atomic_write_json(cache_path, {"fingerprint": fingerprint})
+    except OSError as e:
+        logger.warning(f"[!] 保存预校验结果失败: {e}")
+    return True
+
+
+def preload_and_prevalidate(logger):
+    """
+    AgentServer 启动后在后台线程中执行：导入延迟加载的动作实现，再预校验动作参数
+
+    放在 start_up 之后，启动阶段不会为了参数结构而导入 postmessage / win32 等实现模块
+    """
+    lazy_loader.preload()
+    try:
+        params_ok = prevalidate_action_params(logger)
+    except Exception as e:
+        logger.error(f"[X] 预校验动作参数出错: {e}", exc_info=True)
+        return
+    if not params_ok:
+        logger.error("动作参数校验失败，请检查上述 pipeline 配置（相关节点执行时会失败）")
+
+
+def load_recognition_resources(logger):
+    """启动时加载自定义识别使用的模板（模板缓存、小地图模板索引）"""
+    from template_store import load_template_store
+    from minimap import load_minimap_index
+
+    resource_dirs, _ = find_resource_bundle()
+    if not resource_dirs:
+        logger.warning("[!] 未找到资源包目录，跳过模板加载")
+        return
+
+    try:
+        store = load_template_store(resource_dirs[0] / "image")
+        load_minimap_index(store)
+    except (OSError, ValueError) as e:
+        logger.error(f"[X] 加载模板失败: {e}", exc_info=True)
+
+
+def log_roi_stats(logger):
+    """输出自学习 ROI 的命中统计"""
+    from roi_cache import get_roi_cache
+
+    lines = get_roi_cache().summary_lines()
+    if lines:
+        logger.info("自学习 ROI 统计:")
+        for line in lines:
+            logger.info(f"  {line}")
+
+
 def main():
     # 检查管理员权限
     if not is_admin():
@@ -240,7 +351,8 @@ def main():
             sys.exit(1)
     
     # 初始化日志系统
-    log_file = setup_logging()
+    with startup_profile.phase("初始化日志"):
+        log_file = setup_logging()
     logger = logging.getLogger(__name__)
     
     logger.info("=" * 60)
@@ -249,9 +361,17 @@ def main():
     logger.info("[OK] 以管理员权限运行")
     logger.info(f"脚本目录: {script_dir}")
     logger.info(f"工作目录: {os.getcwd()}")
+
+    # 设置 MDA_TRACE=1 时记录耗时追踪
+    start_tracing_from_env()
+
+    # 加载上次保存的运行时配置（闪避键、自动战斗模式）
+    from runtime_config import get_runtime_config
+    logger.info(f"运行时配置: {get_runtime_config().as_dict()}")
     
 
-    Toolkit.init_option("./")
+    with startup_profile.phase("Toolkit.init_option"):
+        Toolkit.init_option("./")
 
     if len(sys.argv) < 2:
         logger.error("缺少 socket_id 参数")
@@ -262,10 +382,21 @@ def main():
     socket_id = sys.argv[-1]
     logger.info(f"Socket ID: {socket_id}")
 
+    with startup_profile.phase("加载模板"):
+        load_recognition_resources(logger)
+
     try:
         logger.info("启动 AgentServer...")
-        AgentServer.start_up(socket_id)
+        with startup_profile.phase("AgentServer.start_up"):
+            AgentServer.start_up(socket_id)
         logger.info("AgentServer 已启动，等待任务...")
+        startup_profile.mark("等待任务")
+        startup_profile.finish()
+
+        # 在等待任务期间预先导入延迟加载的动作实现并预校验参数，第一次执行时不必再等待导入
+        threading.Thread(target=preload_and_prevalidate, args=(logger,),
+                         name="LazyPreload", daemon=True).start()
+
         AgentServer.join()
         logger.info("AgentServer 正常退出")
     except Exception as e:
@@ -274,9 +405,16 @@ def main():
     finally:
         logger.info("关闭 AgentServer...")
         AgentServer.shut_down()
+        release_held_keys("agent 退出")
+        log_roi_stats(logger)
         logger.info("=" * 60)
         logger.info("MdaDuetAssistant Agent 已退出")
         logger.info("=" * 60)
+
+        stop_tracing()
+
+        # 写完剩余日志并停止后台日志线程
+        stop_queued_logging()
         
         # 还原原始编码
         restore_original_encoding()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+小地图分类模块
+启动时把 image/jjb/ 下的全部小地图模板预处理为一个特征矩阵，
+识别时对小地图 ROI 做一次批量归一化互相关（见 template_match），
+一次得到最匹配的模板和置信度，代替逐个节点级联的模板匹配
+"""
+
+import threading
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from image_io import downscale
+from template_match import BatchTemplateMatcher
+from template_store import TemplateStore
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 小地图模板目录（相对资源包 image 目录）
+MINIMAP_TEMPLATE_DIR = "jjb"
+
+
+class MinimapMatch(NamedTuple):
+    """分类结果"""
+    label: str                               # 模板路径（与 pipeline 中的 template 写法一致）
+    confidence: float                        # 全分辨率归一化相关系数（与 TemplateMatch method 5 一致）
+    box: Tuple[int, int, int, int]           # 匹配位置（相对 ROI 的 x, y, w, h）
+    scores: Dict[str, float]                 # 各候选的最佳得分
+
+
+class MinimapIndex:
+    """
+    小地图模板索引
+    所有模板需为相同尺寸，预先计算好批量匹配所需的模板数据
+    """
+
+    def __init__(self, templates: Dict[str, np.ndarray]):
+        """
+        Args:
+            templates: 模板路径 -> 灰度模板（float32，尺寸相同）
+        """
+        if not templates:
+            raise ValueError("没有可用的小地图模板")
+
+        shapes = {gray.shape for gray in templates.values()}
+        if len(shapes) != 1:
+            raise ValueError(f"小地图模板尺寸不一致: {sorted(shapes)}")
+
+        self.labels: List[str] = sorted(templates)
+        self.template_shape: Tuple[int, int] = shapes.pop()
+        self._matcher = BatchTemplateMatcher(templates)
+        self._lock = threading.Lock()
+        self._last_key = None
+        self._last_match: Optional[MinimapMatch] = None
+
+    @classmethod
+    def from_store(cls, store: TemplateStore, subdir: str = MINIMAP_TEMPLATE_DIR) -> "MinimapIndex":
+        """从模板缓存中取出 subdir 下的全部模板"""
+        prefix = subdir.rstrip("/") + "/"
+        return cls({path: store.get(path) for path in store.paths if path.startswith(prefix)})
+
+    def classify(self, gray_roi: np.ndarray, candidates: Optional[Sequence[str]] = None) -> Optional[MinimapMatch]:
+        """
+        在 ROI 中一次性比较所有候选模板
+
+        Args:
+            gray_roi: ROI 灰度图（float32）
+            candidates: 候选模板路径，None 表示全部
+
+        Returns:
+            最匹配的模板，ROI 小于模板时返回 None
+        """
+        th, tw = self.template_shape
+        if gray_roi.shape[0] < th or gray_roi.shape[1] < tw:
+            return None
+
+        labels = tuple(self.labels if candidates is None else candidates)
+        unknown = [label for label in labels if label not in self._matcher.labels]
+        if unknown:
+            raise KeyError(unknown[0])
+
+        key = (gray_roi.shape, labels, downscale(gray_roi, 8).tobytes())
+        with self._lock:
+            if key == self._last_key:
+                return self._last_match
+
+        ranking = self._matcher.match(gray_roi, labels)
+        best = ranking[0]
+        match = MinimapMatch(
+            label=best.label,
+            confidence=best.score,
+            box=best.box,
+            scores={result.label: result.score for result in ranking},
+        )
+        with self._lock:
+            self._last_key = key
+            self._last_match = match
+        return match
+
+
+_minimap_index: Optional[MinimapIndex] = None
+
+
+def load_minimap_index(store: TemplateStore) -> MinimapIndex:
+    """启动时从模板缓存构建小地图模板索引"""
+    global _minimap_index
+    _minimap_index = MinimapIndex.from_store(store)
+    logger.info(f"[Minimap] 已加载 {len(_minimap_index.labels)} 个小地图模板 "
+                f"({_minimap_index.template_shape[1]}x{_minimap_index.template_shape[0]})")
+    return _minimap_index
+
+
+def get_minimap_index() -> Optional[MinimapIndex]:
+    """获取已加载的小地图模板索引，未加载时返回 None"""
+    return _minimap_index
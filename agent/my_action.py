@@ -1,12 +1,7 @@
-﻿from maa.agent.agent_server import AgentServer
-from maa.custom_action import CustomAction
-from maa.context import Context
-import time
-import logging
-import json
+﻿import logging
 
-# 导入 PostMessage 相关的自定义动作
-from postmessage.actions import RunWithShift, LongPressKey, PressMultipleKeys, RunWithJump
+# PostMessage 相关的自定义动作在第一次执行时才导入 postmessage（及 win32 模块）
+from lazy_loader import LazyAction, lazy_action
 
 # 获取日志记录器
 logger = logging.getLogger(__name__)
@@ -15,8 +10,8 @@ logger = logging.getLogger(__name__)
 
 # ========== PostMessage 按键输入动作（支持扫描码） ==========
 
-@AgentServer.custom_action("RunWithShift")
-class RunWithShiftAction(RunWithShift):
+@lazy_action("RunWithShift", "postmessage.actions", "RunWithShift")
+class RunWithShiftAction(LazyAction):
     """
     奔跑动作：先按下方向键，再按下 Shift，保持指定时长
     使用 PostMessage + 扫描码实现，兼容性更好
@@ -31,8 +26,8 @@ class RunWithShiftAction(RunWithShift):
     pass
 
 
-@AgentServer.custom_action("LongPressKey")
-class LongPressKeyAction(LongPressKey):
+@lazy_action("LongPressKey", "postmessage.actions", "LongPressKey")
+class LongPressKeyAction(LazyAction):
     """
     长按单个按键
     使用 PostMessage + 扫描码实现
@@ -46,8 +41,8 @@ class LongPressKeyAction(LongPressKey):
     pass
 
 
-@AgentServer.custom_action("PressMultipleKeys")
-class PressMultipleKeysAction(PressMultipleKeys):
+@lazy_action("PressMultipleKeys", "postmessage.actions", "PressMultipleKeys")
+class PressMultipleKeysAction(LazyAction):
     """
     同时按下多个按键
     使用 PostMessage + 扫描码实现
@@ -61,8 +56,8 @@ class PressMultipleKeysAction(PressMultipleKeys):
     pass
 
 
-@AgentServer.custom_action("RunWithJump")
-class RunWithJumpAction(RunWithJump):
+@lazy_action("RunWithJump", "postmessage.actions", "RunWithJump")
+class RunWithJumpAction(LazyAction):
     """
     边跑边跳动作：先按下方向键，延迟后按下闪避键（奔跑），然后周期性短按空格键（跳跃）
     使用 PostMessage + 扫描码实现
@@ -77,3 +72,22 @@ class RunWithJumpAction(RunWithJump):
     }
     """
     pass
+
+
+@lazy_action("RouteMacro", "postmessage.actions", "RouteMacro")
+class RouteMacroAction(LazyAction):
+    """
+    路线宏：将连续的移动节点合并为一条时间线执行
+    由 compile_routes.py（手动运行的编译工具）生成，一般无需手写
+    
+    参数示例：
+    {
+        "steps": [
+            ["LongPressKey", {"key": "d", "duration": 2.2}],
+            ["RunWithShift", {"direction": "w", "duration": 8.7}],
+            ["Wait", 2.0]
+        ],
+        "source_nodes": ["mediate_a1", "mediate_a2"]
+    }
+    """
+    pass
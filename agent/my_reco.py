@@ -1,6 +1,16 @@
 from maa.agent.agent_server import AgentServer
 from maa.custom_recognition import CustomRecognition
 from maa.context import Context
+import json
+import logging
+from action_params import ParamSchema, Field, ParamError
+from roi_cache import get_roi_cache
+from minimap import get_minimap_index
+from image_io import to_gray
+import tracing
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
 
 
 @AgentServer.custom_recognition("my_reco_222")
@@ -35,3 +45,104 @@ class MyRecongition(CustomRecognition):
         return CustomRecognition.AnalyzeResult(
             box=(0, 0, 100, 100), detail="Hello World!"
         )
+
+
+@AgentServer.custom_recognition("LearnedRoi")
+class LearnedRoiRecognition(CustomRecognition):
+    """
+    自学习 ROI 识别
+    执行参数中指定的识别节点：先在该 pipeline 节点学习到的 ROI 内识别，未命中时回退到全屏识别
+
+    参数说明：
+    {
+        "node": "OCR_GiveUp"  // 实际执行识别的节点
+    }
+    """
+
+    PARAM_SCHEMA = ParamSchema(
+        "LearnedRoi",
+        Field("node", str),
+    )
+
+    @tracing.traced("recognition")
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+        try:
+            params = self.PARAM_SCHEMA.parse(argv.custom_recognition_param)
+        except ParamError as e:
+            logger.error(f"[LearnedRoi] 参数错误: {e}")
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        reco_result = get_roi_cache().recognize(context, argv.node_name, params["node"], argv.image)
+        if not reco_result or not reco_result.box or reco_result.box.w == 0:
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        box = reco_result.box
+        return CustomRecognition.AnalyzeResult(
+            box=(box.x, box.y, box.w, box.h), detail=params["node"]
+        )
+
+
+@AgentServer.custom_recognition("MinimapClassify")
+class MinimapClassifyRecognition(CustomRecognition):
+    """
+    小地图分类识别
+    在节点 roi 内一次性比较全部候选小地图模板，最匹配的模板为 expected 且置信度达到阈值时命中。
+    同一帧上的兄弟节点（如 coin_is_map_a / coin_is_map_b）共用同一次分类结果
+
+    参数说明：
+    {
+        "expected": "jjb/map_a/皎皎币70-a-map.png",      // 本节点对应的模板
+        "candidates": ["jjb/map_a/皎皎币70-a-map.png",   // 参与比较的模板（可选，默认全部）
+                       "jjb/map_b/皎皎币70-b-map.png"],
+        "threshold": 0.8                                // 置信度阈值（与 TemplateMatch method 5 一致）
+    }
+    """
+
+    PARAM_SCHEMA = ParamSchema(
+        "MinimapClassify",
+        Field("expected", str),
+        Field("candidates", list, ()),
+        Field("threshold", float, 0.8, check=lambda v: 0 < v <= 1),
+    )
+
+    @tracing.traced("recognition")
+    def analyze(
+        self,
+        context: Context,
+        argv: CustomRecognition.AnalyzeArg,
+    ) -> CustomRecognition.AnalyzeResult:
+        try:
+            params = self.PARAM_SCHEMA.parse(argv.custom_recognition_param)
+        except ParamError as e:
+            logger.error(f"[MinimapClassify] 参数错误: {e}")
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        index = get_minimap_index()
+        if index is None:
+            logger.error("[MinimapClassify] 小地图模板索引未加载")
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        roi = argv.roi
+        x0, y0 = roi.x, roi.y
+        image = argv.image[y0:y0 + roi.h, x0:x0 + roi.w] if roi.w > 0 and roi.h > 0 else argv.image
+        try:
+            match = index.classify(to_gray(image, rgb=False), params["candidates"] or None)
+        except KeyError as e:
+            logger.error(f"[MinimapClassify] 未知的候选模板: {e}")
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+        if match is None:
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        logger.info(f"[MinimapClassify] {argv.node_name}: 最匹配 '{match.label}'，置信度 {match.confidence:.3f}")
+        if match.label != params["expected"] or match.confidence < params["threshold"]:
+            return CustomRecognition.AnalyzeResult(box=None, detail="")
+
+        x, y, w, h = match.box
+        return CustomRecognition.AnalyzeResult(
+            box=(x0 + x, y0 + y, w, h),
+            detail=json.dumps({"label": match.label, "confidence": match.confidence}, ensure_ascii=False),
+        )
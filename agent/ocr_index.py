@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+每帧共享的 OCR 文字索引
+同一画面只做一次全屏 OCR，"某段文字是否存在 / 在哪里"的查询都从内存索引中回答。
+索引按帧签名区分，新截图的内容与当前索引的帧不同时自动失效
+"""
+
+import re
+import threading
+import logging
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from frame_gate import frame_signature
+import tracing
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 全屏 OCR 节点（不设置 expected，返回画面中的全部文字）
+OCR_ALL_NODE = "OCR_All"
+
+
+class OcrEntry(NamedTuple):
+    """索引中的一条文字"""
+    text: str
+    box: Tuple[int, int, int, int]   # (x, y, w, h)
+    score: float
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        x, y, w, h = self.box
+        return x + w // 2, y + h // 2
+
+
+class OcrIndex:
+    """
+    OCR 文字索引
+    update() 传入每次新截的图，内容变化时重新 OCR；find()/contains() 按正则查询当前帧
+    """
+
+    def __init__(self, node: str = OCR_ALL_NODE):
+        """
+        Args:
+            node: 全屏 OCR 节点名称
+        """
+        self.node = node
+        self.entries: List[OcrEntry] = []
+        self.ocr_runs = 0
+        self.reuses = 0
+        self._key: Optional[bytes] = None
+        self._lock = threading.Lock()
+
+    def update(self, context, image: np.ndarray) -> bool:
+        """
+        用新截图更新索引
+
+        Returns:
+            True 表示执行了 OCR，False 表示画面未变化，沿用当前索引
+        """
+        key = frame_signature(image).tobytes() + bytes(str(image.shape), "ascii")
+        with self._lock:
+            if key == self._key:
+                self.reuses += 1
+                return False
+
+            with tracing.span("run_recognition", "recognition", node=self.node):
+                reco_result = context.run_recognition(self.node, image)
+            results = reco_result.all_results if reco_result else []
+            self.entries = [
+                OcrEntry(result.text, (result.box.x, result.box.y, result.box.w, result.box.h), result.score)
+                for result in results
+                if result.text
+            ]
+            self._key = key
+            self.ocr_runs += 1
+
+        logger.debug(f"[OcrIndex] 第 {self.ocr_runs} 次 OCR，识别到 {len(self.entries)} 段文字")
+        return True
+
+    def invalidate(self):
+        """清空索引，下一次 update 必定重新 OCR"""
+        with self._lock:
+            self._key = None
+            self.entries = []
+
+    def find_all(self, pattern: str) -> List[OcrEntry]:
+        """查询匹配正则的全部文字，按置信度从高到低排列"""
+        regex = re.compile(pattern)
+        matches = [entry for entry in self.entries if regex.search(entry.text)]
+        return sorted(matches, key=lambda entry: entry.score, reverse=True)
+
+    def find(self, pattern: str) -> Optional[OcrEntry]:
+        """查询匹配正则、置信度最高的文字，不存在时返回 None"""
+        matches = self.find_all(pattern)
+        return matches[0] if matches else None
+
+    def contains(self, pattern: str) -> bool:
+        """当前帧是否存在匹配正则的文字"""
+        return self.find(pattern) is not None
+
+    def summary(self) -> str:
+        """单行统计，用于日志输出"""
+        return f"OCR {self.ocr_runs} 次，复用 {self.reuses} 次"
+
+
+_ocr_index: Optional[OcrIndex] = None
+_ocr_index_lock = threading.Lock()
+
+
+def get_ocr_index() -> OcrIndex:
+    """获取进程内共享的 OCR 文字索引"""
+    global _ocr_index
+    with _ocr_index_lock:
+        if _ocr_index is None:
+            _ocr_index = OcrIndex()
+        return _ocr_index
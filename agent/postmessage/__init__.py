@@ -4,12 +4,22 @@ PostMessage 输入模块
 """
 
 from .input_helper import PostMessageInputHelper
-from .actions import GameWindowAction, RunWithShift, LongPressKey, PressMultipleKeys
+from .scheduler import KeyEvent, InputTimeline, TimelineScheduler, TimelineReport
+from .window_cache import WindowHandleCache, get_window_cache
+from .actions import GameWindowAction, RunWithShift, LongPressKey, PressMultipleKeys, RunWithJump, RouteMacro
 
 __all__ = [
     'PostMessageInputHelper',
+    'KeyEvent',
+    'InputTimeline',
+    'TimelineScheduler',
+    'TimelineReport',
+    'WindowHandleCache',
+    'get_window_cache',
     'GameWindowAction',
     'RunWithShift',
     'LongPressKey',
     'PressMultipleKeys',
+    'RunWithJump',
+    'RouteMacro',
 ]
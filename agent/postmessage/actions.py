@@ -3,25 +3,46 @@ PostMessage 自定义动作
 基于 PostMessage + 扫描码实现的游戏控制动作
 """
 
-import json
 import logging
-import time
 from maa.custom_action import CustomAction
 from maa.context import Context
 from .input_helper import PostMessageInputHelper
+from .scheduler import InputTimeline, TimelineScheduler, TimelineReport
+from .window_cache import get_window_cache
+from typing import Mapping, Optional, Tuple
 import win32con
-import win32gui
-import sys
-import os
-
-# 导入主模块来访问全局配置
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-import main
+from action_params import ParamSchema, Field, ParamError
+from runtime_config import get_runtime_config
+from held_keys import get_held_keys, release_held_keys
+import tracing
 
 logger = logging.getLogger(__name__)
 
 # 注意：闪避键现在直接使用虚拟键码(int),无需映射
 
+# 下一个节点开头多久内按下的键可以沿用上一个动作保持的按键（秒）
+CARRY_WINDOW = 0.1
+# 沿用按键后，保持时长超出可扣除部分多少时输出警告（秒）
+CARRY_EXCESS_WARNING = 0.05
+# 保持按键时，在节点切换间隔（post_delay + pre_delay）之外额外等待下一个动作接管的时间（秒）
+CARRY_MARGIN = 1.0
+
+
+def _node_custom_action(data: dict) -> Tuple[Optional[str], object]:
+    """从节点数据中取出 (自定义动作名称, 参数)，兼容 pipeline 写法和框架导出的 action.param 写法"""
+    action = data.get("action")
+    if isinstance(action, dict):
+        param = action.get("param") or {}
+        return param.get("custom_action"), param.get("custom_action_param", {})
+    return data.get("custom_action"), data.get("custom_action_param", {})
+
+
+def _node_recognition(data: dict) -> Optional[str]:
+    recognition = data.get("recognition", "DirectHit")
+    if isinstance(recognition, dict):
+        return recognition.get("type", "DirectHit")
+    return recognition
+
 
 class GameWindowAction(CustomAction):
     """
@@ -36,7 +57,8 @@ class GameWindowAction(CustomAction):
         """
         获取窗口句柄（通用方法）
         
-        优先查找包含 WINDOW_TITLE_KEYWORDS 中任一关键字的窗口
+        查找包含 WINDOW_TITLE_KEYWORDS 中任一关键字的窗口；
+        句柄在进程内缓存，仅在窗口失效或标题不再匹配时重新查找
         
         Args:
             context: MaaFramework 上下文
@@ -44,38 +66,100 @@ class GameWindowAction(CustomAction):
         Returns:
             窗口句柄，如果获取失败返回 0
         """
+        hwnd = get_window_cache(self.WINDOW_TITLE_KEYWORDS).get()
+        if not hwnd:
+            release_held_keys("无法获取窗口句柄")
+        return hwnd
+    
+    def _next_timeline(self, context: Context, node_name: str) -> Tuple[Optional[InputTimeline], float]:
+        """
+        前瞻下一个节点：当前节点的第一个 next 是直接命中的移动动作时，构造它的按键时间线
+        
+        Args:
+            context: MaaFramework 上下文
+            node_name: 当前节点名
+            
+        Returns:
+            (下一个节点的时间线, 节点切换间隔 post_delay + pre_delay（秒）)，无法确定时时间线为 None
+        """
+        if context is None or not node_name:
+            return None, 0.0
         try:
-            # 方法 1: 精确匹配 - 遍历所有关键字
-            for keyword in self.WINDOW_TITLE_KEYWORDS:
-                hwnd = win32gui.FindWindow(None, keyword)
-                if hwnd and win32gui.IsWindow(hwnd):
-                    logger.info(f"[_get_window_handle] [OK] 找到「{keyword}」窗口: {hwnd} (0x{hwnd:08X})")
-                    return hwnd
-            
-            # 方法 2: 模糊匹配 - 枚举所有窗口查找包含任一关键字的
-            def find_window_callback(hwnd, param):
-                if win32gui.IsWindowVisible(hwnd):
-                    title = win32gui.GetWindowText(hwnd)
-                    for keyword in self.WINDOW_TITLE_KEYWORDS:
-                        if keyword in title:
-                            param.append((hwnd, keyword, title))
-                            return
-            
-            found_windows = []
-            win32gui.EnumWindows(find_window_callback, found_windows)
-            
-            if found_windows:
-                hwnd, keyword, title = found_windows[0]
-                logger.info(f"[_get_window_handle] [OK] 找到包含「{keyword}」的窗口: {hwnd} (0x{hwnd:08X})")
-                logger.info(f"[_get_window_handle] 窗口标题: '{title}'")
-                return hwnd
-            
-            logger.error(f"[_get_window_handle] 未找到包含 {self.WINDOW_TITLE_KEYWORDS} 中任一关键字的窗口")
-            return 0
+            data = context.get_node_data(node_name) or {}
+            next_list = data.get("next") or []
+            if isinstance(next_list, (str, dict)):
+                next_list = [next_list]
+            if not next_list:
+                return None, 0.0
+            next_name = next_list[0].get("name") if isinstance(next_list[0], dict) else next_list[0]
+            
+            next_data = context.get_node_data(next_name) or {}
+            if next_data.get("enabled", True) is False or _node_recognition(next_data) != "DirectHit":
+                return None, 0.0
+            action_name, param = _node_custom_action(next_data)
+            action_class = LOOKAHEAD_ACTIONS.get(action_name)
+            if action_class is None:
+                return None, 0.0
+            
+            next_timeline = action_class.build_timeline(
+                action_class.PARAM_SCHEMA.parse(param), get_runtime_config().dodge_key
+            )
+            gap = (data.get("post_delay", 200) + next_data.get("pre_delay", 200)) / 1000
+            return next_timeline, gap
+        except (ParamError, ValueError, TypeError, AttributeError) as e:
+            logger.debug(f"[HeldKeys] 前瞻 '{node_name}' 的下一个节点失败: {e}")
+            return None, 0.0
+    
+    def _play_timeline(self, input_helper: PostMessageInputHelper, timeline: InputTimeline, tag: str,
+                       context: Optional[Context] = None, node_name: str = "") -> TimelineReport:
+        """
+        通过时间线调度器发送整条按键时间线
+        
+        与上一个/下一个移动节点之间只发送按键差异：沿用上一个动作保持的按键（跳过开头的按下，
+        并把时间线提前已保持的时长，总按键时长不变），结尾保留下一个节点开头也要按下的按键
+        （跳过结尾的释放），交给 held_keys 保持。
+        只保持下一个节点能按原顺序沿用（见 InputTimeline.carry_keys）、且节点切换间隔能完全
+        从下一个节点开头扣除的按键，不会只按着闪避键等待方向键，也不会多走一段
+        
+        Args:
+            input_helper: 输入辅助对象
+            timeline: 按键时间线
+            tag: 日志前缀（动作名称）
+            context: MaaFramework 上下文（用于前瞻下一个节点，None 表示不保持按键）
+            node_name: 当前节点名
             
-        except Exception as e:
-            logger.error(f"[_get_window_handle] 获取窗口句柄失败: {e}", exc_info=True)
-            return 0
+        Returns:
+            执行报告（包含每个事件的发送延迟）
+        """
+        held_keys = get_held_keys()
+        adopted, held_for = held_keys.take(input_helper, timeline.carry_keys(held_keys.keys, CARRY_WINDOW))
+        if adopted:
+            timeline = timeline.without_leading_presses(adopted)
+            # 节点切换间隔中这些按键一直按着，从时间线开头扣除，保持总按键时长不变
+            excess = held_for - timeline.first_release
+            timeline = timeline.advanced(held_for)
+            if excess > CARRY_EXCESS_WARNING:
+                logger.warning(f"[{tag}] 沿用按键保持了 {held_for:.3f}秒，其中 {excess:.3f}秒无法扣除")
+        
+        keep = frozenset()
+        next_timeline, gap = self._next_timeline(context, node_name)
+        if next_timeline is not None:
+            keep = next_timeline.carry_keys(timeline.trailing_keys(), CARRY_WINDOW)
+            # 下一个节点在切换间隔的时长内就有按键释放时无法完整扣除，不保持
+            if keep and next_timeline.without_leading_presses(keep).first_release < gap:
+                logger.debug(f"[HeldKeys] 下一个节点 {gap:.3f}秒内有按键释放，无法扣除保持时长，不保持按键")
+                keep = frozenset()
+        if keep:
+            timeline = timeline.without_final_releases(keep)
+        
+        # 调度器在取消或出错时释放全部按下的按键（含沿用的按键），正常完成时保留 keep
+        with tracing.span("timeline", "input", tag=tag, events=len(timeline.events)):
+            report = TimelineScheduler(input_helper).run(timeline, held=adopted, keep_pressed=keep)
+        if report.completed:
+            held_keys.hold(input_helper, keep, gap + CARRY_MARGIN, context.tasker if context is not None else None)
+        
+        logger.info(f"[{tag}] 时间线完成: {report.summary()}")
+        return report
 
 
 def debug_controller_attributes(ctrl, logger_instance=None):
@@ -151,38 +235,39 @@ class RunWithShift(GameWindowAction):
     {
         "direction": "w",      // 方向键：'w', 'a', 's', 'd' 或 'up', 'down', 'left', 'right'
         "duration": 2.0,       // 持续时长（秒）
-        "dodge_delay": 0.05    // 按下方向键后,多久按下闪避键（秒）,默认 0.05
+        "dodge_delay": 0.05    // 按下方向键后,多久按下闪避键（秒）,默认 0.05（兼容旧字段名 shift_delay）
     }
     
-    注意：使用的闪避键从全局配置 main.GAME_CONFIG["dodge_key"] 中读取
+    注意：使用的闪避键从运行时配置（runtime_config.dodge_key）中读取
     """
     
+    PARAM_SCHEMA = ParamSchema(
+        "RunWithShift",
+        Field("direction", str, "w", convert=PostMessageInputHelper.get_direction_vk, dest="direction_vk"),
+        Field("duration", float, 2.0, check=lambda v: v >= 0),
+        Field("dodge_delay", float, 0.05, aliases=("shift_delay",), check=lambda v: v >= 0),
+    )
+    
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 解析参数
+        # 解析参数（按参数字符串缓存）
         try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[RunWithShift] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[RunWithShift] JSON 解析失败: {e}")
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[RunWithShift] 参数错误: {e}")
             logger.error(f"  参数内容: {argv.custom_action_param}")
             return False
         
-        # 获取参数
-        direction = params.get("direction", "w")
-        duration = params.get("duration", 2.0)
-        dodge_delay = params.get("dodge_delay", 0.05)
+        direction = params["direction"]
+        duration = params["duration"]
+        dodge_delay = params["dodge_delay"]
         
         # 从全局配置获取闪避键(现在是虚拟键码 int)
-        dodge_vk = main.GAME_CONFIG.get("dodge_key", win32con.VK_SHIFT)
+        dodge_vk = get_runtime_config().dodge_key
         
         logger.info("=" * 60)
         logger.info(f"[RunWithShift] 开始奔跑")
@@ -207,35 +292,11 @@ class RunWithShift(GameWindowAction):
             # 创建输入辅助对象
             input_helper = PostMessageInputHelper(hwnd)
             
-            # 获取方向键的虚拟键码
-            direction_vk = input_helper.get_direction_vk(direction)
+            logger.info(f"[RunWithShift] 方向键 VK={params['direction_vk']}, 闪避键 VK={dodge_vk}")
             
-            logger.info(f"[RunWithShift] 方向键 VK={direction_vk}, 闪避键 VK={dodge_vk}")
+            timeline = self.build_timeline(params, dodge_vk)
             
-            # 1. 按下方向键
-            logger.info(f"[RunWithShift] 步骤 1: 按下方向键 '{direction}'")
-            input_helper.key_down(direction_vk, activate=True)
-            
-            # 2. 短暂延迟
-            if dodge_delay > 0:
-                logger.debug(f"[RunWithShift] 等待 {dodge_delay:.3f}秒...")
-                time.sleep(dodge_delay)
-            
-            # 3. 按下闪避键
-            logger.info(f"[RunWithShift] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
-            input_helper.key_down(dodge_vk, activate=False)
-            
-            # 4. 保持按下状态
-            logger.info(f"[RunWithShift] 步骤 3: 保持 {duration:.2f}秒...")
-            time.sleep(duration)
-            
-            # 5. 释放闪避键
-            logger.info(f"[RunWithShift] 步骤 4: 释放闪避键")
-            input_helper.key_up(dodge_vk)
-            
-            # 6. 释放方向键
-            logger.info(f"[RunWithShift] 步骤 5: 释放方向键")
-            input_helper.key_up(direction_vk)
+            self._play_timeline(input_helper, timeline, "RunWithShift", context, argv.node_name)
             
             logger.info(f"[RunWithShift] [OK] 完成奔跑 {duration:.2f}秒")
             logger.info("=" * 60)
@@ -245,6 +306,26 @@ class RunWithShift(GameWindowAction):
         except Exception as e:
             logger.error(f"[RunWithShift] 发生异常: {e}", exc_info=True)
             return False
+    
+    @classmethod
+    def build_timeline(cls, params: Mapping, dodge_vk: int) -> InputTimeline:
+        """
+        构造奔跑的按键时间线：按下方向键 -> 延迟后按下闪避键 -> 保持 -> 释放闪避键 -> 释放方向键
+        
+        Args:
+            params: 已校验的动作参数（PARAM_SCHEMA.parse 的结果）
+            dodge_vk: 闪避键虚拟键码
+        """
+        direction_vk = params["direction_vk"]
+        duration = params["duration"]
+        dodge_delay = params["dodge_delay"]
+        
+        timeline = InputTimeline()
+        timeline.key_down(0.0, direction_vk)
+        timeline.key_down(dodge_delay, dodge_vk)
+        timeline.key_up(dodge_delay + duration, dodge_vk)
+        timeline.key_up(dodge_delay + duration, direction_vk)
+        return timeline
 
 
 class LongPressKey(GameWindowAction):
@@ -253,36 +334,32 @@ class LongPressKey(GameWindowAction):
     
     参数说明：
     {
-        "key": "w",           // 按键：字符或虚拟键码
+        "key": "w",           // 按键：字符、特殊键名称（如 'space'）或虚拟键码
         "duration": 2.0       // 持续时长（秒）
     }
     """
     
+    PARAM_SCHEMA = ParamSchema(
+        "LongPressKey",
+        Field("key", (str, int), convert=PostMessageInputHelper.resolve_key, dest="vk_code"),
+        Field("duration", float, 1.0, check=lambda v: v >= 0),
+    )
+    
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 解析参数
+        # 解析参数（按参数字符串缓存）
         try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[LongPressKey] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[LongPressKey] JSON 解析失败: {e}")
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[LongPressKey] 参数错误: {e}")
             return False
         
-        # 获取参数
-        key = params.get("key")
-        duration = params.get("duration", 1.0)
-        
-        if not key:
-            logger.error("[LongPressKey] 缺少参数 'key'")
-            return False
+        key = params["key"]
+        duration = params["duration"]
         
         logger.info(f"[LongPressKey] 长按键 '{key}' 持续 {duration:.2f}秒")
         
@@ -296,17 +373,9 @@ class LongPressKey(GameWindowAction):
             # 创建输入辅助对象
             input_helper = PostMessageInputHelper(hwnd)
             
-            # 转换为虚拟键码
-            if isinstance(key, str) and len(key) == 1:
-                vk_code = input_helper.char_to_vk(key)
-            elif isinstance(key, int):
-                vk_code = key
-            else:
-                logger.error(f"[LongPressKey] 不支持的键类型: {key}")
-                return False
-            
             # 执行长按
-            input_helper.long_press_key(vk_code, duration)
+            timeline = self.build_timeline(params)
+            self._play_timeline(input_helper, timeline, "LongPressKey", context, argv.node_name)
             
             logger.info(f"[LongPressKey] [OK] 完成长按")
             return True
@@ -314,6 +383,17 @@ class LongPressKey(GameWindowAction):
         except Exception as e:
             logger.error(f"[LongPressKey] 发生异常: {e}", exc_info=True)
             return False
+    
+    @classmethod
+    def build_timeline(cls, params: Mapping, dodge_vk: int = 0) -> InputTimeline:
+        """
+        构造长按的按键时间线
+        
+        Args:
+            params: 已校验的动作参数（PARAM_SCHEMA.parse 的结果）
+            dodge_vk: 未使用，与其他移动动作保持相同签名
+        """
+        return InputTimeline().press(0.0, params["vk_code"], params["duration"])
 
 
 class PressMultipleKeys(GameWindowAction):
@@ -322,39 +402,36 @@ class PressMultipleKeys(GameWindowAction):
     
     参数说明：
     {
-        "keys": ["w", "shift"],  // 按键列表
+        "keys": ["w", "shift"],  // 按键列表：字符、特殊键名称或虚拟键码
         "duration": 2.0          // 持续时长（秒）
     }
     """
     
+    PARAM_SCHEMA = ParamSchema(
+        "PressMultipleKeys",
+        Field("keys", list, check=lambda v: len(v) > 0,
+              convert=lambda keys: tuple(PostMessageInputHelper.resolve_key(key) for key in keys), dest="vk_codes"),
+        Field("duration", float, 1.0, check=lambda v: v >= 0),
+    )
+    
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 解析参数
+        # 解析参数（按参数字符串缓存，按键名称已预先转换为虚拟键码）
         try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[PressMultipleKeys] 参数类型错误")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[PressMultipleKeys] JSON 解析失败: {e}")
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[PressMultipleKeys] 参数错误: {e}")
             return False
         
-        # 获取参数
-        keys = params.get("keys", [])
-        duration = params.get("duration", 1.0)
-        
-        if not keys:
-            logger.error("[PressMultipleKeys] 缺少参数 'keys'")
-            return False
+        keys = params["keys"]
+        duration = params["duration"]
         
         logger.info(f"[PressMultipleKeys] 同时按下 {len(keys)} 个键，持续 {duration:.2f}秒")
-        logger.info(f"  按键列表: {keys}")
+        logger.info(f"  按键列表: {list(keys)}")
         
         try:
             # 获取窗口句柄
@@ -366,36 +443,9 @@ class PressMultipleKeys(GameWindowAction):
             # 创建输入辅助对象
             input_helper = PostMessageInputHelper(hwnd)
             
-            # 转换为虚拟键码列表
-            vk_codes = []
-            for key in keys:
-                if isinstance(key, str):
-                    if len(key) == 1:
-                        vk = input_helper.char_to_vk(key)
-                    else:
-                        # 特殊键名称
-                        key_lower = key.lower()
-                        if key_lower == 'shift':
-                            vk = win32con.VK_SHIFT
-                        elif key_lower == 'ctrl':
-                            vk = win32con.VK_CONTROL
-                        elif key_lower == 'alt':
-                            vk = win32con.VK_MENU
-                        elif key_lower == 'space':
-                            vk = win32con.VK_SPACE
-                        else:
-                            logger.error(f"[PressMultipleKeys] 不支持的键名称: {key}")
-                            return False
-                elif isinstance(key, int):
-                    vk = key
-                else:
-                    logger.error(f"[PressMultipleKeys] 不支持的键类型: {key}")
-                    return False
-                
-                vk_codes.append(vk)
-            
-            # 执行同时按键
-            input_helper.press_multiple_keys(vk_codes, duration)
+            # 执行同时按键：同一时刻按下所有键，保持后同时释放
+            timeline = self.build_timeline(params)
+            self._play_timeline(input_helper, timeline, "PressMultipleKeys", context, argv.node_name)
             
             logger.info(f"[PressMultipleKeys] [OK] 完成同时按键")
             return True
@@ -403,6 +453,25 @@ class PressMultipleKeys(GameWindowAction):
         except Exception as e:
             logger.error(f"[PressMultipleKeys] 发生异常: {e}", exc_info=True)
             return False
+    
+    @classmethod
+    def build_timeline(cls, params: Mapping, dodge_vk: int = 0) -> InputTimeline:
+        """
+        构造同时按键的时间线：同一时刻按下所有键，保持后同时释放
+        
+        Args:
+            params: 已校验的动作参数（PARAM_SCHEMA.parse 的结果）
+            dodge_vk: 未使用，与其他移动动作保持相同签名
+        """
+        vk_codes = params["vk_codes"]
+        duration = params["duration"]
+        
+        timeline = InputTimeline()
+        for vk in vk_codes:
+            timeline.key_down(0.0, vk)
+        for vk in vk_codes:
+            timeline.key_up(duration, vk)
+        return timeline
 
 
 class RunWithJump(GameWindowAction):
@@ -418,37 +487,44 @@ class RunWithJump(GameWindowAction):
         "jump_press_time": 0.1   // 每次跳跃按键时长（秒），默认 0.1 秒
     }
     
-    注意：使用的闪避键从全局配置 main.GAME_CONFIG["dodge_key"] 中读取
+    注意：使用的闪避键从运行时配置（runtime_config.dodge_key）中读取
+    跳跃按预先计算的时间线执行，last_report 保存最近一次执行的报告（跳跃次数与时序误差）
     """
     
+    PARAM_SCHEMA = ParamSchema(
+        "RunWithJump",
+        Field("direction", str, "w", convert=PostMessageInputHelper.get_direction_vk, dest="direction_vk"),
+        Field("duration", float, 3.0, check=lambda v: v >= 0),
+        Field("dodge_delay", float, 0.05, check=lambda v: v >= 0),
+        Field("jump_interval", float, 0.5, check=lambda v: v > 0),
+        Field("jump_press_time", float, 0.1, check=lambda v: v >= 0),
+    )
+    
+    # 最近一次执行的时间线报告
+    last_report: Optional[TimelineReport] = None
+    
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
-        # 解析参数
+        # 解析参数（按参数字符串缓存）
         try:
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[RunWithJump] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-        except json.JSONDecodeError as e:
-            logger.error(f"[RunWithJump] JSON 解析失败: {e}")
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[RunWithJump] 参数错误: {e}")
             logger.error(f"  参数内容: {argv.custom_action_param}")
             return False
         
-        # 获取参数
-        direction = params.get("direction", "w")
-        duration = params.get("duration", 3.0)
-        dodge_delay = params.get("dodge_delay", 0.05)
-        jump_interval = params.get("jump_interval", 0.5)
-        jump_press_time = params.get("jump_press_time", 0.1)
+        direction = params["direction"]
+        duration = params["duration"]
+        dodge_delay = params["dodge_delay"]
+        jump_interval = params["jump_interval"]
+        jump_press_time = params["jump_press_time"]
         
         # 从全局配置获取闪避键(现在是虚拟键码 int)
-        dodge_vk = main.GAME_CONFIG.get("dodge_key", win32con.VK_SHIFT)
+        dodge_vk = get_runtime_config().dodge_key
         
         logger.info("=" * 60)
         logger.info(f"[RunWithJump] 开始边跑边跳")
@@ -469,79 +545,231 @@ class RunWithJump(GameWindowAction):
             # 创建输入辅助对象
             input_helper = PostMessageInputHelper(hwnd)
             
-            # 获取方向键的虚拟键码
-            direction_vk = input_helper.get_direction_vk(direction)
+            direction_vk = params["direction_vk"]
             
             logger.info(f"[RunWithJump] 方向键 VK={direction_vk}, 闪避键 VK={dodge_vk}")
             
-            # 1. 按下方向键
-            logger.info(f"[RunWithJump] 步骤 1: 按下方向键 '{direction}'")
-            input_helper.key_down(direction_vk, activate=True)
+            # 预先计算完整的跳跃时间线（所有时刻相对同一起点，无累积漂移）
+            timeline, jump_times = self.build_jump_timeline(
+                direction_vk, dodge_vk, duration, dodge_delay, jump_interval, jump_press_time
+            )
+            logger.info(f"[RunWithJump] 计划跳跃 {len(jump_times)} 次，时间线总长 {timeline.duration:.2f}秒")
+            
+            report = self._play_timeline(input_helper, timeline, "RunWithJump", context, argv.node_name)
+            self.last_report = report
             
-            # 2. 短暂延迟后按下闪避键
-            if dodge_delay > 0:
-                logger.debug(f"[RunWithJump] 等待 {dodge_delay:.3f}秒...")
-                time.sleep(dodge_delay)
+            # 统计实际跳跃次数与时序误差
+            jump_lateness = report.lateness_of(win32con.VK_SPACE, is_down=True)
+            jump_count = len(jump_lateness)
+            if jump_lateness:
+                logger.info(f"[RunWithJump] 跳跃时序误差: 平均 {sum(jump_lateness) / jump_count * 1000:.3f}ms, "
+                            f"最大 {max(jump_lateness) * 1000:.3f}ms")
             
-            logger.info(f"[RunWithJump] 步骤 2: 按下闪避键 (VK=0x{dodge_vk:02X})")
-            input_helper.key_down(dodge_vk, activate=False)
+            logger.info(f"[RunWithJump] [OK] 完成边跑边跳 {duration:.2f}秒，共跳跃 {jump_count}/{len(jump_times)} 次")
+            logger.info("=" * 60)
             
-            # 3. 周期性跳跃，直到总时长结束
-            logger.info(f"[RunWithJump] 步骤 3: 开始周期性跳跃...")
-            start_time = time.time()
-            jump_count = 0
-            next_jump_time = start_time + jump_interval
+            return report.completed
             
-            while True:
-                current_time = time.time()
-                elapsed_time = current_time - start_time
-                
-                # 检查是否达到总时长
-                if elapsed_time >= duration:
-                    logger.info(f"[RunWithJump] 达到总时长 {duration:.2f}秒，停止跳跃")
-                    break
-                
-                # 检查是否该跳跃了
-                if current_time >= next_jump_time:
-                    jump_count += 1
-                    remaining_time = duration - elapsed_time
-                    logger.info(f"[RunWithJump] -> 第 {jump_count} 次跳跃 (剩余: {remaining_time:.2f}秒)")
-                    
-                    # 按下空格键
-                    input_helper.key_down(win32con.VK_SPACE, activate=False)
-                    
-                    # 保持按下状态
-                    time.sleep(jump_press_time)
-                    
-                    # 释放空格键
-                    input_helper.key_up(win32con.VK_SPACE)
-                    
-                    # 计算下一次跳跃时间
-                    next_jump_time = current_time + jump_interval
-                else:
-                    # 短暂休眠，避免 CPU 占用过高
-                    time.sleep(0.01)
+        except Exception as e:
+            # 调度器在异常时会自动释放已按下的按键
+            logger.error(f"[RunWithJump] 发生异常: {e}", exc_info=True)
+            return False
+    
+    @classmethod
+    def build_timeline(cls, params: Mapping, dodge_vk: int) -> InputTimeline:
+        """
+        根据动作参数构造边跑边跳的按键时间线
+        
+        Args:
+            params: 已校验的动作参数（PARAM_SCHEMA.parse 的结果）
+            dodge_vk: 闪避键虚拟键码
+        """
+        timeline, _ = cls.build_jump_timeline(
+            params["direction_vk"],
+            dodge_vk,
+            params["duration"],
+            params["dodge_delay"],
+            params["jump_interval"],
+            params["jump_press_time"],
+        )
+        return timeline
+    
+    @staticmethod
+    def build_jump_timeline(direction_vk: int, dodge_vk: int, duration: float, dodge_delay: float,
+                            jump_interval: float, jump_press_time: float):
+        """
+        构造边跑边跳的按键时间线
+        
+        起跑时刻为按下闪避键的时刻，第 k 次跳跃固定在 起跑 + k * jump_interval，
+        跳跃时刻只在起跑后 duration 秒内安排；若最后一次跳跃的释放晚于 duration，
+        则在其释放后再松开方向键和闪避键
+        
+        Args:
+            direction_vk: 方向键虚拟键码
+            dodge_vk: 闪避键虚拟键码
+            duration: 总持续时长（秒）
+            dodge_delay: 按下方向键后多久按下闪避键（秒）
+            jump_interval: 跳跃间隔（秒）
+            jump_press_time: 每次跳跃按键时长（秒）
             
-            # 4. 释放闪避键
-            logger.info(f"[RunWithJump] 步骤 4: 释放闪避键")
-            input_helper.key_up(dodge_vk)
+        Returns:
+            (时间线, 跳跃时刻列表)
+        """
+        if jump_interval <= 0:
+            raise ValueError(f"jump_interval 必须大于 0，当前: {jump_interval}")
+        
+        timeline = InputTimeline()
+        timeline.key_down(0.0, direction_vk)
+        timeline.key_down(dodge_delay, dodge_vk)
+        
+        run_start = dodge_delay
+        end = run_start + duration
+        jump_times = []
+        k = 1
+        while k * jump_interval < duration:
+            jump_at = run_start + k * jump_interval
+            timeline.press(jump_at, win32con.VK_SPACE, jump_press_time)
+            jump_times.append(jump_at)
+            end = max(end, jump_at + jump_press_time)
+            k += 1
+        
+        timeline.key_up(end, dodge_vk)
+        timeline.key_up(end, direction_vk)
+        return timeline, jump_times
+
+
+# 可被 RouteMacro 合并执行的移动动作
+MOVEMENT_ACTIONS = {
+    "RunWithShift": RunWithShift,
+    "LongPressKey": LongPressKey,
+    "PressMultipleKeys": PressMultipleKeys,
+    "RunWithJump": RunWithJump,
+}
+
+
+class RouteMacro(GameWindowAction):
+    """
+    路线宏：将一串连续的移动节点合并为一条时间线执行
+    由 compile_routes.py（手动运行的编译工具）从 DirectHit 移动节点链生成，省去每个节点的框架往返开销
+    
+    参数说明：
+    {
+        "steps": [
+            ["LongPressKey", {"key": "d", "duration": 2.2}],   // [动作名称, 动作参数]
+            ["RunWithShift", {"direction": "w", "duration": 8.7}],
+            ["Wait", 2.0]                                      // 等待（秒），对应原节点的 pre_delay/post_delay
+        ],
+        "source_nodes": ["mediate_a1", "mediate_a2"]          // 原始节点名（仅用于日志）
+    }
+    """
+    
+    PARAM_SCHEMA = ParamSchema(
+        "RouteMacro",
+        Field("steps", list, convert=lambda steps: RouteMacro.compile_steps(steps), dest="compiled_steps"),
+        Field("source_nodes", list, []),
+    )
+    
+    @tracing.traced("action", log_timing=True)
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> bool:
+        # 解析参数（按参数字符串缓存，每一步的参数同时完成校验）
+        try:
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+        except ParamError as e:
+            logger.error(f"[RouteMacro] 参数错误: {e}")
+            logger.error(f"  参数内容: {argv.custom_action_param}")
+            return False
+        
+        steps = params["compiled_steps"]
+        source_nodes = params["source_nodes"]
+        
+        # 从全局配置获取闪避键(现在是虚拟键码 int)
+        dodge_vk = get_runtime_config().dodge_key
+        
+        logger.info("=" * 60)
+        logger.info(f"[RouteMacro] 开始执行路线宏 '{argv.node_name}'，共 {len(steps)} 步")
+        if source_nodes:
+            logger.info(f"  原始节点: {' -> '.join(source_nodes)}")
+        
+        try:
+            timeline = self.build_timeline(params, dodge_vk)
             
-            # 5. 释放方向键
-            logger.info(f"[RunWithJump] 步骤 5: 释放方向键")
-            input_helper.key_up(direction_vk)
+            # 获取窗口句柄
+            hwnd = self._get_window_handle(context)
+            if not hwnd:
+                logger.error("[RouteMacro] 无法获取窗口句柄")
+                return False
             
-            logger.info(f"[RunWithJump] [OK] 完成边跑边跳 {duration:.2f}秒，共跳跃 {jump_count} 次")
+            # 创建输入辅助对象
+            input_helper = PostMessageInputHelper(hwnd)
+            
+            logger.info(f"[RouteMacro] 时间线总长 {timeline.duration:.2f}秒，共 {len(timeline.events)} 个按键事件")
+            report = self._play_timeline(input_helper, timeline, "RouteMacro", context, argv.node_name)
+            
+            logger.info(f"[RouteMacro] [OK] 完成路线宏 '{argv.node_name}'")
             logger.info("=" * 60)
             
-            return True
+            return report.completed
             
         except Exception as e:
-            logger.error(f"[RunWithJump] 发生异常: {e}", exc_info=True)
-            # 尝试释放所有按键
-            try:
-                input_helper.key_up(win32con.VK_SPACE)
-                input_helper.key_up(dodge_vk)
-                input_helper.key_up(direction_vk)
-            except:
-                pass
+            logger.error(f"[RouteMacro] 发生异常: {e}", exc_info=True)
             return False
+    
+    @staticmethod
+    def compile_steps(steps) -> tuple:
+        """
+        校验并转换步骤列表：每一步的参数用对应动作的 PARAM_SCHEMA 校验
+        
+        Returns:
+            ((动作名称, 已校验参数或等待秒数), ...)
+        """
+        compiled = []
+        for index, step in enumerate(steps):
+            if not isinstance(step, (list, tuple)) or len(step) != 2:
+                raise ValueError(f"第 {index + 1} 步格式错误: {step}")
+            
+            action_name, step_params = step
+            if action_name == "Wait":
+                if isinstance(step_params, bool) or not isinstance(step_params, (int, float)) or step_params < 0:
+                    raise ValueError(f"第 {index + 1} 步等待时长无效: {step_params}")
+                compiled.append(("Wait", float(step_params)))
+                continue
+            
+            action_class = MOVEMENT_ACTIONS.get(action_name)
+            if action_class is None:
+                raise ValueError(f"第 {index + 1} 步不支持的动作: {action_name}")
+            try:
+                compiled.append((action_name, action_class.PARAM_SCHEMA.validate(step_params)))
+            except ParamError as e:
+                raise ValueError(f"第 {index + 1} 步 ({action_name}) {e}") from e
+        return tuple(compiled)
+    
+    @classmethod
+    def build_timeline(cls, params: Mapping, dodge_vk: int) -> InputTimeline:
+        """
+        将所有步骤的时间线首尾相接，合并为一条时间线
+        
+        Args:
+            params: 已校验的动作参数（PARAM_SCHEMA.parse 的结果）
+            dodge_vk: 闪避键虚拟键码
+        """
+        timeline = InputTimeline()
+        offset = 0.0
+        
+        for action_name, step_params in params["compiled_steps"]:
+            if action_name == "Wait":
+                offset += step_params
+                continue
+            
+            step_timeline = MOVEMENT_ACTIONS[action_name].build_timeline(step_params, dodge_vk)
+            timeline.extend(step_timeline, offset)
+            offset += step_timeline.duration
+        
+        return timeline
+
+
+# 前瞻下一个节点时可以沿用按键的动作（动作名称 -> 动作类）
+LOOKAHEAD_ACTIONS = dict(MOVEMENT_ACTIONS, RouteMacro=RouteMacro)
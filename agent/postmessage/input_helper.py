@@ -6,10 +6,11 @@ PostMessage 输入辅助模块
 import win32gui
 import win32con
 import win32api
-import time
 import logging
 from typing import Union, List, Tuple
 
+import tracing
+
 logger = logging.getLogger(__name__)
 
 
@@ -75,6 +76,16 @@ class PostMessageInputHelper:
         win32con.VK_NEXT: 0x51,   # Page Down
     }
     
+    # 需要设置扩展键标志（lParam 第 24 位）的虚拟键
+    EXTENDED_KEYS = frozenset({
+        win32con.VK_RCONTROL, win32con.VK_RMENU,
+        win32con.VK_LEFT, win32con.VK_RIGHT, win32con.VK_UP, win32con.VK_DOWN,
+        win32con.VK_INSERT, win32con.VK_DELETE, win32con.VK_HOME, win32con.VK_END,
+        win32con.VK_PRIOR, win32con.VK_NEXT,
+        win32con.VK_LWIN, win32con.VK_RWIN, win32con.VK_APPS,
+        win32con.VK_NUMLOCK, win32con.VK_DIVIDE, win32con.VK_SNAPSHOT,
+    })
+    
     def __init__(self, hwnd: int):
         """
         初始化 PostMessage 输入辅助类
@@ -96,22 +107,12 @@ class PostMessageInputHelper:
             vk_code: 虚拟键码
             
         Returns:
-            扫描码
+            扫描码（来自导入时预计算的查找表）
         """
-        # 先查找预定义映射表
-        if vk_code in cls.VK_TO_SCAN_CODE:
-            return cls.VK_TO_SCAN_CODE[vk_code]
-        
-        # 使用 Windows API 动态获取扫描码
-        scan_code = win32api.MapVirtualKey(vk_code, 0)  # MAPVK_VK_TO_VSC = 0
-        if scan_code == 0:
-            logger.warning(f"无法获取 VK={vk_code} 的扫描码，使用默认值 0x1E")
-            return 0x1E  # 默认使用 A 键的扫描码
-        
-        return scan_code
+        return _SCAN_CODE_TABLE[vk_code]
     
     @staticmethod
-    def make_key_lparam(scan_code: int, is_key_up: bool = False) -> int:
+    def make_key_lparam(scan_code: int, is_key_up: bool = False, extended: bool = False) -> int:
         """
         构造包含扫描码的 lParam
         
@@ -127,6 +128,7 @@ class PostMessageInputHelper:
         Args:
             scan_code: 扫描码
             is_key_up: 是否为按键释放
+            extended: 是否为扩展键
             
         Returns:
             lParam 值
@@ -134,6 +136,9 @@ class PostMessageInputHelper:
         lparam = 1  # Repeat count = 1
         lparam |= (scan_code << 16)  # 设置扫描码 (位 16-23)
         
+        if extended:
+            lparam |= (1 << 24)  # Extended key flag
+        
         if is_key_up:
             lparam |= (1 << 30)  # Previous state = 1 (之前是按下状态)
             lparam |= (1 << 31)  # Transition state = 1 (释放)
@@ -157,6 +162,8 @@ class PostMessageInputHelper:
         """
         按下按键
         
+        热路径：lParam 直接取自导入时预计算的查找表，不做字典查找、API 调用或字符串格式化
+        
         Args:
             vk_code: 虚拟键码
             activate: 是否先激活窗口
@@ -164,13 +171,8 @@ class PostMessageInputHelper:
         if activate:
             self.try_activate()
         
-        scan_code = self.get_scan_code(vk_code)
-        lparam = self.make_key_lparam(scan_code, is_key_up=False)
-        
-        win32gui.PostMessage(self.hwnd, win32con.WM_KEYDOWN, vk_code, lparam)
-        
-        logger.debug(f"[PostMessageInputHelper] key_down: VK={vk_code}, "
-                    f"ScanCode=0x{scan_code:02X}, lParam=0x{lparam:08X}")
+        _post_message(self.hwnd, _WM_KEYDOWN, vk_code, _KEY_DOWN_LPARAM[vk_code])
+        tracing.instant("key_down", "input", vk=vk_code)
     
     def key_up(self, vk_code: int):
         """
@@ -179,13 +181,8 @@ class PostMessageInputHelper:
         Args:
             vk_code: 虚拟键码
         """
-        scan_code = self.get_scan_code(vk_code)
-        lparam = self.make_key_lparam(scan_code, is_key_up=True)
-        
-        win32gui.PostMessage(self.hwnd, win32con.WM_KEYUP, vk_code, lparam)
-        
-        logger.debug(f"[PostMessageInputHelper] key_up: VK={vk_code}, "
-                    f"ScanCode=0x{scan_code:02X}, lParam=0x{lparam:08X}")
+        _post_message(self.hwnd, _WM_KEYUP, vk_code, _KEY_UP_LPARAM[vk_code])
+        tracing.instant("key_up", "input", vk=vk_code)
     
     def press_key(self, vk_code: int, duration: float = 0.05):
         """
@@ -196,7 +193,7 @@ class PostMessageInputHelper:
             duration: 按住时长（秒）
         """
         self.key_down(vk_code)
-        time.sleep(duration)
+        tracing.sleep(duration, "hold")
         self.key_up(vk_code)
     
     def long_press_key(self, vk_code: int, duration: float):
@@ -209,7 +206,7 @@ class PostMessageInputHelper:
         """
         logger.info(f"[PostMessageInputHelper] 长按键 VK={vk_code}, 持续 {duration:.2f}秒")
         self.key_down(vk_code)
-        time.sleep(duration)
+        tracing.sleep(duration, "hold")
         self.key_up(vk_code)
     
     def press_multiple_keys(self, vk_codes: List[int], duration: float):
@@ -228,7 +225,7 @@ class PostMessageInputHelper:
             self.key_down(vk, activate=(vk == vk_codes[0]))  # 只在第一个键时激活
         
         # 保持持续时长
-        time.sleep(duration)
+        tracing.sleep(duration, "hold")
         
         # 释放所有键
         for vk in vk_codes:
@@ -251,7 +248,7 @@ class PostMessageInputHelper:
             for i, (vk_code, delay) in enumerate(key_sequence):
                 if delay > 0:
                     logger.debug(f"  等待 {delay:.3f}秒...")
-                    time.sleep(delay)
+                    tracing.sleep(delay, "delay")
                 
                 logger.debug(f"  按下键 {i+1}/{len(key_sequence)}: VK={vk_code}")
                 self.key_down(vk_code, activate=(i == 0))
@@ -259,7 +256,7 @@ class PostMessageInputHelper:
             
             # 保持按下状态
             logger.debug(f"  保持 {hold_duration:.2f}秒...")
-            time.sleep(hold_duration)
+            tracing.sleep(hold_duration, "hold")
             
             # 释放所有键
             logger.debug(f"  释放所有键...")
@@ -278,6 +275,49 @@ class PostMessageInputHelper:
                     pass
             raise
     
+    # 特殊键名称到虚拟键码的映射（小写）
+    KEY_NAME_TO_VK = {
+        'shift': win32con.VK_SHIFT,
+        'lshift': win32con.VK_LSHIFT,
+        'rshift': win32con.VK_RSHIFT,
+        'ctrl': win32con.VK_CONTROL,
+        'alt': win32con.VK_MENU,
+        'space': win32con.VK_SPACE,
+        'esc': win32con.VK_ESCAPE,
+        'enter': win32con.VK_RETURN,
+        'tab': win32con.VK_TAB,
+        'up': win32con.VK_UP,
+        'down': win32con.VK_DOWN,
+        'left': win32con.VK_LEFT,
+        'right': win32con.VK_RIGHT,
+    }
+    
+    @classmethod
+    def resolve_key(cls, key: Union[str, int]) -> int:
+        """
+        将按键描述转换为虚拟键码
+        
+        Args:
+            key: 单个字符、特殊键名称（见 KEY_NAME_TO_VK）或虚拟键码
+            
+        Returns:
+            虚拟键码
+        """
+        if isinstance(key, bool):
+            raise ValueError(f"不支持的键类型: {key!r}")
+        if isinstance(key, int):
+            if not 0 < key < 256:
+                raise ValueError(f"虚拟键码超出范围: {key}")
+            return key
+        if isinstance(key, str):
+            if len(key) == 1:
+                return cls.char_to_vk(key)
+            vk_code = cls.KEY_NAME_TO_VK.get(key.lower())
+            if vk_code is not None:
+                return vk_code
+            raise ValueError(f"不支持的键名称: {key}")
+        raise ValueError(f"不支持的键类型: {key!r}")
+    
     @staticmethod
     def char_to_vk(char: str) -> int:
         """
@@ -323,3 +363,45 @@ class PostMessageInputHelper:
             raise ValueError(f"不支持的方向: {direction}")
         
         return direction_map[direction]
+
+
+# ========== 预计算的 VK -> lParam 查找表 ==========
+
+_post_message = win32gui.PostMessage
+_WM_KEYDOWN = win32con.WM_KEYDOWN
+_WM_KEYUP = win32con.WM_KEYUP
+
+
+def _build_key_tables() -> Tuple[Tuple[int, ...], Tuple[int, ...], Tuple[int, ...]]:
+    """
+    为全部 256 个虚拟键预先计算扫描码和按下/释放 lParam
+    
+    扫描码优先使用 VK_TO_SCAN_CODE 映射表，其次使用 MapVirtualKey，
+    都无法获取时使用默认值 0x1E（A 键）
+    
+    Returns:
+        (扫描码表, 按下 lParam 表, 释放 lParam 表)
+    """
+    scan_codes = []
+    down_lparams = []
+    up_lparams = []
+    unmapped = []
+    
+    for vk_code in range(256):
+        scan_code = PostMessageInputHelper.VK_TO_SCAN_CODE.get(vk_code)
+        if scan_code is None:
+            scan_code = win32api.MapVirtualKey(vk_code, 0)  # MAPVK_VK_TO_VSC = 0
+            if scan_code == 0:
+                unmapped.append(vk_code)
+                scan_code = 0x1E  # 默认使用 A 键的扫描码
+        
+        extended = vk_code in PostMessageInputHelper.EXTENDED_KEYS
+        scan_codes.append(scan_code)
+        down_lparams.append(PostMessageInputHelper.make_key_lparam(scan_code, False, extended))
+        up_lparams.append(PostMessageInputHelper.make_key_lparam(scan_code, True, extended))
+    
+    logger.debug(f"[PostMessageInputHelper] 按键查找表已生成，{len(unmapped)} 个虚拟键无扫描码，使用默认值 0x1E")
+    return tuple(scan_codes), tuple(down_lparams), tuple(up_lparams)
+
+
+_SCAN_CODE_TABLE, _KEY_DOWN_LPARAM, _KEY_UP_LPARAM = _build_key_tables()
@@ -0,0 +1,352 @@
+"""
+PostMessage 时间线调度模块
+将一组按键事件按绝对截止时间（单调时钟）统一调度，由单个高精度计时线程发送，
+避免日志、窗口查找等开销累积到路线时序中
+"""
+
+import sys
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from itertools import groupby
+from typing import AbstractSet, FrozenSet, List, NamedTuple, Optional
+
+import tracing
+from .input_helper import PostMessageInputHelper
+
+logger = logging.getLogger(__name__)
+
+
+class KeyEvent(NamedTuple):
+    """时间线上的单个按键事件"""
+    at: float         # 相对时间线起点的偏移（秒）
+    vk_code: int      # 虚拟键码
+    is_down: bool     # True=按下, False=释放
+
+
+class InputTimeline:
+    """
+    按键时间线
+    以相对起点的偏移描述一组按键事件，由 TimelineScheduler 统一发送
+
+    同一时刻的多个事件按添加顺序发送
+    """
+
+    def __init__(self):
+        self.events: List[KeyEvent] = []
+        # 时长下限：去掉结尾的释放事件后，时间线仍执行到原来的结束时刻
+        self.end = 0.0
+
+    def key_down(self, at: float, vk_code: int) -> "InputTimeline":
+        """在偏移 at 秒处按下按键"""
+        self.events.append(KeyEvent(max(0.0, at), vk_code, True))
+        return self
+
+    def key_up(self, at: float, vk_code: int) -> "InputTimeline":
+        """在偏移 at 秒处释放按键"""
+        self.events.append(KeyEvent(max(0.0, at), vk_code, False))
+        return self
+
+    def press(self, at: float, vk_code: int, hold: float) -> "InputTimeline":
+        """在偏移 at 秒处按下按键，保持 hold 秒后释放"""
+        self.key_down(at, vk_code)
+        self.key_up(at + hold, vk_code)
+        return self
+
+    def extend(self, other: "InputTimeline", offset: float) -> "InputTimeline":
+        """将另一条时间线整体平移 offset 秒后追加到当前时间线末尾"""
+        self.events.extend(event._replace(at=event.at + offset) for event in other.events)
+        self.end = max(self.end, other.end + offset)
+        return self
+
+    @property
+    def duration(self) -> float:
+        """时间线总时长（最后一个事件的偏移，不小于 end）"""
+        return max(max((event.at for event in self.events), default=0.0), self.end)
+
+    @property
+    def first_release(self) -> float:
+        """第一个释放事件的偏移（没有释放事件时为总时长）"""
+        return min((event.at for event in self.events if not event.is_down), default=self.duration)
+
+    def sorted_events(self) -> List[KeyEvent]:
+        """按偏移排序后的事件列表（稳定排序，保持同一时刻的添加顺序）"""
+        return sorted(self.events, key=lambda event: event.at)
+
+    def carry_keys(self, held: AbstractSet[int], window: float) -> FrozenSet[int]:
+        """
+        开头可以沿用的已按下按键
+
+        按时刻分组，从第一组开始，只要整组都是 held 中按键的按下事件就沿用，遇到其他事件即停止。
+        沿用的按键本来就先于之后的事件按下，顺序不变；只沿用后按下的键（如闪避键）而不沿用
+        先按下的键（如方向键）会颠倒按键顺序，因此不会出现
+
+        Args:
+            held: 当前处于按下状态的按键
+            window: 只考虑开头 window 秒内的事件
+        """
+        carried = set()
+        for at, group in groupby(self.sorted_events(), key=lambda event: event.at):
+            group = list(group)
+            if at > window or not all(
+                event.is_down and event.vk_code in held and event.vk_code not in carried for event in group
+            ):
+                break
+            carried.update(event.vk_code for event in group)
+        return frozenset(carried)
+
+    def trailing_keys(self) -> FrozenSet[int]:
+        """最后一个事件是在时间线末尾释放的按键（可以保持按下交给下一个动作）"""
+        end = self.duration
+        last = {}
+        for event in self.sorted_events():
+            last[event.vk_code] = event
+        return frozenset(vk for vk, event in last.items() if not event.is_down and event.at >= end)
+
+    def without_leading_presses(self, vk_codes: AbstractSet[int]) -> "InputTimeline":
+        """去掉这些按键的第一次按下事件（按键已经处于按下状态）"""
+        timeline = InputTimeline()
+        timeline.end = self.end
+        skipped = set()
+        for event in self.sorted_events():
+            if event.is_down and event.vk_code in vk_codes and event.vk_code not in skipped:
+                skipped.add(event.vk_code)
+                continue
+            timeline.events.append(event)
+        return timeline
+
+    def advanced(self, seconds: float) -> "InputTimeline":
+        """
+        整体提前 seconds 秒（不超过第一个释放事件的偏移）
+
+        提前到起点之前的按下事件改为在起点按下，按键顺序不变
+        """
+        seconds = min(seconds, self.first_release)
+        timeline = InputTimeline()
+        timeline.events = [event._replace(at=max(0.0, event.at - seconds)) for event in self.sorted_events()]
+        timeline.end = max(0.0, self.end - seconds)
+        return timeline
+
+    def without_final_releases(self, vk_codes: AbstractSet[int]) -> "InputTimeline":
+        """去掉这些按键的最后一次释放事件（按键保持按下），时长不变"""
+        timeline = InputTimeline()
+        timeline.end = self.duration
+        skipped = set()
+        for event in reversed(self.sorted_events()):
+            if not event.is_down and event.vk_code in vk_codes and event.vk_code not in skipped:
+                skipped.add(event.vk_code)
+                continue
+            timeline.events.append(event)
+        timeline.events.reverse()
+        return timeline
+
+
+class TimelineReport:
+    """
+    时间线执行报告
+    记录每个事件的实际发送延迟（lateness = 实际发送时刻 - 截止时刻）
+    """
+
+    def __init__(self, events: List[KeyEvent], lateness: List[float], cpu_time: float, completed: bool):
+        self.events = events
+        self.lateness = lateness
+        self.cpu_time = cpu_time
+        self.completed = completed
+
+    @property
+    def fired_count(self) -> int:
+        """已发送的事件数"""
+        return len(self.lateness)
+
+    @property
+    def max_lateness(self) -> float:
+        return max(self.lateness, default=0.0)
+
+    @property
+    def mean_lateness(self) -> float:
+        return sum(self.lateness) / len(self.lateness) if self.lateness else 0.0
+
+    def lateness_of(self, vk_code: int, is_down: bool = True) -> List[float]:
+        """获取指定按键（按下或释放）事件的延迟列表"""
+        return [
+            late for event, late in zip(self.events, self.lateness)
+            if event.vk_code == vk_code and event.is_down == is_down
+        ]
+
+    def summary(self) -> str:
+        """单行摘要，用于日志输出"""
+        return (f"事件 {self.fired_count}/{len(self.events)}, "
+                f"平均延迟 {self.mean_lateness * 1000:.3f}ms, "
+                f"最大延迟 {self.max_lateness * 1000:.3f}ms, "
+                f"计时线程 CPU {self.cpu_time * 1000:.1f}ms"
+                f"{'' if self.completed else ', [未完成]'}")
+
+
+@contextmanager
+def _high_resolution_timer():
+    """在 Windows 上临时提高系统计时器精度（1ms）并提升当前线程优先级"""
+    if sys.platform != 'win32':
+        yield
+        return
+
+    import ctypes
+    winmm = ctypes.windll.winmm
+    kernel32 = ctypes.windll.kernel32
+    THREAD_PRIORITY_TIME_CRITICAL = 15
+
+    winmm.timeBeginPeriod(1)
+    thread_handle = kernel32.GetCurrentThread()
+    original_priority = kernel32.GetThreadPriority(thread_handle)
+    kernel32.SetThreadPriority(thread_handle, THREAD_PRIORITY_TIME_CRITICAL)
+    try:
+        yield
+    finally:
+        kernel32.SetThreadPriority(thread_handle, original_priority)
+        winmm.timeEndPeriod(1)
+
+
+class TimelineScheduler:
+    """
+    时间线调度器
+    在 PostMessageInputHelper 之上，按绝对截止时间发送整条时间线：
+    先粗粒度休眠到截止时刻前 SPIN_THRESHOLD 秒，再短暂自旋到截止时刻
+    """
+
+    # 自旋等待阈值（秒）：距截止时刻小于该值时改为自旋
+    SPIN_THRESHOLD = 0.002
+
+    def __init__(self, input_helper: PostMessageInputHelper, spin_threshold: Optional[float] = None):
+        """
+        Args:
+            input_helper: 输入辅助对象
+            spin_threshold: 自旋等待阈值（秒），默认 SPIN_THRESHOLD
+        """
+        self.input_helper = input_helper
+        self.spin_threshold = self.SPIN_THRESHOLD if spin_threshold is None else spin_threshold
+
+    def run(self, timeline: InputTimeline, start_at: Optional[float] = None,
+            stop_event: Optional[threading.Event] = None,
+            held: AbstractSet[int] = frozenset(),
+            keep_pressed: AbstractSet[int] = frozenset()) -> TimelineReport:
+        """
+        执行时间线（阻塞直到全部事件发送完成或被取消）
+
+        Args:
+            timeline: 按键时间线
+            start_at: 时间线起点（time.perf_counter() 时刻），默认为当前时刻
+            stop_event: 取消事件，被设置后停止发送并释放已按下的按键
+            held: 开始前已经处于按下状态的按键（沿用上一个动作的按键），取消或异常时一并释放
+            keep_pressed: 全部发送完成后仍保持按下的按键（交给下一个动作）；取消或异常时照常释放
+
+        Returns:
+            执行报告
+        """
+        events = timeline.sorted_events()
+        duration = timeline.duration
+        stop_event = stop_event or threading.Event()
+
+        # 激活窗口放在计时开始之前，避免占用第一个事件的时间
+        self.input_helper.try_activate()
+        if start_at is None:
+            start_at = time.perf_counter()
+
+        state = {}
+        worker = threading.Thread(
+            target=self._worker,
+            args=(events, duration, start_at, stop_event, state, held, keep_pressed),
+            name="InputTimeline",
+            daemon=True,
+        )
+        worker.start()
+        worker.join()
+
+        if "error" in state:
+            raise state["error"]
+        return state["report"]
+
+    def _worker(self, events: List[KeyEvent], duration: float, start_at: float,
+                stop_event: threading.Event, state: dict,
+                held: AbstractSet[int], keep_pressed: AbstractSet[int]):
+        """计时线程主体：任何异常（包括计时器设置失败）都记录到 state["error"]，由 run 在调用线程抛出"""
+        try:
+            with _high_resolution_timer():
+                self._send_events(events, duration, start_at, stop_event, state, held, keep_pressed)
+        except Exception as e:
+            logger.error(f"[TimelineScheduler] 计时线程失败: {e}", exc_info=True)
+            state.setdefault("error", e)
+            if "report" not in state:
+                # 没有开始发送事件，沿用的按键也要释放
+                for vk_code in sorted(held, reverse=True):
+                    try:
+                        self.input_helper.key_up(vk_code)
+                    except Exception:
+                        pass
+
+    def _send_events(self, events: List[KeyEvent], duration: float, start_at: float,
+                     stop_event: threading.Event, state: dict,
+                     held: AbstractSet[int], keep_pressed: AbstractSet[int]):
+        """按截止时间发送全部事件，结束时写入 state["report"]"""
+        input_helper = self.input_helper
+        pressed = sorted(held)
+        lateness = []
+        completed = False
+
+        cpu_start = time.thread_time()
+        try:
+            for event in events:
+                deadline = start_at + event.at
+                if not self._wait_until(deadline, stop_event):
+                    break
+
+                fired = time.perf_counter()
+                if event.is_down:
+                    input_helper.key_down(event.vk_code, activate=False)
+                    pressed.append(event.vk_code)
+                else:
+                    input_helper.key_up(event.vk_code)
+                    if event.vk_code in pressed:
+                        pressed.remove(event.vk_code)
+                lateness.append(fired - deadline)
+            else:
+                # 最后一个事件之后可能还有保持时间（去掉了结尾的释放事件）
+                completed = self._wait_until(start_at + duration, stop_event)
+        except Exception as e:
+            logger.error(f"[TimelineScheduler] 发送按键事件失败: {e}", exc_info=True)
+            state["error"] = e
+        finally:
+            # 取消或异常时释放仍处于按下状态的按键（正常完成时保留 keep_pressed）
+            if completed:
+                pressed = [vk_code for vk_code in pressed if vk_code not in keep_pressed]
+            for vk_code in reversed(pressed):
+                try:
+                    input_helper.key_up(vk_code)
+                except Exception:
+                    pass
+            cpu_time = time.thread_time() - cpu_start
+
+        state["report"] = TimelineReport(events, lateness, cpu_time, completed)
+
+    def _wait_until(self, deadline: float, stop_event: threading.Event) -> bool:
+        """
+        等待到截止时刻
+
+        Returns:
+            True 表示到达截止时刻，False 表示被取消
+        """
+        spin_threshold = self.spin_threshold
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return not stop_event.is_set()
+            if remaining > spin_threshold:
+                # 粗粒度休眠（可被 stop_event 打断）
+                with tracing.span("wait_until", "sleep"):
+                    cancelled = stop_event.wait(remaining - spin_threshold)
+                if cancelled:
+                    return False
+            else:
+                # 短暂自旋到截止时刻
+                while time.perf_counter() < deadline:
+                    pass
+                return not stop_event.is_set()
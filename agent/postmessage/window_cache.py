@@ -0,0 +1,125 @@
+"""
+游戏窗口句柄缓存模块
+进程内共享窗口句柄，每次使用前做低成本校验（IsWindow + 标题检查），
+仅在校验失败时才重新查找窗口
+"""
+
+import threading
+import logging
+from typing import Dict, Sequence, Tuple
+
+import win32gui
+
+logger = logging.getLogger(__name__)
+
+
+class WindowHandleCache:
+    """
+    窗口句柄缓存
+    缓存按标题关键字查找到的窗口句柄，并统计命中/未命中次数
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        """
+        Args:
+            keywords: 窗口标题关键字列表
+        """
+        self.keywords = tuple(keywords)
+        self.hits = 0
+        self.misses = 0
+        self._hwnd = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> int:
+        """
+        获取窗口句柄（优先使用缓存）
+
+        Returns:
+            窗口句柄，如果获取失败返回 0
+        """
+        with self._lock:
+            hwnd = self._hwnd
+            if hwnd and self._is_valid(hwnd):
+                self.hits += 1
+                return hwnd
+
+            if hwnd:
+                logger.info(f"[WindowHandleCache] 缓存的窗口句柄 {hwnd} (0x{hwnd:08X}) 已失效，重新查找")
+
+            self.misses += 1
+            self._hwnd = self._discover()
+            logger.info(f"[WindowHandleCache] 命中 {self.hits} 次，未命中 {self.misses} 次")
+            return self._hwnd
+
+    def invalidate(self):
+        """使缓存失效，下次获取时重新查找"""
+        with self._lock:
+            self._hwnd = 0
+
+    def stats(self) -> Dict[str, int]:
+        """命中统计"""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _is_valid(self, hwnd: int) -> bool:
+        """低成本校验：窗口仍然存在且标题仍包含关键字"""
+        try:
+            if not win32gui.IsWindow(hwnd):
+                return False
+            title = win32gui.GetWindowText(hwnd)
+            return any(keyword in title for keyword in self.keywords)
+        except Exception:
+            return False
+
+    def _discover(self) -> int:
+        """
+        查找窗口句柄
+
+        优先精确匹配标题，失败时枚举所有可见窗口查找包含任一关键字的窗口
+        """
+        try:
+            # 方法 1: 精确匹配 - 遍历所有关键字
+            for keyword in self.keywords:
+                hwnd = win32gui.FindWindow(None, keyword)
+                if hwnd and win32gui.IsWindow(hwnd):
+                    logger.info(f"[WindowHandleCache] [OK] 找到「{keyword}」窗口: {hwnd} (0x{hwnd:08X})")
+                    return hwnd
+
+            # 方法 2: 模糊匹配 - 枚举所有窗口查找包含任一关键字的
+            def find_window_callback(hwnd, param):
+                if win32gui.IsWindowVisible(hwnd):
+                    title = win32gui.GetWindowText(hwnd)
+                    for keyword in self.keywords:
+                        if keyword in title:
+                            param.append((hwnd, keyword, title))
+                            return
+
+            found_windows = []
+            win32gui.EnumWindows(find_window_callback, found_windows)
+
+            if found_windows:
+                hwnd, keyword, title = found_windows[0]
+                logger.info(f"[WindowHandleCache] [OK] 找到包含「{keyword}」的窗口: {hwnd} (0x{hwnd:08X})")
+                logger.info(f"[WindowHandleCache] 窗口标题: '{title}'")
+                return hwnd
+
+            logger.error(f"[WindowHandleCache] 未找到包含 {list(self.keywords)} 中任一关键字的窗口")
+            return 0
+
+        except Exception as e:
+            logger.error(f"[WindowHandleCache] 获取窗口句柄失败: {e}", exc_info=True)
+            return 0
+
+
+# 进程内共享的缓存（按关键字列表区分）
+_caches: Dict[Tuple[str, ...], WindowHandleCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_window_cache(keywords: Sequence[str]) -> WindowHandleCache:
+    """获取指定关键字列表对应的进程内共享窗口句柄缓存"""
+    key = tuple(keywords)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = WindowHandleCache(key)
+        return cache
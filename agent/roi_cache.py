@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+"""
+自学习 ROI 缓存模块
+按画面尺寸记录每个节点最近几次识别命中的位置，学习出带安全边距的 ROI 并持久化；
+之后的识别先在学习到的 ROI 内进行，未命中时才回退到全屏识别
+"""
+
+import threading
+import time
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from storage import get_config_dir, read_json, atomic_write_json
+import tracing
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 持久化文件名（位于 agent 配置目录）
+ROI_CACHE_FILE = "roi_cache.json"
+
+# 持久化格式版本（旧版本的缓存直接丢弃，重新学习）
+ROI_CACHE_VERSION = 2
+
+
+def _size_key(frame_size: Tuple[int, int]) -> str:
+    """画面尺寸 (宽, 高) -> "宽x高"，用作持久化文件中的键"""
+    return f"{frame_size[0]}x{frame_size[1]}"
+
+
+def _is_hit(reco_result) -> bool:
+    return bool(reco_result and reco_result.box and reco_result.box.w > 0 and reco_result.box.h > 0)
+
+
+class RoiStats:
+    """单个节点的 ROI 命中统计"""
+
+    def __init__(self):
+        self.roi_hits = 0        # 在学习到的 ROI 内命中
+        self.fallbacks = 0       # ROI 内未命中，回退全屏识别
+        self.full_runs = 0       # 全屏识别次数（包括尚未学习时）
+        self.roi_time = 0.0      # ROI 识别总耗时（秒）
+        self.full_time = 0.0     # 全屏识别总耗时（秒）
+
+    @property
+    def speedup(self) -> Optional[float]:
+        """ROI 识别相对全屏识别的平均加速比，样本不足时返回 None"""
+        roi_runs = self.roi_hits + self.fallbacks
+        if not roi_runs or not self.full_runs or not self.roi_time:
+            return None
+        return (self.full_time / self.full_runs) / (self.roi_time / roi_runs)
+
+    def summary(self) -> str:
+        speedup = self.speedup
+        return (f"ROI 命中 {self.roi_hits} 次，回退 {self.fallbacks} 次，全屏识别 {self.full_runs} 次"
+                f"{f'，加速 {speedup:.1f}x' if speedup else ''}")
+
+
+class RoiCache:
+    """
+    ROI 缓存
+    每个键（通常是 pipeline 节点名）按画面尺寸分别保存最近 history 个命中框，
+    ROI 取这些命中框的外接矩形并向四周扩展 margin 像素；
+    偶然的离群命中在之后 history 次命中后自动移出，ROI 随之收缩
+    """
+
+    def __init__(self, path: Optional[Path] = None, margin: int = 48, history: int = 8):
+        """
+        Args:
+            path: 持久化文件路径，None 表示不持久化
+            margin: 安全边距（像素）
+            history: 每个节点、每种画面尺寸保留的最近命中框数量
+        """
+        self.path = path
+        self.margin = margin
+        self.history = history
+        self.stats: Dict[str, RoiStats] = {}
+        # 节点名 -> 画面尺寸键 -> 最近的命中框 [x, y, w, h]（旧的在前）
+        self._boxes: Dict[str, Dict[str, List[List[int]]]] = {}
+        self._lock = threading.Lock()
+
+        if path is not None:
+            self._load(path)
+
+    def _load(self, path: Path):
+        data = read_json(path, {})
+        if not isinstance(data, dict) or not data:
+            return
+        if data.get("version") != ROI_CACHE_VERSION:
+            logger.info(f"[RoiCache] ROI 缓存格式已变化，重新学习: {path}")
+            return
+        for key, sizes in data.get("boxes", {}).items():
+            if not isinstance(sizes, dict):
+                continue
+            for size, boxes in sizes.items():
+                valid = [box for box in boxes if isinstance(box, list) and len(box) == 4] \
+                    if isinstance(boxes, list) else []
+                if valid:
+                    self._boxes.setdefault(key, {})[size] = valid[-self.history:]
+        if self._boxes:
+            logger.info(f"[RoiCache] 已加载 {len(self._boxes)} 个节点的 ROI: {path}")
+
+    @staticmethod
+    def _union(boxes: List[List[int]]) -> List[int]:
+        x1 = min(box[0] for box in boxes)
+        y1 = min(box[1] for box in boxes)
+        x2 = max(box[0] + box[2] for box in boxes)
+        y2 = max(box[1] + box[3] for box in boxes)
+        return [x1, y1, x2 - x1, y2 - y1]
+
+    def learned_roi(self, key: str, frame_size: Tuple[int, int]) -> Optional[List[int]]:
+        """
+        获取学习到的 ROI（已加安全边距并裁剪到画面内）
+
+        Args:
+            key: 节点名
+            frame_size: 画面尺寸 (宽, 高)
+
+        Returns:
+            [x, y, w, h]，该画面尺寸下尚未学习时返回 None
+        """
+        boxes = self._boxes.get(key, {}).get(_size_key(frame_size))
+        if not boxes:
+            return None
+        box = self._union(boxes)
+
+        frame_w, frame_h = frame_size
+        x1 = max(0, box[0] - self.margin)
+        y1 = max(0, box[1] - self.margin)
+        x2 = min(frame_w, box[0] + box[2] + self.margin)
+        y2 = min(frame_h, box[1] + box[3] + self.margin)
+        if x2 <= x1 or y2 <= y1:
+            return None
+        return [x1, y1, x2 - x1, y2 - y1]
+
+    def record(self, key: str, box, frame_size: Tuple[int, int]) -> bool:
+        """
+        记录一次命中框，只保留最近 history 个
+
+        Args:
+            key: 节点名
+            box: 命中框（识别结果的 box，或 (x, y, w, h)）
+            frame_size: 画面尺寸 (宽, 高)
+
+        Returns:
+            True 表示学习到的 ROI 发生了变化（此时持久化）
+        """
+        x, y, w, h = (int(v) for v in ((box.x, box.y, box.w, box.h) if hasattr(box, "x") else box))
+        size = _size_key(frame_size)
+        with self._lock:
+            boxes = self._boxes.setdefault(key, {}).setdefault(size, [])
+            old = self._union(boxes) if boxes else None
+            boxes.append([x, y, w, h])
+            del boxes[:-self.history]
+            new = self._union(boxes)
+            if new == old:
+                return False
+
+        logger.info(f"[RoiCache] 节点 '{key}' 在 {size} 下的 ROI 更新为 {new}")
+        self.save()
+        return True
+
+    def forget(self, key: str):
+        """清除节点学习到的 ROI（所有画面尺寸）"""
+        with self._lock:
+            self._boxes.pop(key, None)
+        self.save()
+
+    def reset(self):
+        """清除全部学习到的 ROI 和统计（例如游戏界面布局变化后重新学习）"""
+        with self._lock:
+            count = len(self._boxes)
+            self._boxes.clear()
+            self.stats.clear()
+        logger.info(f"[RoiCache] 已清除 {count} 个节点学习到的 ROI")
+        self.save()
+
+    def save(self):
+        """持久化到文件"""
+        if self.path is None:
+            return
+        with self._lock:
+            data = {
+                "version": ROI_CACHE_VERSION,
+                "margin": self.margin,
+                "boxes": {key: {size: [list(box) for box in boxes] for size, boxes in sizes.items()}
+                          for key, sizes in self._boxes.items()},
+            }
+        try:
+            atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.warning(f"[RoiCache] 保存 ROI 缓存失败: {e}")
+
+    def recognize_in_roi(self, context, key: str, node: str, image, pipeline_override: Optional[Dict] = None):
+        """
+        只在学习到的 ROI 内识别（不回退全屏识别）
+
+        Returns:
+            命中时返回识别结果，尚未学习 ROI 或未命中时返回 None
+        """
+        roi = self.learned_roi(key, (image.shape[1], image.shape[0]))
+        if roi is None:
+            return None
+
+        stats = self.stats.setdefault(key, RoiStats())
+        override = dict(pipeline_override or {})
+        override[node] = {**override.get(node, {}), "roi": roi}
+
+        start = time.perf_counter()
+        with tracing.span("run_recognition", "recognition", node=node, roi=roi):
+            reco_result = context.run_recognition(node, image, override)
+        stats.roi_time += time.perf_counter() - start
+
+        if _is_hit(reco_result):
+            stats.roi_hits += 1
+            return reco_result
+        stats.fallbacks += 1
+        return None
+
+    def record_full_run(self, key: str, frame_size: Tuple[int, int], elapsed: float, box=None):
+        """
+        记录一次全屏识别（包括通过 OCR 索引完成的全屏 OCR），命中时学习命中框
+
+        Args:
+            key: 节点名
+            frame_size: 画面尺寸 (宽, 高)
+            elapsed: 全屏识别耗时（秒），0 表示沿用了已有结果，不计入统计
+            box: 命中框，未命中时为 None
+        """
+        stats = self.stats.setdefault(key, RoiStats())
+        if elapsed:
+            stats.full_runs += 1
+            stats.full_time += elapsed
+        if box is not None:
+            self.record(key, box, frame_size)
+            if stats.fallbacks:
+                logger.info(f"[RoiCache] '{key}' 全屏识别命中；{stats.summary()}")
+
+    def recognize(self, context, key: str, node: str, image, pipeline_override: Optional[Dict] = None):
+        """
+        先在学习到的 ROI 内识别，未命中时回退到全屏识别
+
+        Args:
+            context: 上下文
+            key: ROI 缓存键（通常是 pipeline 节点名）
+            node: 实际执行识别的节点名
+            image: 截图
+            pipeline_override: 额外的 pipeline 覆盖（可选）
+
+        Returns:
+            识别结果（命中时 box 为全屏坐标）
+        """
+        reco_result = self.recognize_in_roi(context, key, node, image, pipeline_override)
+        if reco_result is not None:
+            return reco_result
+
+        start = time.perf_counter()
+        with tracing.span("run_recognition", "recognition", node=node):
+            reco_result = context.run_recognition(node, image, pipeline_override or {})
+        self.record_full_run(key, (image.shape[1], image.shape[0]), time.perf_counter() - start,
+                             reco_result.box if _is_hit(reco_result) else None)
+        return reco_result
+
+    def summary_lines(self) -> List[str]:
+        """每个节点一行的统计信息"""
+        return [f"{key}: {stats.summary()}" for key, stats in sorted(self.stats.items())]
+
+
+_roi_cache: Optional[RoiCache] = None
+_roi_cache_lock = threading.Lock()
+
+
+def get_roi_cache() -> RoiCache:
+    """获取进程内共享的 ROI 缓存（持久化到 agent 配置目录）"""
+    global _roi_cache
+    with _roi_cache_lock:
+        if _roi_cache is None:
+            _roi_cache = RoiCache(get_config_dir() / ROI_CACHE_FILE)
+        return _roi_cache
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+运行时配置
+保存设置类自定义动作（SetDodgeKey、SetAutoBattleMode）写入的配置，供其他动作直接读取属性；
+修改后原子写入 agent/config/runtime_config.json，agent 重启后沿用上次的设置
+"""
+
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from storage import get_config_dir, read_json, atomic_write_json
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 配置文件名（位于 agent 配置目录）
+RUNTIME_CONFIG_FILE = "runtime_config.json"
+
+# 字段声明：字段名 -> (类型, 默认值, 校验函数)
+FIELDS: Dict[str, Tuple[type, Any, Callable[[Any], bool]]] = {
+    # 闪避键虚拟键码，默认左 Shift (0xA0)
+    "dodge_key": (int, 0xA0, lambda v: 1 <= v <= 254),
+    # 自动战斗模式：0=循环按E键, 1=什么也不做
+    "auto_battle_mode": (int, 0, lambda v: v in (0, 1)),
+}
+
+
+class RuntimeConfig:
+    """
+    运行时配置
+
+    字段是普通实例属性，读取没有额外开销（config.dodge_key）；
+    修改通过 update() 校验类型和取值后写入文件
+    """
+
+    __slots__ = tuple(FIELDS) + ("path", "_lock")
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: 持久化文件路径，None 表示不持久化
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        for name, (_, default, _) in FIELDS.items():
+            setattr(self, name, default)
+
+        if path is not None:
+            data = read_json(path, {})
+            if not isinstance(data, dict):
+                data = {}
+            for name, value in data.items():
+                try:
+                    setattr(self, name, self._validate(name, value))
+                except ValueError as e:
+                    logger.warning(f"[RuntimeConfig] 忽略 {path} 中的无效配置: {e}")
+            if data:
+                logger.info(f"[RuntimeConfig] 已加载配置: {self.as_dict()}")
+
+    @staticmethod
+    def _validate(name: str, value: Any) -> Any:
+        if name not in FIELDS:
+            raise ValueError(f"未知配置项 '{name}'")
+        kind, _, check = FIELDS[name]
+        if isinstance(value, bool) or not isinstance(value, kind):
+            raise ValueError(f"配置项 '{name}' 应为 {kind.__name__}，实际为 {value!r}")
+        if not check(value):
+            raise ValueError(f"配置项 '{name}' 的值无效: {value!r}")
+        return value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def update(self, **values) -> bool:
+        """
+        修改配置并持久化
+
+        Raises:
+            ValueError: 配置项未知或取值无效（此时不做任何修改）
+
+        Returns:
+            True 表示配置发生了变化
+        """
+        checked = {name: self._validate(name, value) for name, value in values.items()}
+        with self._lock:
+            changed = {name: value for name, value in checked.items() if getattr(self, name) != value}
+            for name, value in changed.items():
+                setattr(self, name, value)
+        if changed:
+            self.save()
+        return bool(changed)
+
+    def save(self):
+        """持久化到文件"""
+        if self.path is None:
+            return
+        with self._lock:
+            data = self.as_dict()
+        try:
+            atomic_write_json(self.path, data)
+        except OSError as e:
+            logger.warning(f"[RuntimeConfig] 保存配置失败: {e}")
+
+
+_config: Optional[RuntimeConfig] = None
+_config_lock = threading.Lock()
+
+
+def get_runtime_config() -> RuntimeConfig:
+    """获取进程内共享的运行时配置（持久化到 agent 配置目录）"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = RuntimeConfig(get_config_dir() / RUNTIME_CONFIG_FILE)
+        return _config
@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-
 """
 设置自定义动作中的参数
-变相实现变量存储流水线中的某些全局设置
+变相实现变量存储流水线中的某些全局设置（写入运行时配置并持久化，agent 重启后沿用）
 """
 
 from maa.agent.agent_server import AgentServer
 from maa.custom_action import CustomAction
 from maa.context import Context
 import logging
-import json
+from action_params import ParamSchema, Field
+from runtime_config import get_runtime_config
+from roi_cache import get_roi_cache
+import tracing
 
 
 # 获取日志记录器
@@ -21,38 +24,30 @@ class SetDodgeKey(CustomAction):
     用于保存用户选择的闪避键到全局配置中
     """
 
+    PARAM_SCHEMA = ParamSchema(
+        "SetDodgeKey",
+        Field("dodge_key", int, 0x10, check=lambda v: 1 <= v <= 254),  # 默认 Shift = 0x10
+    )
+
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
         try:
-            # 解析参数
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[SetDodgeKey] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
+            # 解析参数（按参数字符串缓存）
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
             
             # 获取闪避键虚拟键码(现在直接是 int)
-            dodge_key_vk = params.get("dodge_key", 0x10)  # 默认 Shift = 0x10
-            
-            # 导入 main 模块以访问全局配置
-            import main
+            dodge_key_vk = params["dodge_key"]
             
-            # 保存到全局配置
-            main.GAME_CONFIG["dodge_key"] = dodge_key_vk
+            # 保存到运行时配置（只修改内存并持久化，不截图）
+            config = get_runtime_config()
+            config.update(dodge_key=dodge_key_vk)
             
             logger.info(f"[SetDodgeKey] [OK] 闪避键已设置为: VK=0x{dodge_key_vk:02X} ({dodge_key_vk})")
-            logger.info(f"[SetDodgeKey] 当前配置: {main.GAME_CONFIG}")
-            
-            # 强制刷新截图缓存，避免后续节点使用旧图
-            logger.info(f"[SetDodgeKey] 刷新截图缓存...")
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            logger.info(f"[SetDodgeKey] [OK] 截图缓存已更新")
+            logger.info(f"[SetDodgeKey] 当前配置: {config.as_dict()}")
             
             return True
             
@@ -73,47 +68,57 @@ class SetAutoBattleMode(CustomAction):
     }
     """
 
+    PARAM_SCHEMA = ParamSchema(
+        "SetAutoBattleMode",
+        Field("auto_battle_mode", int, 0, choices=(0, 1)),
+    )
+
+    @tracing.traced("action", log_timing=True)
     def run(
         self,
         context: Context,
         argv: CustomAction.RunArg,
     ) -> bool:
         try:
-            # 解析参数
-            if isinstance(argv.custom_action_param, str):
-                params = json.loads(argv.custom_action_param)
-            elif isinstance(argv.custom_action_param, dict):
-                params = argv.custom_action_param
-            else:
-                logger.error(f"[SetAutoBattleMode] 参数类型错误: {type(argv.custom_action_param)}")
-                return False
-            
-            # 获取自动战斗模式（默认为 0）
-            auto_battle_mode = params.get("auto_battle_mode", 0)
-            
-            # 验证模式值
-            if auto_battle_mode not in [0, 1]:
-                logger.error(f"[SetAutoBattleMode] 无效的模式值: {auto_battle_mode}，仅支持 0 或 1")
-                return False
+            # 解析参数（按参数字符串缓存，模式值已校验为 0 或 1）
+            params = self.PARAM_SCHEMA.parse(argv.custom_action_param)
+            auto_battle_mode = params["auto_battle_mode"]
             
-            # 导入 main 模块以访问全局配置
-            import main
-            
-            # 保存到全局配置
-            main.GAME_CONFIG["auto_battle_mode"] = auto_battle_mode
+            # 保存到运行时配置（只修改内存并持久化，不截图）
+            config = get_runtime_config()
+            config.update(auto_battle_mode=auto_battle_mode)
             
             mode_desc = "循环按E键" if auto_battle_mode == 0 else "什么也不做"
             logger.info(f"[SetAutoBattleMode] [OK] 自动战斗模式已设置为: {auto_battle_mode} ({mode_desc})")
-            logger.info(f"[SetAutoBattleMode] 当前配置: {main.GAME_CONFIG}")
-            
-            # 强制刷新截图缓存，避免后续节点使用旧图
-            logger.info(f"[SetAutoBattleMode] 刷新截图缓存...")
-            screencap_job = context.tasker.controller.post_screencap()
-            screencap_job.wait()
-            logger.info(f"[SetAutoBattleMode] [OK] 截图缓存已更新")
+            logger.info(f"[SetAutoBattleMode] 当前配置: {config.as_dict()}")
             
             return True
             
         except Exception as e:
             logger.error(f"[SetAutoBattleMode] 发生异常: {e}", exc_info=True)
             return False
+
+
+@AgentServer.custom_action("ResetLearnedRoi")
+class ResetLearnedRoi(CustomAction):
+    """
+    清除自学习的识别区域（ROI）
+    游戏界面布局或分辨率设置变化后执行一次，之后的识别重新从全屏开始学习
+    """
+
+    PARAM_SCHEMA = ParamSchema("ResetLearnedRoi")
+
+    @tracing.traced("action", log_timing=True)
+    def run(
+        self,
+        context: Context,
+        argv: CustomAction.RunArg,
+    ) -> bool:
+        try:
+            get_roi_cache().reset()
+            logger.info("[ResetLearnedRoi] [OK] 已清除学习的识别区域")
+            return True
+
+        except Exception as e:
+            logger.error(f"[ResetLearnedRoi] 发生异常: {e}", exc_info=True)
+            return False
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+启动耗时分析模块
+设置环境变量 MDA_STARTUP_PROFILE=1 启用：记录启动各阶段耗时和每个模块的导入耗时，
+日志系统初始化后输出到日志。未启用时 phase() 返回空上下文管理器，不产生额外开销
+
+本模块只依赖标准库，必须在 main.py 中其他模块导入之前启用
+"""
+
+import os
+import sys
+import time
+import logging
+import importlib.abc
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 启用分析的环境变量
+PROFILE_ENV = "MDA_STARTUP_PROFILE"
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """包装原加载器，记录模块执行耗时"""
+
+    def __init__(self, profiler: "StartupProfiler", loader):
+        self._profiler = profiler
+        self._loader = loader
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        profiler = self._profiler
+        name = module.__name__
+        profiler._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = profiler._stack.pop()
+            if profiler._stack:
+                profiler._stack[-1] += elapsed
+            profiler.imports[name] = (elapsed, elapsed - children)
+
+    def __getattr__(self, name):
+        # get_resource_reader / is_package 等方法交给原加载器
+        return getattr(self._loader, name)
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    """
+    启动耗时记录器
+
+    作为 sys.meta_path 的第一个查找器，只在其余查找器找到模块后替换加载器，
+    记录每个模块的累计导入耗时（含子模块）和自身耗时
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.imports: Dict[str, Tuple[float, float]] = {}
+        self.phases: List[Tuple[str, float, float]] = []
+        self._stack: List[float] = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                spec.loader = _TimedLoader(self, spec.loader)
+            return spec
+        return None
+
+    def install(self):
+        sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def elapsed(self) -> float:
+        """距离开始记录的时间（秒）"""
+        return time.perf_counter() - self.start
+
+    @contextmanager
+    def phase(self, name: str):
+        begin = self.elapsed()
+        try:
+            yield
+        finally:
+            self.phases.append((name, begin, self.elapsed() - begin))
+
+    def mark(self, name: str):
+        """记录一个时间点（如"等待任务"）"""
+        self.phases.append((name, self.elapsed(), 0.0))
+
+    def log(self, top: int = 15):
+        """输出阶段耗时和导入耗时最多的模块"""
+        logger.info("[StartupProfile] 启动阶段 (开始时刻 / 耗时):")
+        for name, begin, duration in self.phases:
+            suffix = f" / {duration * 1000:7.1f}ms" if duration else ""
+            logger.info(f"[StartupProfile]   {begin * 1000:8.1f}ms{suffix}  {name}")
+
+        total = sum(self_time for _, self_time in self.imports.values())
+        logger.info(f"[StartupProfile] 导入 {len(self.imports)} 个模块，自身耗时合计 {total * 1000:.1f}ms，"
+                    f"累计耗时最多的 {top} 个:")
+        ranked = sorted(self.imports.items(), key=lambda item: item[1][0], reverse=True)
+        for name, (cumulative, self_time) in ranked[:top]:
+            logger.info(f"[StartupProfile]   {cumulative * 1000:8.1f}ms (自身 {self_time * 1000:6.1f}ms)  {name}")
+
+
+_profiler: Optional[StartupProfiler] = None
+_started = False
+
+
+class _NullPhase:
+    """未启用分析时使用的空上下文管理器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+def start_from_env() -> Optional[StartupProfiler]:
+    """环境变量 MDA_STARTUP_PROFILE 为 1/true/yes/on 时开始记录（每个进程只记录一次）"""
+    global _profiler, _started
+    if _started:
+        return _profiler
+    _started = True
+    if os.environ.get(PROFILE_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        _profiler = StartupProfiler()
+        _profiler.install()
+    return _profiler
+
+
+def phase(name: str):
+    """
+    记录一个启动阶段
+
+    用法：
+        with startup_profile.phase("加载模板"):
+            load_recognition_resources(logger)
+    """
+    profiler = _profiler
+    if profiler is None:
+        return _NULL_PHASE
+    return profiler.phase(name)
+
+
+def mark(name: str):
+    """记录一个时间点"""
+    if _profiler is not None:
+        _profiler.mark(name)
+
+
+def finish(top: int = 15):
+    """停止记录导入并把结果输出到日志"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    if profiler is not None:
+        profiler.uninstall()
+        profiler.log(top)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+agent 本地数据存储
+提供 agent 配置目录定位和 JSON 文件的原子读写
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+
+def get_config_dir() -> Path:
+    """
+    agent 配置目录
+
+    打包后为可执行文件所在目录下的 config，开发时为 agent/config
+    """
+    if getattr(sys, 'frozen', False):
+        base_dir = Path(sys.executable).parent
+    else:
+        base_dir = Path(__file__).parent
+    return base_dir / "config"
+
+
+def read_json(path: Path, default: Any = None) -> Any:
+    """读取 JSON 文件，文件不存在或内容损坏时返回 default"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+    except (OSError, json.JSONDecodeError) as e:
+        logger.warning(f"[Storage] 读取 {path} 失败，使用默认值: {e}")
+        return default
+
+
+def atomic_write_json(path: Path, data: Any):
+    """
+    原子写入 JSON 文件
+
+    先写入同目录下的临时文件再替换目标文件，写入过程中崩溃不会留下半个文件
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
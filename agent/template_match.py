@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+批量模板匹配模块
+对同一个 ROI 同时匹配 N 个模板：ROI 只做一次预处理（灰度、FFT、积分图），
+每个模板的 FFT 预先计算并按 ROI 尺寸缓存，归一化互相关（与 TemplateMatch method 5 即
+TM_CCOEFF_NORMED 相同）对所有模板一次批量计算，返回按得分排序的结果
+"""
+
+import threading
+import logging
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+
+class TemplateMatchResult(NamedTuple):
+    """单个模板的最佳匹配"""
+    label: str
+    score: float
+    box: Tuple[int, int, int, int]   # 相对 ROI 的 (x, y, w, h)
+
+
+def _window_sums(integral: np.ndarray, th: int, tw: int) -> np.ndarray:
+    """用积分图计算所有 th x tw 窗口的和（结果尺寸为有效匹配位置数）"""
+    return integral[th:, tw:] - integral[:-th, tw:] - integral[th:, :-tw] + integral[:-th, :-tw]
+
+
+class BatchTemplateMatcher:
+    """
+    批量模板匹配器
+    模板按尺寸分组，同尺寸模板共用窗口统计量，并在一次批量逆 FFT 中得到全部相关图
+    """
+
+    def __init__(self, templates: Dict[str, np.ndarray]):
+        """
+        Args:
+            templates: 模板名称 -> 灰度模板（float32）
+        """
+        self.labels = sorted(templates)
+        self._shapes: Dict[str, Tuple[int, int]] = {}
+        self._centered: Dict[str, np.ndarray] = {}
+        self._norms: Dict[str, float] = {}
+        for label, gray in templates.items():
+            gray = np.asarray(gray, dtype=np.float64)
+            centered = gray - gray.mean()
+            self._shapes[label] = gray.shape
+            self._centered[label] = centered
+            self._norms[label] = float(np.sqrt((centered * centered).sum()))
+
+        # (ROI 尺寸, 模板组) -> 模板频谱（共轭）
+        self._spectra: Dict[Tuple, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def _group_spectra(self, roi_shape: Tuple[int, int], labels: Tuple[str, ...]) -> np.ndarray:
+        key = (roi_shape, labels)
+        with self._lock:
+            spectra = self._spectra.get(key)
+        if spectra is None:
+            padded = np.zeros((len(labels),) + roi_shape, dtype=np.float64)
+            for i, label in enumerate(labels):
+                th, tw = self._shapes[label]
+                padded[i, :th, :tw] = self._centered[label]
+            spectra = np.conj(np.fft.rfft2(padded))
+            with self._lock:
+                self._spectra[key] = spectra
+        return spectra
+
+    def match(self, gray_roi: np.ndarray, labels: Optional[Sequence[str]] = None) -> List[TemplateMatchResult]:
+        """
+        在 ROI 中匹配全部（或指定的）模板
+
+        Args:
+            gray_roi: ROI 灰度图
+            labels: 参与匹配的模板名称，None 表示全部
+
+        Returns:
+            每个模板的最佳匹配，按得分从高到低排列（比 ROI 大的模板被跳过）
+        """
+        roi = np.asarray(gray_roi, dtype=np.float64)
+        roi_shape = roi.shape
+        labels = self.labels if labels is None else list(labels)
+
+        # ROI 只预处理一次：频谱 + 积分图
+        roi_spectrum = np.fft.rfft2(roi)
+        integral = np.zeros((roi_shape[0] + 1, roi_shape[1] + 1), dtype=np.float64)
+        integral[1:, 1:] = roi.cumsum(axis=0).cumsum(axis=1)
+        integral_sq = np.zeros_like(integral)
+        integral_sq[1:, 1:] = (roi * roi).cumsum(axis=0).cumsum(axis=1)
+
+        groups: Dict[Tuple[int, int], List[str]] = {}
+        for label in labels:
+            th, tw = self._shapes[label]
+            if th <= roi_shape[0] and tw <= roi_shape[1]:
+                groups.setdefault((th, tw), []).append(label)
+
+        results = []
+        for (th, tw), group in groups.items():
+            group = tuple(group)
+            # 窗口方差（同尺寸模板共用）
+            count = th * tw
+            sums = _window_sums(integral, th, tw)
+            sums_sq = _window_sums(integral_sq, th, tw)
+            window_std = np.sqrt(np.maximum(sums_sq - sums * sums / count, 0.0))
+
+            # 批量相关：一次逆 FFT 得到该组全部模板的相关图
+            correlation = np.fft.irfft2(roi_spectrum[None] * self._group_spectra(roi_shape, group), s=roi_shape)
+            valid = correlation[:, :roi_shape[0] - th + 1, :roi_shape[1] - tw + 1]
+
+            for i, label in enumerate(group):
+                denominator = window_std * self._norms[label]
+                scores = np.divide(valid[i], denominator, out=np.zeros_like(denominator), where=denominator > 1e-6)
+                best = int(scores.argmax())
+                y, x = np.unravel_index(best, scores.shape)
+                results.append(TemplateMatchResult(label, float(scores.flat[best]), (int(x), int(y), tw, th)))
+
+        results.sort(key=lambda result: result.score, reverse=True)
+        return results
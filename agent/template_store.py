@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+模板缓存模块
+启动时把资源包 image 目录下的全部 PNG 模板解码为灰度图，并预先计算 1/2、1/4 金字塔层，
+结果以 .npy 文件缓存在 agent 配置目录中（按文件哈希失效），之后启动直接以 mmap 方式加载。
+查询按 pipeline 中 template 的写法（相对 image 目录的路径）进行
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from image_io import is_png, load_png, to_gray, downscale
+from storage import get_config_dir, read_json, atomic_write_json
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 缓存目录名（位于 agent 配置目录）
+TEMPLATE_CACHE_DIR = "template_cache"
+# 缓存索引文件名
+TEMPLATE_CACHE_INDEX = "index.json"
+# 缓存格式版本，解码或金字塔算法变化时递增
+TEMPLATE_CACHE_VERSION = 1
+# 金字塔层数：0 为原图，1 为 1/2，2 为 1/4
+PYRAMID_LEVELS = 3
+
+
+def normalize_template_path(path: str) -> str:
+    """统一模板路径写法（pipeline 中可能使用反斜杠）"""
+    return path.replace("\\", "/").lstrip("/")
+
+
+def _file_hash(path: Path) -> Optional[str]:
+    """文件内容摘要，不是 PNG 文件（例如占位用的空文件）时返回 None"""
+    with open(path, "rb") as f:
+        data = f.read()
+    return hashlib.sha1(data).hexdigest() if is_png(data) else None
+
+
+def _build_pyramid(path: Path) -> List[np.ndarray]:
+    """解码 PNG 并生成灰度金字塔"""
+    gray = to_gray(load_png(path))
+    levels = [gray]
+    for _ in range(1, PYRAMID_LEVELS):
+        levels.append(downscale(levels[-1], 2))
+    return levels
+
+
+def _atomic_save_npy(path: Path, array: np.ndarray):
+    """原子写入 .npy 文件"""
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, np.ascontiguousarray(array, dtype=np.float32))
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class TemplateStore:
+    """
+    模板缓存
+    每个模板保存 PYRAMID_LEVELS 层 float32 灰度图，缓存命中时以只读 mmap 方式加载
+    """
+
+    def __init__(self, image_dir: Path, cache_dir: Optional[Path] = None, workers: Optional[int] = None):
+        """
+        Args:
+            image_dir: 资源包 image 目录
+            cache_dir: 缓存目录，None 表示不持久化（每次启动都解码）
+            workers: 并行解码的线程数，None 表示按 CPU 数决定
+        """
+        self.image_dir = Path(image_dir)
+        self.cache_dir = cache_dir
+        self.workers = workers or min(8, (os.cpu_count() or 1) + 2)
+        self._levels: Dict[str, List[np.ndarray]] = {}
+        self.cache_hits = 0
+        self.decoded = 0
+        self.failed = 0
+        self.load_time = 0.0
+
+    def __contains__(self, path: str) -> bool:
+        return normalize_template_path(path) in self._levels
+
+    def __len__(self) -> int:
+        return len(self._levels)
+
+    @property
+    def paths(self) -> List[str]:
+        """已加载的模板路径"""
+        return sorted(self._levels)
+
+    def get(self, path: str, level: int = 0) -> np.ndarray:
+        """
+        获取模板灰度图
+
+        Args:
+            path: 模板路径（与 pipeline 中 template 的写法一致）
+            level: 金字塔层（0 原图，1 为 1/2，2 为 1/4）
+
+        Raises:
+            KeyError: 模板不存在（不是有效的 PNG 或不在 image 目录中）
+        """
+        return self._levels[normalize_template_path(path)][level]
+
+    def shape(self, path: str) -> Tuple[int, int]:
+        """模板原图尺寸 (高, 宽)"""
+        return self.get(path).shape
+
+    def load(self) -> "TemplateStore":
+        """加载全部模板：缓存命中的直接 mmap，其余并行解码并写入缓存"""
+        start = time.perf_counter()
+        files = {path.relative_to(self.image_dir).as_posix(): path
+                 for path in sorted(self.image_dir.rglob("*.png"))}
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            hashes = dict(zip(files, pool.map(_file_hash, files.values())))
+        for key in [key for key, digest in hashes.items() if digest is None]:
+            logger.debug(f"[TemplateStore] 跳过非 PNG 文件: {files.pop(key)}")
+            del hashes[key]
+
+        index = self._read_index()
+        stale = []
+        for key, digest in hashes.items():
+            entry = index.get(key)
+            levels = self._load_cached(digest) if entry == digest else None
+            if levels is None:
+                stale.append(key)
+            else:
+                self._levels[key] = levels
+                self.cache_hits += 1
+
+        if stale:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                results = list(pool.map(self._decode, [files[key] for key in stale]))
+            for key, levels in zip(stale, results):
+                if levels is None:
+                    self.failed += 1
+                    continue
+                self._levels[key] = levels
+                self.decoded += 1
+                self._save_cached(hashes[key], levels)
+
+        self._write_index({key: hashes[key] for key in self._levels}, index)
+        self.load_time = time.perf_counter() - start
+        logger.info(f"[TemplateStore] {self.summary()}")
+        return self
+
+    def summary(self) -> str:
+        """单行统计，用于日志输出"""
+        return (f"已加载 {len(self._levels)} 个模板（缓存 {self.cache_hits}，解码 {self.decoded}，"
+                f"失败 {self.failed}），用时 {self.load_time * 1000:.0f}ms")
+
+    def _decode(self, path: Path) -> Optional[List[np.ndarray]]:
+        try:
+            return _build_pyramid(path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[TemplateStore] 跳过无法解码的模板 {path}: {e}")
+            return None
+
+    def _level_path(self, digest: str, level: int) -> Path:
+        return self.cache_dir / f"{digest}_{level}.npy"
+
+    def _load_cached(self, digest: str) -> Optional[List[np.ndarray]]:
+        if self.cache_dir is None:
+            return None
+        try:
+            return [np.load(self._level_path(digest, level), mmap_mode="r") for level in range(PYRAMID_LEVELS)]
+        except (OSError, ValueError):
+            return None
+
+    def _save_cached(self, digest: str, levels: List[np.ndarray]):
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for level, array in enumerate(levels):
+                _atomic_save_npy(self._level_path(digest, level), array)
+        except OSError as e:
+            logger.warning(f"[TemplateStore] 写入模板缓存失败: {e}")
+
+    def _read_index(self) -> Dict[str, str]:
+        if self.cache_dir is None:
+            return {}
+        data = read_json(self.cache_dir / TEMPLATE_CACHE_INDEX, {})
+        if not isinstance(data, dict) or data.get("version") != TEMPLATE_CACHE_VERSION:
+            return {}
+        entries = data.get("templates", {})
+        return entries if isinstance(entries, dict) else {}
+
+    def _write_index(self, entries: Dict[str, str], old_entries: Dict[str, str]):
+        """写入缓存索引，并删除不再被引用的缓存文件"""
+        if self.cache_dir is None or (entries == old_entries and not self.decoded):
+            return
+        try:
+            atomic_write_json(self.cache_dir / TEMPLATE_CACHE_INDEX,
+                              {"version": TEMPLATE_CACHE_VERSION, "templates": entries})
+        except OSError as e:
+            logger.warning(f"[TemplateStore] 写入模板缓存索引失败: {e}")
+            return
+
+        live = set(entries.values())
+        for path in self.cache_dir.glob("*.npy"):
+            if path.name.split("_", 1)[0] not in live:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+_template_store: Optional[TemplateStore] = None
+_template_store_lock = threading.Lock()
+
+
+def load_template_store(image_dir: Path) -> TemplateStore:
+    """启动时加载模板缓存（缓存位于 agent 配置目录）"""
+    global _template_store
+    store = TemplateStore(image_dir, get_config_dir() / TEMPLATE_CACHE_DIR).load()
+    with _template_store_lock:
+        _template_store = store
+    return store
+
+
+def get_template_store() -> Optional[TemplateStore]:
+    """获取已加载的模板缓存，未加载时返回 None"""
+    return _template_store
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+耗时追踪模块
+在动作、截图、识别、按键事件和主动等待处记录时间片段，输出 Chrome trace-event JSON
+（可直接拖入 https://ui.perfetto.dev 或 chrome://tracing 查看）。
+
+设置环境变量 MDA_TRACE=1 启用，追踪文件写入 logs_agent/trace_*.json（运行中每隔几秒追加写入），
+每 max_events 个事件轮换一个文件，只保留最近 keep_files 个。
+未启用时 span()/instant()/sleep() 只做一次全局变量判断
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 获取日志记录器
+logger = logging.getLogger(__name__)
+
+# 启用追踪的环境变量
+TRACE_ENV = "MDA_TRACE"
+# 默认输出目录（与日志目录相同）
+TRACE_DIR = "logs_agent"
+
+
+class Tracer:
+    """
+    追踪事件收集器
+    事件先缓存在内存中，后台线程每 flush_interval 秒追加写入当前追踪文件。
+    文件使用 trace-event 的 JSON 数组格式，结尾的 "]" 可以省略，
+    agent 进程被直接结束时已写出的部分仍可打开
+    """
+
+    def __init__(self, out_dir: Path, max_events: int = 100_000, keep_files: int = 5,
+                 flush_interval: float = 2.0):
+        """
+        Args:
+            out_dir: 输出目录
+            max_events: 每个文件的事件数上限
+            keep_files: 保留的文件数
+            flush_interval: 写入间隔（秒）
+        """
+        self.out_dir = Path(out_dir)
+        self.max_events = max_events
+        self.keep_files = keep_files
+        self.flush_interval = flush_interval
+        self.pid = os.getpid()
+        self.prefix = f"trace_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self._epoch = time.perf_counter_ns()
+        self._events: List[Dict[str, Any]] = []
+        self._thread_names: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        # 当前追踪文件（只在持有 _write_lock 时访问）
+        self._write_lock = threading.Lock()
+        self._file = None
+        self._file_index = 0
+        self._file_events = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="TraceWriter", daemon=True)
+        self._flusher.start()
+
+    def now_us(self) -> float:
+        """相对追踪开始的时间（微秒）"""
+        return (time.perf_counter_ns() - self._epoch) / 1000
+
+    def add(self, event: Dict[str, Any]):
+        """添加一个事件（自动补充 pid/tid）"""
+        tid = threading.get_ident()
+        event["pid"] = self.pid
+        event["tid"] = tid
+        with self._lock:
+            if tid not in self._thread_names:
+                metadata = {
+                    "ph": "M", "name": "thread_name", "pid": self.pid, "tid": tid,
+                    "args": {"name": threading.current_thread().name},
+                }
+                self._thread_names[tid] = metadata
+                self._events.append(metadata)
+            self._events.append(event)
+
+    def complete(self, name: str, cat: str, start_us: float, args: Optional[Dict[str, Any]] = None):
+        """添加一个从 start_us 到现在的时间片段（X 事件）"""
+        event = {"ph": "X", "name": name, "cat": cat, "ts": start_us, "dur": self.now_us() - start_us}
+        if args:
+            event["args"] = args
+        self.add(event)
+
+    def instant(self, name: str, cat: str, args: Optional[Dict[str, Any]] = None):
+        """添加一个瞬时事件（i 事件，线程范围）"""
+        event = {"ph": "i", "s": "t", "name": name, "cat": cat, "ts": self.now_us()}
+        if args:
+            event["args"] = args
+        self.add(event)
+
+    def flush(self):
+        """写出内存中的剩余事件"""
+        with self._lock:
+            events, self._events = self._events, []
+        if events:
+            self._write(events)
+
+    def close(self):
+        """停止后台写入，写出剩余事件并结束当前文件"""
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+        with self._write_lock:
+            self._close_file()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def _write(self, events: List[Dict[str, Any]]):
+        with self._write_lock:
+            try:
+                while events:
+                    if self._file is None:
+                        self._open_file()
+                    count = min(len(events), self.max_events - self._file_events)
+                    chunk, events = events[:count], events[count:]
+                    self._file.write("".join(
+                        ",\n" + json.dumps(event, ensure_ascii=False, separators=(",", ":")) for event in chunk
+                    ))
+                    self._file.flush()
+                    self._file_events += len(chunk)
+                    if self._file_events >= self.max_events:
+                        self._close_file()
+            except OSError as e:
+                logger.warning(f"[Tracing] 写出追踪文件失败: {e}")
+
+    def _open_file(self):
+        """开始一个新文件：写入数组开头和已知线程名，并轮换旧文件"""
+        path = self.out_dir / f"{self.prefix}_{self._file_index:03d}.json"
+        self._file_index += 1
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        with self._lock:
+            metadata = list(self._thread_names.values())
+        self._file.write("[" + json.dumps({"ph": "M", "name": "process_name", "pid": self.pid,
+                                            "args": {"name": "MaaAgent"}}, separators=(",", ":")))
+        for event in metadata:
+            self._file.write(",\n" + json.dumps(event, ensure_ascii=False, separators=(",", ":")))
+        self._file_events = 0
+        logger.info(f"[Tracing] 开始写入追踪文件: {path}")
+
+        # 轮换：只保留最近 keep_files 个追踪文件（文件名按时间和序号排序）
+        files = sorted(self.out_dir.glob("trace_*.json"))
+        for old in files[:-self.keep_files]:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def _close_file(self):
+        if self._file is None:
+            return
+        try:
+            self._file.write("\n]\n")
+            self._file.close()
+        except OSError as e:
+            logger.warning(f"[Tracing] 结束追踪文件失败: {e}")
+        logger.info(f"[Tracing] 已写出 {self._file_events} 个事件: {self._file.name}")
+        self._file = None
+
+
+class _Span:
+    """时间片段上下文管理器"""
+
+    __slots__ = ("tracer", "name", "cat", "args", "start")
+
+    def __init__(self, tracer: Tracer, name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = self.tracer.now_us()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = f"{exc_type.__name__}: {exc}"
+        self.tracer.complete(self.name, self.cat, self.start, self.args)
+        return False
+
+
+class _NullSpan:
+    """未启用追踪时使用的空上下文管理器"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_tracer: Optional[Tracer] = None
+
+
+def span(name: str, cat: str = "agent", **args):
+    """
+    记录一个时间片段
+
+    用法：
+        with tracing.span("run_recognition", "recognition", node=node):
+            context.run_recognition(node, image)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, cat, args)
+
+
+def instant(name: str, cat: str = "agent", **args):
+    """记录一个瞬时事件（如按键按下/释放）"""
+    tracer = _tracer
+    if tracer is not None:
+        tracer.instant(name, cat, args)
+
+
+def sleep(seconds: float, name: str = "sleep"):
+    """主动等待：启用追踪时记录为 sleep 类别的时间片段"""
+    tracer = _tracer
+    if tracer is None:
+        time.sleep(seconds)
+        return
+    start = tracer.now_us()
+    time.sleep(seconds)
+    tracer.complete(name, "sleep", start, {"seconds": seconds})
+
+
+def traced(cat: str, log_timing: bool = False):
+    """
+    装饰自定义动作的 run / 自定义识别的 analyze，以类名为片段名、节点名为参数记录整个调用
+
+    Args:
+        cat: 片段类别
+        log_timing: 是否在每次调用结束时输出一行节点耗时日志（与是否启用追踪无关，
+                    供 tools/analyze_logs.py 统计各节点耗时）
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, context, argv):
+            tracer = _tracer
+            if tracer is None and not log_timing:
+                return func(self, context, argv)
+
+            node = getattr(argv, "node_name", "")
+            start = time.perf_counter()
+            result = False
+            try:
+                if tracer is None:
+                    result = func(self, context, argv)
+                else:
+                    with _Span(tracer, type(self).__name__, cat, {"node": node}):
+                        result = func(self, context, argv)
+                return result
+            finally:
+                if log_timing:
+                    logger.info(f"[NodeTiming] {'[OK]' if result else '[X]'} '{node}' ({type(self).__name__}) "
+                                f"用时 {int((time.perf_counter() - start) * 1000)}ms")
+        return wrapper
+    return decorator
+
+
+def is_enabled() -> bool:
+    """是否已启用追踪"""
+    return _tracer is not None
+
+
+def start_tracing(out_dir: Path = Path(TRACE_DIR), **kwargs) -> Tracer:
+    """启用追踪（kwargs 传给 Tracer）"""
+    global _tracer
+    _tracer = Tracer(out_dir, **kwargs)
+    logger.info(f"[Tracing] 已启用，追踪文件: {_tracer.out_dir / _tracer.prefix}_*.json")
+    return _tracer
+
+
+def start_tracing_from_env() -> Optional[Tracer]:
+    """环境变量 MDA_TRACE 为 1/true/yes/on 时启用追踪"""
+    if os.environ.get(TRACE_ENV, "").strip().lower() in ("1", "true", "yes", "on"):
+        return start_tracing()
+    return None
+
+
+def stop_tracing():
+    """停止追踪并写出剩余事件"""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None:
+        tracer.close()
@@ -1,37 +1,482 @@
 import sys
+import json
+import os
+import time
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
-from typing import List
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
 from maa.resource import Resource
+from maa.library import Library
 from maa.tasker import Tasker, LoggingLevelEnum
 
+# 校验清单：记录每个资源包上次校验通过时的文件哈希，资源包及其之前的资源包都未变化时跳过校验
+DEFAULT_MANIFEST = ".check_resource_manifest.json"
+MANIFEST_VERSION = 2
 
-def check(dirs: List[Path]) -> bool:
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_bundle(bundle: Path, previous: Dict[str, list]) -> Tuple[str, Dict[str, list], int]:
+    """
+    计算资源包内全部文件的哈希
+
+    大小和修改时间与上次记录相同的文件直接沿用上次的哈希
+
+    Returns:
+        (资源包摘要, {相对路径: [大小, 修改时间, sha1]}, 重新计算哈希的文件数)
+    """
+    files = {}
+    to_hash = []
+    for path in sorted(p for p in bundle.rglob("*") if p.is_file()):
+        rel = path.relative_to(bundle).as_posix()
+        stat = path.stat()
+        old = previous.get(rel)
+        if old and old[0] == stat.st_size and old[1] == stat.st_mtime_ns:
+            files[rel] = old
+        else:
+            files[rel] = [stat.st_size, stat.st_mtime_ns, None]
+            to_hash.append((rel, path))
+
+    with ThreadPoolExecutor() as pool:
+        for (rel, _), digest in zip(to_hash, pool.map(_hash_file, [path for _, path in to_hash])):
+            files[rel][2] = digest
+
+    bundle_digest = hashlib.sha1()
+    for rel, (_, _, digest) in files.items():
+        bundle_digest.update(f"{rel}\0{digest}\n".encode("utf-8"))
+    return bundle_digest.hexdigest(), files, len(to_hash)
+
+
+def validate_nodes(resource: Resource, bundles: List[Path]) -> List[str]:
+    """已加载资源的节点引用检查：next/on_error 指向的节点和模板图片（在任一已加载资源包中）必须存在"""
+    errors = []
+    names = set(resource.node_list)
+    image_dirs = [bundle / "image" for bundle in bundles]
+    for name in sorted(names):
+        data = resource.get_node_data(name) or {}
+        for field in ("next", "on_error"):
+            for target in data.get(field, []):
+                target_name = target.get("name") if isinstance(target, dict) else target
+                if target_name not in names:
+                    errors.append(f"{name}.{field} -> {target_name}: node not found")
+        recognition = data.get("recognition", {})
+        param = recognition.get("param", {}) if isinstance(recognition, dict) else {}
+        templates = param.get("template", []) if isinstance(param, dict) else []
+        for template in [templates] if isinstance(templates, str) else templates:
+            if not any((image_dir / template).exists() for image_dir in image_dirs):
+                errors.append(f"{name}: template {template} not found")
+    return errors
+
+
+def _init_worker():
+    Tasker.set_stdout_level(LoggingLevelEnum.All)
+
+
+def check_bundle(bundles: List[str]) -> Tuple[str, bool, float, float, List[str]]:
+    """
+    在工作进程中按顺序加载资源包（后面的资源包覆盖前面的），并校验合并后的资源
+
+    Args:
+        bundles: 要校验的资源包及其之前的全部资源包，要校验的资源包在最后
+
+    Returns:
+        (资源包路径, 是否通过, 加载耗时, 校验耗时, 错误信息)
+    """
+    bundle = bundles[-1]
     resource = Resource()
+    start = time.perf_counter()
+    for path in bundles:
+        if not resource.post_bundle(path).wait().status.succeeded:
+            return bundle, False, time.perf_counter() - start, 0.0, [f"failed to load bundle {path}"]
+    load_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    errors = validate_nodes(resource, [Path(path) for path in bundles])
+    return bundle, not errors, load_time, time.perf_counter() - start, errors
+
+
+def _load_manifest(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("maa_version") != Library.version():
+        return {}
+    return manifest
+
+
+def _save_manifest(path: Path, manifest: dict):
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def check(dirs: List[Path], manifest_path: Optional[Path] = None, jobs: Optional[int] = None,
+          force: bool = False) -> bool:
+    """
+    校验资源包：资源包及其之前的全部资源包都与清单中记录一致时跳过，其余在多个进程中并行校验。
+    与 Resource 的加载方式相同，后面的资源包覆盖前面的资源包，因此每个资源包都和它之前的资源包一起加载
+
+    Args:
+        dirs: 资源包目录（按加载顺序）
+        manifest_path: 校验清单路径，None 表示不使用清单（全部校验）
+        jobs: 并行进程数，默认按 CPU 数决定
+        force: 忽略清单，校验全部资源包（校验结果仍写入清单）
+    """
+    manifest = _load_manifest(manifest_path) if manifest_path else {}
+    bundles = manifest.get("bundles", {})
 
     print(f"Checking {len(dirs)} directories...")
 
-    for dir in dirs:
-        print(f"Checking {dir}...")
-        status = resource.post_bundle(dir).wait().status
-        if not status.succeeded:
-            print(f"Failed to check {dir}.")
-            return False
+    start = time.perf_counter()
+    pending = {}
+    chain = hashlib.sha1()
+    for index, dir in enumerate(dirs):
+        key = str(dir.resolve())
+        previous = bundles.get(key, {})
+        digest, files, rehashed = hash_bundle(dir, previous.get("files", {}))
+        # 跳过校验的依据包含之前全部资源包的摘要：基础资源包变化时，覆盖它的资源包也要重新校验
+        chain.update(f"{digest}\n".encode("utf-8"))
+        entry = {"digest": digest, "chain": chain.hexdigest(), "files": files}
+        if not force and previous.get("chain") == entry["chain"]:
+            print(f"Skipping {dir}: unchanged ({len(files)} files)")
+            bundles[key] = entry
+            continue
+        reason = "Forced" if force else ("Changed" if previous.get("digest") != digest else "Base changed")
+        print(f"{reason} {dir}: {rehashed}/{len(files)} files rehashed")
+        pending[key] = (dir, entry, [str(d) for d in dirs[:index + 1]])
+    print(f"Hashing took {time.perf_counter() - start:.2f}s")
+
+    ok = True
+    if pending:
+        workers = min(len(pending), jobs or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+            results = list(pool.map(check_bundle, [stack for _, _, stack in pending.values()]))
+
+        for (key, (dir, entry, _)), (_, succeeded, load_time, validate_time, errors) in zip(pending.items(), results):
+            print(f"Checked {dir}: load {load_time:.2f}s, validate {validate_time:.2f}s")
+            for error in errors:
+                print(f"  {error}")
+            if succeeded:
+                bundles[key] = entry
+            else:
+                print(f"Failed to check {dir}.")
+                bundles.pop(key, None)
+                ok = False
+
+    if manifest_path:
+        _save_manifest(manifest_path, {
+            "version": MANIFEST_VERSION,
+            "maa_version": Library.version(),
+            "bundles": bundles,
+        })
+
+    if ok:
+        print("All directories checked.")
+    return ok
+
+
+# ========== 运行时间预算分析（--budget） ==========
+
+# MaaFramework pipeline 字段默认值（毫秒）
+DEFAULT_PRE_DELAY = 200
+DEFAULT_POST_DELAY = 200
+DEFAULT_TIMEOUT = 20000
+
+# 自定义动作参数默认值，与 agent 中各动作的 PARAM_SCHEMA 保持一致
+MOVEMENT_DURATION_DEFAULTS = {
+    "RunWithShift": 2.0,
+    "LongPressKey": 1.0,
+    "PressMultipleKeys": 1.0,
+    "RunWithJump": 3.0,
+}
+
+# 每个入口最多枚举的循环路径数
+MAX_CYCLES = 10000
+
+
+class NodeCost:
+    """单个节点执行一次的耗时估计（毫秒）"""
+
+    def __init__(self, best: float, worst: float, acting: float, waiting: float, detail: str):
+        self.best = best          # 最快（识别首轮命中、等待立即结束）
+        self.worst = worst        # 最慢（所有等待都到超时）
+        self.acting = acting      # 其中的按键动作时长（路线本身需要的时间）
+        self.waiting = waiting    # 其中的固定等待（pre/post_delay、wait_freezes、复位等待等）
+        self.detail = detail
+
+
+def load_pipelines(resource_dir: Path) -> Dict[str, dict]:
+    """合并资源包中的全部 pipeline 节点"""
+    nodes = {}
+    for path in sorted((resource_dir / "pipeline").rglob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            for name, node in json.load(f).items():
+                if isinstance(node, dict):
+                    nodes[name] = node
+    return nodes
 
-    print("All directories checked.")
+
+def _freeze_ms(value) -> float:
+    """pre/post_wait_freezes 的最短等待时间"""
+    if isinstance(value, dict):
+        return float(value.get("time", 0))
+    return float(value or 0)
+
+
+def _param(node: dict) -> dict:
+    param = node.get("custom_action_param", {})
+    if isinstance(param, str):
+        try:
+            param = json.loads(param)
+        except json.JSONDecodeError:
+            param = {}
+    return param if isinstance(param, dict) else {}
+
+
+def _movement_ms(action: str, param: dict) -> float:
+    if action == "RouteMacro":
+        total = 0.0
+        for step in param.get("steps", []):
+            if isinstance(step, (list, tuple)) and len(step) == 2:
+                step_action, step_param = step
+                if step_action == "Wait":
+                    total += float(step_param) * 1000
+                elif isinstance(step_param, dict):
+                    total += _movement_ms(step_action, step_param)
+        return total
+    return float(param.get("duration", MOVEMENT_DURATION_DEFAULTS.get(action, 0.0))) * 1000
+
+
+def node_cost(node: dict) -> NodeCost:
+    """估计节点动作部分（pre_delay + 动作 + post_delay）的耗时"""
+    fixed = (node.get("pre_delay", DEFAULT_PRE_DELAY) + node.get("post_delay", DEFAULT_POST_DELAY)
+             + _freeze_ms(node.get("pre_wait_freezes")) + _freeze_ms(node.get("post_wait_freezes")))
+    parts = [f"delay {fixed:.0f}"]
+    best = worst = acting = 0.0
+    waiting = float(fixed)
+
+    if node.get("action") == "Custom":
+        action = node.get("custom_action", "")
+        param = _param(node)
+        if action in MOVEMENT_DURATION_DEFAULTS or action == "RouteMacro":
+            acting = _movement_ms(action, param)
+            best = worst = acting
+            parts.append(f"{action} {acting:.0f}")
+        elif action == "ResetCharacterPosition":
+            wait_delay = float(param.get("wait_delay", 500))
+            step_timeout = float(param.get("retry_times", 10)) * float(param.get("retry_interval", 500))
+            best = wait_delay
+            worst = wait_delay + 4 * step_timeout
+            waiting += wait_delay
+            parts.append(f"复位等待 {wait_delay:.0f}, 每步超时 {step_timeout:.0f}")
+        elif action == "AutoBattle":
+            # 战斗时长由游戏决定，只计入检测粒度（目标出现后最多再等一个检测间隔）
+            detect_interval = float(param.get("detect_interval", 500))
+            best = 0.0
+            worst = float(param.get("total_timeout", 180000))
+            parts.append(f"检测间隔 {detect_interval:.0f}, 总超时 {worst:.0f}")
+
+    return NodeCost(best + fixed, worst + fixed, acting, waiting, ", ".join(parts))
+
+
+def _as_list(value) -> List[str]:
+    """next / on_error 可以写成单个字符串或列表"""
+    if isinstance(value, str):
+        return [value]
+    return list(value or [])
+
+
+def successors(name: str, node: dict) -> List[Tuple[str, bool]]:
+    """节点的后继：(节点名, 是否为 on_error 边)；AutoBattle 成功后跳转到 target_node"""
+    next_nodes = _as_list(node.get("next"))
+    result = [(child, False) for child in next_nodes]
+    if node.get("action") == "Custom" and node.get("custom_action") == "AutoBattle":
+        target = _param(node).get("target_node", "again_for_win")
+        if target not in next_nodes:
+            result.append((target, False))
+    result.extend((child, True) for child in _as_list(node.get("on_error")))
+    return result
+
+
+def transition_ms(parent: dict, child: dict, is_error: bool) -> Tuple[float, float]:
+    """从 parent 动作结束到 child 开始的识别等待 (最快, 最慢)"""
+    timeout = float(parent.get("timeout", DEFAULT_TIMEOUT))
+    if is_error:
+        return timeout, timeout
+    if child.get("recognition", "DirectHit") == "DirectHit":
+        return 0.0, 0.0
+    return 0.0, timeout
+
+
+def find_cycles(nodes: Dict[str, dict], entry: str) -> Tuple[List[Tuple[list, list]], List[str]]:
+    """
+    从入口出发枚举所有简单环（循环路径）
+
+    Returns:
+        ([(入口到环之前的节点, 环)]（节点项为 (节点名, 进入该节点是否经过 on_error)）, 缺失的节点名)
+    """
+    cycles = []
+    missing = set()
+    path: List[Tuple[str, bool]] = []
+    on_path: Dict[str, int] = {}
+
+    def visit(name: str, via_error: bool):
+        if len(cycles) >= MAX_CYCLES:
+            return
+        if name not in nodes:
+            missing.add(name)
+            return
+        if name in on_path:
+            start = on_path[name]
+            cycle = path[start:]
+            # 闭合边写到环的第一个节点上
+            cycles.append((path[:start], [(cycle[0][0], via_error)] + cycle[1:]))
+            return
+        on_path[name] = len(path)
+        path.append((name, via_error))
+        for child, is_error in successors(name, nodes[name]):
+            visit(child, is_error)
+        path.pop()
+        del on_path[name]
+
+    visit(entry, False)
+    return cycles, sorted(missing)
+
+
+def cycle_cost(nodes: Dict[str, dict], cycle: List[Tuple[str, bool]]) -> Tuple[float, float]:
+    best = worst = 0.0
+    for index, (name, via_error) in enumerate(cycle):
+        parent = nodes[cycle[index - 1][0]]
+        t_best, t_worst = transition_ms(parent, nodes[name], via_error)
+        cost = node_cost(nodes[name])
+        best += t_best + cost.best
+        worst += t_worst + cost.worst
+    return best, worst
+
+
+def budget_report(nodes: Dict[str, dict], entry: str, title: str, top: int) -> bool:
+    """输出一个入口的运行时间预算，入口不存在或没有循环时返回 False"""
+    print(f"\n[{entry}] {title}".rstrip())
+    if entry not in nodes:
+        print("  [X] 入口节点不存在")
+        return False
+
+    cycles, missing = find_cycles(nodes, entry)
+    for name in missing:
+        print(f"  [!] 引用了不存在的节点: {name}")
+
+    normal = [(prefix, c) for prefix, c in cycles if not any(via_error for _, via_error in prefix + c)]
+    recovery = [c for prefix, c in cycles if any(via_error for _, via_error in prefix + c)]
+    if not normal:
+        print("  [!] 没有找到不经过 on_error 的循环")
+        return False
+
+    costs = [(cycle_cost(nodes, c), prefix, c) for prefix, c in normal]
+    (fast_best, _), fast_prefix, fast = min(costs, key=lambda item: item[0][0])
+    (_, slow_worst), _, slow = max(costs, key=lambda item: item[0][1])
+    print(f"  循环路径 {len(normal)} 条（另有 {len(recovery)} 条经过 on_error 的恢复路径）")
+    print(f"  每轮最快 {fast_best / 1000:.1f}s（{len(fast)} 个节点，{fast[0][0]} -> ... -> {fast[-1][0]}）")
+    print(f"  每轮最慢 {slow_worst / 1000:.1f}s（所有识别等到超时、AutoBattle 等到总超时）")
+    if recovery:
+        worst_recovery = max(cycle_cost(nodes, c)[1] for c in recovery)
+        print(f"  含 on_error 恢复的最慢一轮 {worst_recovery / 1000:.1f}s")
+
+    if fast_prefix:
+        prefix_best = sum(node_cost(nodes[name]).best for name, _ in fast_prefix)
+        print(f"  首轮进入循环前: {len(fast_prefix)} 个节点，最快 {prefix_best / 1000:.1f}s "
+              f"（{' -> '.join(name for name, _ in fast_prefix)}）")
+
+    # 固定等待：所有循环路径中出现的节点
+    loop_nodes = sorted({name for _, c in normal for name, _ in c})
+    acting = sum(node_cost(nodes[name]).acting for name, _ in fast)
+    waiting = sum(node_cost(nodes[name]).waiting for name, _ in fast)
+    print(f"  最快路径中：按键动作 {acting / 1000:.1f}s，固定等待 {waiting / 1000:.1f}s "
+          f"（{waiting / max(fast_best, 1):.0%}）")
+
+    ranked = sorted(loop_nodes, key=lambda name: node_cost(nodes[name]).waiting, reverse=True)[:top]
+    print("  固定等待最多的节点:")
+    for name in ranked:
+        cost = node_cost(nodes[name])
+        print(f"    {name:<32} {cost.waiting:>7.0f}ms  ({cost.detail})")
+
+    # 连续的长 post_delay（>= 1000ms），包括首轮进入循环前的节点
+    chain: List[str] = []
+    chains = []
+    for name, _ in fast_prefix + fast + fast[:1]:
+        if nodes[name].get("post_delay", DEFAULT_POST_DELAY) >= 1000:
+            chain.append(name)
+            continue
+        if len(chain) >= 2:
+            chains.append(chain)
+        chain = []
+    for chain in chains:
+        total = sum(nodes[name]["post_delay"] for name in chain)
+        print(f"  [!] 连续 {len(chain)} 个节点 post_delay >= 1000ms，共 {total}ms: {' -> '.join(chain)}")
     return True
 
 
+def budget(resource_dir: Path, interface_path: Optional[Path], entries: List[str], top: int) -> bool:
+    nodes = load_pipelines(resource_dir)
+    print(f"已加载 {len(nodes)} 个 pipeline 节点: {resource_dir}")
+    print("说明: 识别本身的耗时和游戏内战斗时长不计入；最快=识别首轮命中，最慢=识别等到超时")
+
+    tasks = [(entry, "") for entry in entries]
+    if not tasks and interface_path is not None and interface_path.exists():
+        with open(interface_path, "r", encoding="utf-8") as f:
+            tasks = [(task["entry"], task.get("name", "")) for task in json.load(f).get("task", [])]
+
+    ok = True
+    for entry, title in tasks:
+        # 设置类任务没有循环，跳过
+        node = nodes.get(entry)
+        if node is not None and not node.get("next") and not node.get("on_error"):
+            continue
+        ok = budget_report(nodes, entry, title, top) and ok
+    return ok
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python configure.py <directory>")
-        sys.exit(1)
+    if len(sys.argv) >= 2 and sys.argv[1] == "--budget":
+        parser = argparse.ArgumentParser(description="pipeline 运行时间预算分析")
+        parser.add_argument("--budget", dest="resource", required=True, help="资源包目录")
+        parser.add_argument("--interface", help="interface.json 路径（默认为资源包上级目录中的 interface.json）")
+        parser.add_argument("--entry", action="append", default=[], help="只分析指定入口（可重复）")
+        parser.add_argument("--top", type=int, default=8, help="每个入口列出的固定等待节点数")
+        args = parser.parse_args()
+
+        resource_dir = Path(args.resource)
+        interface_path = Path(args.interface) if args.interface else resource_dir.parent / "interface.json"
+        if not budget(resource_dir, interface_path, args.entry, args.top):
+            sys.exit(1)
+        return
+
+    parser = argparse.ArgumentParser(
+        description="Check resource bundles",
+        epilog="python check_resource.py --budget <directory> [--interface PATH] [--entry NAME]: run-time budget analysis",
+    )
+    parser.add_argument("dirs", nargs="+", type=Path, help="resource bundle directories")
+    parser.add_argument("--manifest", type=Path, default=Path(DEFAULT_MANIFEST),
+                        help=f"check manifest path (default {DEFAULT_MANIFEST})")
+    parser.add_argument("--force", action="store_true", help="ignore the manifest and check every bundle")
+    parser.add_argument("--jobs", type=int, help="number of worker processes")
+    args = parser.parse_args()
 
     Tasker.set_stdout_level(LoggingLevelEnum.All)
 
-    dirs = [Path(arg) for arg in sys.argv[1:]]
-    if not check(dirs):
+    if not check(args.dirs, args.manifest, args.jobs, args.force):
         sys.exit(1)
 
 
@@ -0,0 +1,369 @@
+"""
+路线宏编译器
+
+读取资源包 pipeline/ 下的所有 JSON，把每段最长的 DirectHit 移动节点链
+（LongPressKey / RunWithShift / RunWithJump / PressMultipleKeys 首尾由 next 相连）
+合并为一个 RouteMacro 自定义动作节点，并报告每个任务省下的节点开销。
+
+合并规则：
+- 链上每个节点都必须是 DirectHit + Custom 移动动作，且只包含已知字段
+- 链内的后继节点只能被前一个节点的 next 引用（不是任务入口、不被其他节点或参数引用）
+- 链上所有节点的 on_error 必须相同，合并后的节点沿用该 on_error
+- 宏节点保留链首节点的名称和 pre_delay，沿用链尾节点的 next / timeout / post_delay
+- 链内节点之间实际生效的 pre_delay / post_delay（未写出时为框架默认的 200ms）转换为宏内的 Wait 步骤，
+  路线时序与合并前一致，省下的只是每个节点的框架往返；
+  --drop-default-delays 时只保留显式写出的延迟（会改变路线时序，需要重新验证路线）
+
+这是手动运行的工具，install.py 和 CI 不会自动编译；
+编译结果需要在游戏中验证路线后再提交或放入 install 目录。
+
+使用方法:
+    python compile_routes.py <resource_dir>                  # 只输出报告
+    python compile_routes.py <resource_dir> -o <out_dir>     # 输出编译后的 pipeline 到 out_dir/pipeline
+    python compile_routes.py <resource_dir> --in-place       # 直接改写 resource_dir（用于 install 目录）
+"""
+
+import argparse
+import json
+import sys
+
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+try:
+    import jsonc
+except ModuleNotFoundError as e:
+    raise ImportError(
+        "Missing dependency 'json-with-comments' (imported as 'jsonc').\n"
+        f"Install it with:\n  {sys.executable} -m pip install json-with-comments\n"
+        "Or add it to your project's requirements."
+    ) from e
+
+
+MOVEMENT_ACTIONS = {"LongPressKey", "RunWithShift", "RunWithJump", "PressMultipleKeys"}
+
+# 移动节点允许出现的字段，出现其他字段（interrupt、focus、rate_limit ...）的节点不参与合并
+ALLOWED_FIELDS = {
+    "recognition", "action", "custom_action", "custom_action_param",
+    "next", "on_error", "timeout", "pre_delay", "post_delay",
+}
+
+# MaaFramework 节点默认的 pre_delay / post_delay（毫秒）
+DEFAULT_PRE_DELAY = 200
+DEFAULT_POST_DELAY = 200
+
+# 每个节点的框架往返开销估计（毫秒）：agent IPC、参数解析、窗口查找、创建输入对象
+DEFAULT_NODE_OVERHEAD = 50
+
+
+def as_list(value) -> List[str]:
+    """next / on_error 字段既可以是字符串也可以是列表"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def load_pipeline(resource_dir: Path) -> Tuple[Dict[Path, dict], Dict[str, Path]]:
+    """
+    读取资源包下的所有 pipeline 文件
+
+    Returns:
+        (文件 -> 节点字典, 节点名 -> 所在文件)
+    """
+    files = {}
+    owners = {}
+    for path in sorted((resource_dir / "pipeline").rglob("*.json")):
+        with open(path, "r", encoding="utf-8") as f:
+            nodes = jsonc.load(f)
+        files[path] = nodes
+        for name in nodes:
+            owners[name] = path
+    return files, owners
+
+
+def load_interface_refs(interface_path: Optional[Path]) -> Set[str]:
+    """任务入口以及 option 中 pipeline_override 覆盖的节点，这些节点不能被合并掉"""
+    if not interface_path or not interface_path.exists():
+        return set()
+
+    with open(interface_path, "r", encoding="utf-8") as f:
+        interface = jsonc.load(f)
+
+    refs = {task["entry"] for task in interface.get("task", []) if "entry" in task}
+    for option in interface.get("option", {}).values():
+        for case in option.get("cases", []):
+            refs.update(case.get("pipeline_override", {}).keys())
+    return refs
+
+
+def collect_param_refs(value, names: Set[str], refs: Set[str]):
+    """递归收集动作参数中以字符串形式引用的节点名（如 AutoBattle 的 target_node）"""
+    if isinstance(value, str):
+        if value in names:
+            refs.add(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            collect_param_refs(item, names, refs)
+    elif isinstance(value, list):
+        for item in value:
+            collect_param_refs(item, names, refs)
+
+
+def is_movement_node(node: dict) -> bool:
+    return (
+        node.get("recognition", "DirectHit") == "DirectHit"
+        and node.get("action") == "Custom"
+        and node.get("custom_action") in MOVEMENT_ACTIONS
+        and set(node) <= ALLOWED_FIELDS
+    )
+
+
+def find_chains(nodes: Dict[str, dict], pinned: Set[str]) -> List[List[str]]:
+    """
+    查找所有可合并的最长移动节点链
+
+    Args:
+        nodes: 节点名 -> 节点定义（全部 pipeline 合并后）
+        pinned: 被外部引用、不能被合并为链内节点的节点名
+    """
+    # 统计每个节点被引用的次数（next / on_error / interrupt / 参数）
+    names = set(nodes)
+    ref_count = {name: 0 for name in names}
+    for node in nodes.values():
+        for field in ("next", "on_error", "interrupt"):
+            for target in as_list(node.get(field)):
+                if target in ref_count:
+                    ref_count[target] += 1
+        param_refs = set()
+        collect_param_refs(node.get("custom_action_param"), names, param_refs)
+        collect_param_refs(node.get("custom_recognition_param"), names, param_refs)
+        for target in param_refs:
+            ref_count[target] += 2  # 参数引用视为外部引用
+
+    def successor(name: str) -> Optional[str]:
+        node = nodes[name]
+        next_list = as_list(node.get("next"))
+        if len(next_list) != 1:
+            return None
+        target = next_list[0]
+        if target not in nodes or target in pinned or ref_count[target] != 1:
+            return None
+        if not is_movement_node(nodes[target]):
+            return None
+        if as_list(node.get("on_error")) != as_list(nodes[target].get("on_error")):
+            return None
+        # 链内节点的 timeout 只约束下一个节点的识别，DirectHit 后继不会超时；
+        # 但为了保持语义，只允许链尾带 timeout
+        if "timeout" in node:
+            return None
+        return target
+
+    # 能作为链内后继的节点不作为链首
+    followers = set()
+    for name, node in nodes.items():
+        if is_movement_node(node):
+            target = successor(name)
+            if target:
+                followers.add(target)
+
+    chains = []
+    for name, node in nodes.items():
+        if name in followers or not is_movement_node(node):
+            continue
+        chain = [name]
+        visited = {name}
+        target = successor(name)
+        while target and target not in visited:
+            chain.append(target)
+            visited.add(target)
+            target = successor(target)
+        if len(chain) > 1:
+            chains.append(chain)
+    return chains
+
+
+def node_delays(node: dict, keep_default_delays: bool) -> Tuple[float, float]:
+    """
+    节点的 (pre_delay, post_delay)（毫秒）
+
+    keep_default_delays 时未写出的延迟按框架默认值计算，否则视为 0
+    """
+    default_pre = DEFAULT_PRE_DELAY if keep_default_delays else 0
+    default_post = DEFAULT_POST_DELAY if keep_default_delays else 0
+    return node.get("pre_delay", default_pre), node.get("post_delay", default_post)
+
+
+def build_macro(chain: List[str], nodes: Dict[str, dict], gap: float,
+                keep_default_delays: bool = True) -> dict:
+    """
+    把一条节点链合成一个 RouteMacro 节点
+
+    Args:
+        chain: 节点名列表
+        nodes: 节点名 -> 节点定义
+        gap: 相邻步骤之间额外插入的等待（秒）
+        keep_default_delays: 未写出的 pre_delay / post_delay 是否按框架默认值转换为 Wait 步骤
+    """
+    head, tail = nodes[chain[0]], nodes[chain[-1]]
+    steps = []
+    wait = 0.0   # 上一个节点的 post_delay，与下一个节点的 pre_delay 合并为一个 Wait 步骤
+    for index, name in enumerate(chain):
+        node = nodes[name]
+        pre_delay, post_delay = node_delays(node, keep_default_delays)
+        if index > 0:
+            wait += gap + pre_delay / 1000.0
+        if wait > 0:
+            steps.append(["Wait", round(wait, 3)])
+        steps.append([node["custom_action"], node.get("custom_action_param", {})])
+        wait = post_delay / 1000.0
+
+    macro = {
+        "recognition": "DirectHit",
+        "action": "Custom",
+        "custom_action": "RouteMacro",
+        "custom_action_param": {
+            "steps": steps,
+            "source_nodes": chain,
+        },
+    }
+    if "pre_delay" in head:
+        macro["pre_delay"] = head["pre_delay"]
+    if "post_delay" in tail:
+        macro["post_delay"] = tail["post_delay"]
+    if "timeout" in tail:
+        macro["timeout"] = tail["timeout"]
+    if "on_error" in head:
+        macro["on_error"] = head["on_error"]
+    macro["next"] = tail.get("next", [])
+    return macro
+
+
+def saved_overhead(chain: List[str], nodes: Dict[str, dict], node_overhead: float,
+                   keep_default_delays: bool = True) -> float:
+    """
+    估计合并一条链省下的时间（毫秒）：
+    每个被合并掉的节点边界省去一次框架往返；
+    不保留默认延迟时，还省去未显式指定的 pre_delay / post_delay（框架默认值）
+    """
+    saved = 0.0
+    for prev_name, name in zip(chain, chain[1:]):
+        saved += node_overhead
+        if not keep_default_delays:
+            if "post_delay" not in nodes[prev_name]:
+                saved += DEFAULT_POST_DELAY
+            if "pre_delay" not in nodes[name]:
+                saved += DEFAULT_PRE_DELAY
+    return saved
+
+
+def reachable(entry: str, nodes: Dict[str, dict]) -> Set[str]:
+    """从任务入口出发可以到达的所有节点"""
+    seen = set()
+    stack = [entry]
+    while stack:
+        name = stack.pop()
+        if name in seen or name not in nodes:
+            continue
+        seen.add(name)
+        node = nodes[name]
+        for field in ("next", "on_error", "interrupt"):
+            stack.extend(as_list(node.get(field)))
+        refs = set()
+        collect_param_refs(node.get("custom_action_param"), set(nodes), refs)
+        stack.extend(refs)
+    return seen
+
+
+def compile_routes(resource_dir: Path, interface_path: Optional[Path], gap: float = 0.0,
+                   keep_default_delays: bool = True):
+    """
+    编译资源包
+
+    Returns:
+        (文件 -> 编译后的节点字典, 合并的链列表, 合并前的全部节点)
+    """
+    files, owners = load_pipeline(resource_dir)
+    nodes = {name: node for file_nodes in files.values() for name, node in file_nodes.items()}
+    pinned = load_interface_refs(interface_path)
+
+    chains = find_chains(nodes, pinned)
+
+    compiled = {path: dict(file_nodes) for path, file_nodes in files.items()}
+    for chain in chains:
+        head_file = owners[chain[0]]
+        compiled[head_file][chain[0]] = build_macro(chain, nodes, gap, keep_default_delays)
+        for name in chain[1:]:
+            del compiled[owners[name]][name]
+
+    return compiled, chains, nodes
+
+
+def report(chains: List[List[str]], nodes: Dict[str, dict], interface_path: Optional[Path],
+           node_overhead: float, keep_default_delays: bool = True):
+    """按任务输出合并结果和省下的开销"""
+    print(f"共合并 {len(chains)} 条移动节点链，减少 {sum(len(c) - 1 for c in chains)} 个节点")
+    if not keep_default_delays:
+        print("注意：已去掉框架默认的节点间延迟，路线时序会变化，请在游戏中重新验证")
+    for chain in chains:
+        saved = saved_overhead(chain, nodes, node_overhead, keep_default_delays)
+        print(f"  {chain[0]} ... {chain[-1]}: {len(chain)} 个节点 -> 1, 约省 {saved:.0f}ms")
+
+    entries = []
+    if interface_path and interface_path.exists():
+        with open(interface_path, "r", encoding="utf-8") as f:
+            interface = jsonc.load(f)
+        entries = [(task.get("name", task["entry"]), task["entry"])
+                   for task in interface.get("task", []) if "entry" in task]
+
+    if entries:
+        print()
+        print("按任务统计（每轮循环）：")
+        for task_name, entry in entries:
+            task_nodes = reachable(entry, nodes)
+            task_chains = [c for c in chains if c[0] in task_nodes]
+            removed = sum(len(c) - 1 for c in task_chains)
+            saved = sum(saved_overhead(c, nodes, node_overhead, keep_default_delays) for c in task_chains)
+            print(f"  {task_name} ({entry}): 合并 {len(task_chains)} 条链，"
+                  f"减少 {removed} 次节点往返，约省 {saved / 1000:.2f}秒")
+
+
+def write_pipeline(compiled: Dict[Path, dict], resource_dir: Path, out_dir: Path):
+    for path, file_nodes in compiled.items():
+        target = out_dir / path.relative_to(resource_dir)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "w", encoding="utf-8") as f:
+            json.dump(file_nodes, f, ensure_ascii=False, indent=4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把 DirectHit 移动节点链编译为 RouteMacro 节点")
+    parser.add_argument("resource_dir", type=Path, help="资源包目录（包含 pipeline/）")
+    parser.add_argument("-o", "--out-dir", type=Path, help="编译结果输出目录（资源包根目录）")
+    parser.add_argument("--in-place", action="store_true", help="直接改写 resource_dir")
+    parser.add_argument("--interface", type=Path, help="interface.json 路径，默认为 resource_dir 的上一级")
+    parser.add_argument("--gap-ms", type=float, default=0.0, help="相邻步骤之间插入的等待（毫秒），默认 0")
+    parser.add_argument("--drop-default-delays", action="store_true",
+                        help=f"不保留框架默认的节点间延迟（pre_delay {DEFAULT_PRE_DELAY}ms / "
+                             f"post_delay {DEFAULT_POST_DELAY}ms），会改变路线时序")
+    parser.add_argument("--node-overhead-ms", type=float, default=DEFAULT_NODE_OVERHEAD,
+                        help=f"每个节点的框架往返开销估计（毫秒），默认 {DEFAULT_NODE_OVERHEAD}")
+    args = parser.parse_args()
+
+    resource_dir = args.resource_dir.resolve()
+    interface_path = args.interface or resource_dir.parent / "interface.json"
+
+    keep_default_delays = not args.drop_default_delays
+    compiled, chains, nodes = compile_routes(resource_dir, interface_path, args.gap_ms / 1000.0,
+                                             keep_default_delays)
+    report(chains, nodes, interface_path, args.node_overhead_ms, keep_default_delays)
+
+    out_dir = resource_dir if args.in_place else args.out_dir
+    if out_dir:
+        write_pipeline(compiled, resource_dir, out_dir.resolve())
+        print(f"\n已写入编译后的 pipeline: {out_dir / 'pipeline'}")
+
+
+if __name__ == "__main__":
+    main()
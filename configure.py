@@ -1,9 +1,170 @@
 from pathlib import Path
 
+import errno
+import hashlib
+import json
+import os
 import shutil
+import sys
 
 assets_dir = Path(__file__).parent.resolve() / "assets"
 
+# Records the source hashes of a provisioned default model, so later runs can verify it.
+# The marker is written before provisioning starts ("complete": false) and rewritten when it
+# finishes, so an interrupted run is still recognised. An OCR directory without the marker is
+# taken over only if its content matches (or is a partial copy of) the default model;
+# otherwise it was provided by the user and is left untouched.
+MARKER_NAME = ".provisioned.json"
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    """Copy-on-write clone (Linux FICLONE / macOS clonefile). Returns False if unsupported."""
+    try:
+        if sys.platform.startswith("linux"):
+            import fcntl
+
+            FICLONE = 0x40049409
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                try:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                except OSError:
+                    fdst.close()
+                    dst.unlink()
+                    return False
+            shutil.copystat(src, dst)
+            return True
+        if sys.platform == "darwin":
+            import ctypes
+
+            libc = ctypes.CDLL(None, use_errno=True)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dst), 0) == 0
+    except (OSError, AttributeError):
+        pass
+    return False
+
+
+def _link_or_copy(src: Path, dst: Path) -> str:
+    """Provision one file: reflink, then hardlink, then copy. Returns the method used."""
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if dst.exists() or dst.is_symlink():
+        dst.unlink()
+
+    if _reflink(src, dst):
+        return "reflink"
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP, errno.ENOSYS):
+            raise
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def _load_marker(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def _write_marker(dst_dir: Path, src_dir: Path, files: dict, complete: bool):
+    # Relative to assets_dir: install.py ships the marker, so no local absolute paths
+    try:
+        source = src_dir.resolve().relative_to(assets_dir).as_posix()
+    except ValueError:
+        source = src_dir.as_posix()
+    tmp_path = dst_dir / (MARKER_NAME + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"source": source, "complete": complete, "files": files}, f, indent=1)
+    os.replace(tmp_path, dst_dir / MARKER_NAME)
+
+
+def _is_prefix_of(part: Path, full: Path) -> bool:
+    """True if part's content is the beginning of full's content (an equal or truncated copy)."""
+    if part.stat().st_size > full.stat().st_size:
+        return False
+    with open(part, "rb") as fpart, open(full, "rb") as ffull:
+        for chunk in iter(lambda: fpart.read(1 << 20), b""):
+            if ffull.read(len(chunk)) != chunk:
+                return False
+    return True
+
+
+def is_copy_of(src_dir: Path, dst_dir: Path) -> bool:
+    """
+    True if every file in dst_dir also exists in src_dir with the same content, or as a
+    truncated copy of it. Missing files are allowed, so a partial copy also matches.
+    """
+    for dst in dst_dir.rglob("*"):
+        if not dst.is_file() or dst.name in (MARKER_NAME, MARKER_NAME + ".tmp"):
+            continue
+        src = src_dir / dst.relative_to(dst_dir)
+        if not src.is_file() or not _is_prefix_of(dst, src):
+            return False
+    return True
+
+
+def provision_model(src_dir: Path, dst_dir: Path) -> dict:
+    """
+    Provision src_dir into dst_dir and verify it by content hash.
+
+    Files that are missing or whose content differs from the source are (re)linked;
+    files that are already the same inode as the source are trusted without hashing.
+    Source hashes are cached in the marker by size and mtime.
+
+    Returns counts per action ("ok", "reflink", "hardlink", "copy", "removed").
+    """
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    cached = _load_marker(dst_dir / MARKER_NAME)
+    # Mark the directory before touching it, so an interrupted run is not mistaken for a user model
+    _write_marker(dst_dir, src_dir, cached, complete=False)
+    files = {}
+    counts = {"ok": 0, "reflink": 0, "hardlink": 0, "copy": 0, "removed": 0}
+
+    for src in sorted(p for p in src_dir.rglob("*") if p.is_file()):
+        rel = src.relative_to(src_dir).as_posix()
+        dst = dst_dir / rel
+        stat = src.stat()
+
+        old = cached.get(rel)
+        if old and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            sha1 = old["sha1"]
+        else:
+            sha1 = _hash_file(src)
+        files[rel] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1}
+
+        if dst.is_file() and (
+            os.path.samefile(src, dst)
+            or (dst.stat().st_size == stat.st_size and _hash_file(dst) == sha1)
+        ):
+            counts["ok"] += 1
+            continue
+
+        if dst.exists():
+            print(f"Repairing OCR model file: {rel}")
+        counts[_link_or_copy(src, dst)] += 1
+
+    # Files from a previously provisioned model that no longer exist in the source
+    for rel in sorted(set(cached) - set(files)):
+        try:
+            (dst_dir / rel).unlink()
+            counts["removed"] += 1
+        except FileNotFoundError:
+            pass
+
+    _write_marker(dst_dir, src_dir, files, complete=True)
+    return counts
+
 
 def configure_ocr_model():
     assets_ocr_dir = assets_dir / "MaaCommonAssets" / "OCR"
@@ -11,15 +172,19 @@ def configure_ocr_model():
         print(f"File Not Found: {assets_ocr_dir}")
         exit(1)
 
+    src_dir = assets_ocr_dir / "ppocr_v5" / "zh_cn"
     ocr_dir = assets_dir / "resource" / "model" / "ocr"
-    if not ocr_dir.exists():   # copy default OCR model only if dir does not exist
-        shutil.copytree(
-            assets_dir / "MaaCommonAssets" / "OCR" / "ppocr_v5" / "zh_cn",
-            ocr_dir,
-            dirs_exist_ok=True,
-        )
-    else:
-        print("Found existing OCR directory, skipping default OCR model import.")
+    if ocr_dir.exists() and not (ocr_dir / MARKER_NAME).exists():
+        if not is_copy_of(src_dir, ocr_dir):
+            # keep a user-provided OCR model as is
+            print("Found existing OCR directory, skipping default OCR model import.")
+            print(f"Delete {ocr_dir} to provision the default model.")
+            return
+        # left by an older full copy or an interrupted first run
+        print("Found unmarked copy of the default OCR model, taking it over.")
+
+    counts = provision_model(src_dir, ocr_dir)
+    print("OCR model: " + ", ".join(f"{name} {count}" for name, count in counts.items() if count))
 
 
 if __name__ == "__main__":
@@ -1,5 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Callable, Dict, List, Optional
 
+import argparse
+import hashlib
+import json
+import os
 import shutil
 import sys
 
@@ -17,7 +23,153 @@ from configure import configure_ocr_model
 
 working_dir = Path(__file__).parent
 install_path = working_dir / Path("install")
-version = len(sys.argv) > 1 and sys.argv[1] or "v0.0.1"
+version = "v0.0.1"
+
+# 增量安装的哈希清单（位于安装目录内）
+MANIFEST_NAME = ".install_manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _hash_file(path: Path) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IncrementalCopier:
+    """
+    按内容哈希增量复制到安装目录
+
+    清单记录每个已安装文件对应源文件的大小、修改时间和 sha1：
+    源文件大小和修改时间未变、且目标文件仍存在时直接跳过；否则重新计算哈希，内容未变也跳过。
+    复制在线程池中并行执行；本次未出现在任何源目录中的已安装文件视为上游已删除，在 finish() 时删除。
+    """
+
+    def __init__(self, root: Path, workers: Optional[int] = None):
+        self.root = root
+        self.manifest_path = root / MANIFEST_NAME
+        self.previous = self._load_manifest()
+        self.entries: Dict[str, dict] = {}
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self._pool = ThreadPoolExecutor(max_workers=workers or min(32, (os.cpu_count() or 1) * 4))
+        self._futures = []
+
+    def _load_manifest(self) -> Dict[str, dict]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifest.get("version") != MANIFEST_VERSION:
+            return {}
+        return manifest.get("files", {})
+
+    def _sync_file(self, src: Path, rel: str) -> dict:
+        dst = self.root / rel
+        stat = src.stat()
+        old = self.previous.get(rel)
+        installed = dst.is_file() and dst.stat().st_size == stat.st_size
+
+        if old and installed and old["size"] == stat.st_size and old["mtime_ns"] == stat.st_mtime_ns:
+            entry, copied = old, False
+        else:
+            sha1 = _hash_file(src)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": sha1}
+            copied = not (old and installed and old["sha1"] == sha1)
+            if copied:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(src, dst)
+        return {"rel": rel, "entry": entry, "copied": copied}
+
+    def copy_file(self, src: Path, dst: Path):
+        rel = dst.relative_to(self.root).as_posix()
+        self._futures.append(self._pool.submit(self._sync_file, src, rel))
+
+    def copy_tree(self, src: Path, dst: Path, ignore: Optional[Callable] = None):
+        for root, dirs, files in os.walk(src):
+            ignored = ignore(root, dirs + files) if ignore else set()
+            dirs[:] = sorted(d for d in dirs if d not in ignored)
+            for name in sorted(files):
+                if name not in ignored:
+                    path = Path(root) / name
+                    self.copy_file(path, dst / path.relative_to(src))
+
+    def generate(self, dst: Path, inputs: List[Path], key: str, write: Callable[[], None]):
+        """
+        生成文件（如写入版本号后的 interface.json）：输入文件内容和 key 都未变且目标仍存在时跳过 write
+        """
+        rel = dst.relative_to(self.root).as_posix()
+        digest = hashlib.sha1(key.encode("utf-8"))
+        for path in inputs:
+            digest.update(_hash_file(path).encode("ascii"))
+        sha1 = digest.hexdigest()
+
+        old = self.previous.get(rel)
+        if old and old["sha1"] == sha1 and dst.is_file() and dst.stat().st_size == old["size"]:
+            self.skipped_files += 1
+            self.skipped_bytes += old["size"]
+            self.entries[rel] = old
+            return
+
+        write()
+        size = dst.stat().st_size
+        self.copied_files += 1
+        self.copied_bytes += size
+        self.entries[rel] = {"size": size, "mtime_ns": 0, "sha1": sha1}
+
+    def finish(self):
+        """等待复制完成，删除上游已不存在的文件，写出清单并打印统计"""
+        for future in self._futures:
+            result = future.result()
+            self.entries[result["rel"]] = result["entry"]
+            if result["copied"]:
+                self.copied_files += 1
+                self.copied_bytes += result["entry"]["size"]
+            else:
+                self.skipped_files += 1
+                self.skipped_bytes += result["entry"]["size"]
+        self._futures = []
+        self._pool.shutdown()
+
+        removed = 0
+        for rel in sorted(set(self.previous) - set(self.entries)):
+            try:
+                (self.root / rel).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        tmp_path = self.manifest_path.with_name(MANIFEST_NAME + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+        print(f"Copied {self.copied_files} files ({self.copied_bytes:,} bytes), "
+              f"skipped {self.skipped_files} unchanged files ({self.skipped_bytes:,} bytes), "
+              f"removed {removed} stale files.")
+
+
+# 为 None 时按原方式完整复制
+copier: Optional[IncrementalCopier] = None
+
+
+def copy_tree(src: Path, dst: Path, ignore: Optional[Callable] = None):
+    if copier is None:
+        shutil.copytree(src, dst, ignore=ignore, dirs_exist_ok=True)
+    else:
+        copier.copy_tree(src, dst, ignore)
+
+
+def copy_file(src: Path, dst_dir: Path):
+    if copier is None:
+        shutil.copy2(src, dst_dir)
+    else:
+        copier.copy_file(src, dst_dir / src.name)
 
 
 def install_deps():
@@ -26,7 +178,7 @@ def install_deps():
         print("请先下载 MaaFramework 到 \"deps\"。")
         sys.exit(1)
 
-    shutil.copytree(
+    copy_tree(
         working_dir / "deps" / "bin",
         install_path,
         ignore=shutil.ignore_patterns(
@@ -35,12 +187,10 @@ def install_deps():
             "*MaaRpc*",
             "*MaaHttp*",
         ),
-        dirs_exist_ok=True,
     )
-    shutil.copytree(
+    copy_tree(
         working_dir / "deps" / "share" / "MaaAgentBinary",
         install_path / "MaaAgentBinary",
-        dirs_exist_ok=True,
     )
 
 
@@ -48,17 +198,24 @@ def install_resource():
 
     configure_ocr_model()
 
-    shutil.copytree(
+    copy_tree(
         working_dir / "assets" / "resource",
         install_path / "resource",
-        dirs_exist_ok=True,
-    )
-    shutil.copy2(
-        working_dir / "assets" / "interface.json",
-        install_path,
     )
 
-    with open(install_path / "interface.json", "r", encoding="utf-8") as f:
+    if copier is None:
+        write_interface()
+    else:
+        copier.generate(
+            install_path / "interface.json",
+            [working_dir / "assets" / "interface.json"],
+            version,
+            write_interface,
+        )
+
+
+def write_interface():
+    with open(working_dir / "assets" / "interface.json", "r", encoding="utf-8") as f:
         interface = jsonc.load(f)
 
     interface["version"] = version
@@ -68,30 +225,59 @@ def install_resource():
 
 
 def install_chores():
-    shutil.copy2(
+    copy_file(
         working_dir / "README.md",
         install_path,
     )
-    shutil.copy2(
+    copy_file(
         working_dir / "LICENSE",
         install_path,
     )
-    shutil.copy2(
+    copy_file(
         working_dir / "requirements.txt",
         install_path,
     )
 
+# agent 运行时在 agent/config 中生成的本地文件（已被 git 忽略），不随安装包发布
+AGENT_RUNTIME_FILES = {
+    "runtime_config.json",
+    "roi_cache.json",
+    "prevalidate_cache.json",
+    "template_cache",
+}
+
+
+def ignore_agent_runtime_files(root, names):
+    if Path(root).resolve() != (working_dir / "agent" / "config").resolve():
+        return set()
+    return {name for name in names if name in AGENT_RUNTIME_FILES or name.endswith(".tmp")}
+
+
 def install_agent():
-    shutil.copytree(
+    copy_tree(
         working_dir / "agent",
         install_path / "agent",
-        dirs_exist_ok=True,
+        ignore=ignore_agent_runtime_files,
     )
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Install to the \"install\" directory")
+    parser.add_argument("version", nargs="?", default=version, help="version written to interface.json")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"copy only changed files, tracked by install/{MANIFEST_NAME}")
+    args = parser.parse_args()
+    version = args.version
+
+    if args.incremental:
+        install_path.mkdir(parents=True, exist_ok=True)
+        copier = IncrementalCopier(install_path)
+
     install_deps()
     install_resource()
     install_chores()
     install_agent()
 
+    if copier is not None:
+        copier.finish()
+
     print(f"Install to {install_path} successfully.")
\ No newline at end of file
@@ -38,6 +38,8 @@ a = Analysis(
         'win32gui',
         'maa.agent',
         'maa.agent.agent_server',
+        'postmessage',
+        'postmessage.actions',
     ] + pywin32_hiddenimports + maa_hiddenimports,
     hookspath=[],
     hooksconfig={},
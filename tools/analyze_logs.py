@@ -0,0 +1,273 @@
+# agent 运行日志分析
+# 逐行流式读取 logs_agent/agent_*.log（不整体载入文件），按循环还原每一轮的执行过程，统计：
+#   - 各节点耗时（[NodeTiming] 行）的 p50/p95
+#   - 各等待步骤（[wait_for] 行，按所属节点和步骤名区分）的耗时和轮询次数
+#   - ResetCharacterPosition 每步的重试次数（轮询次数 - 1）和失败次数
+#   - AutoBattle 的检测轮询次数和按 E 次数
+#   - 每轮时间中等待（wait_for）、动作（自定义动作中除等待外的部分）、框架（自定义动作之间）所占比例
+# 一轮以 --boundary 指定的动作类型或节点名（正则）结束，默认 AutoBattle（每个模式每轮恰好执行一次）。
+# 结果可用 --json 保存为基线，之后用 --baseline 对比 p50 变化。
+#
+# 使用方法（项目根目录）:
+#     python tools/analyze_logs.py [日志文件或目录 ...] [--boundary AutoBattle] [--json out.json] [--baseline base.json]
+import argparse
+import json
+import math
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_LOG_DIR = "logs_agent"
+
+# 日志行头：时间（旧日志没有毫秒） - 模块 - 级别 - 消息
+LINE_RE = re.compile(r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})(?:[.,](\d{3}))? - [\w.]+ - \w+ - (.*)$")
+SESSION_RE = re.compile(r"MdaDuetAssistant Agent 启动")
+NODE_RE = re.compile(r"^\[NodeTiming\] \[(OK|X)\] '(.*)' \((\w+)\) 用时 (\d+)ms")
+WAIT_OK_RE = re.compile(r"^\[wait_for\] \[OK\] '(.*)' 命中: 轮询 (\d+) 次（识别 (\d+) 次，跳过 (\d+) 次），用时 (\d+)ms")
+WAIT_TIMEOUT_RE = re.compile(r"^\[wait_for\] \[X\] '(.*)' 超时 (\d+)ms，共轮询 (\d+) 次")
+RESET_STEP_RE = re.compile(r"^\[ResetCharacterPosition\] 步骤 (\d+): 识别并点击'(.*)'")
+BATTLE_PRESSES_RE = re.compile(r"^\[AutoBattle\] 战斗输入线程结束，共按 E 键 (\d+) 次")
+
+
+def percentile(values, q):
+    """最近秩百分位"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class Series:
+    """一组样本（毫秒或次数）"""
+
+    def __init__(self):
+        self.values = []
+        self.failures = 0
+
+    def add(self, value):
+        self.values.append(value)
+
+    def to_dict(self):
+        return {
+            "count": len(self.values),
+            "failures": self.failures,
+            "p50": percentile(self.values, 50),
+            "p95": percentile(self.values, 95),
+            "total": sum(self.values),
+        }
+
+
+class LogAnalyzer:
+    """按行喂入日志的流式分析器"""
+
+    def __init__(self, boundary: str = "AutoBattle"):
+        self.boundary = re.compile(boundary)
+        self.nodes = {}                # 节点名 -> 耗时 Series
+        self.steps = {}                # "节点 / 等待名" -> 耗时 Series
+        self.step_polls = {}           # "节点 / 等待名" -> 轮询次数 Series
+        self.reset_retries = {}        # "步骤 N: 名称" -> 重试次数 Series
+        self.battle_polls = Series()
+        self.battle_presses = Series()
+        self.iterations = []           # 每轮 {"wall": ms, "wait": ms, "act": ms, "nodes": n}
+        self.sessions = 0
+        self.lines = 0
+        self._reset_session()
+
+    def _reset_session(self):
+        self._pending_waits = []       # 尚未归属到节点的 wait_for 记录
+        self._reset_step = None
+        self._iteration_start = None
+        self._iteration = {"wait": 0, "node": 0, "nodes": 0}
+
+    def feed(self, line: str):
+        self.lines += 1
+        match = LINE_RE.match(line.rstrip("\n"))
+        if not match:
+            return
+        stamp, millis, message = match.groups()
+        ts = datetime.strptime(stamp, "%Y-%m-%d %H:%M:%S").timestamp() + int(millis or 0) / 1000
+
+        if SESSION_RE.search(message):
+            self.sessions += 1
+            self._reset_session()
+            return
+
+        if self._iteration_start is None:
+            self._iteration_start = ts
+
+        m = RESET_STEP_RE.match(message)
+        if m:
+            self._reset_step = f"步骤 {m.group(1)}: {m.group(2)}"
+            return
+
+        m = WAIT_OK_RE.match(message)
+        if m:
+            self._pending_waits.append((m.group(1), int(m.group(5)), int(m.group(2)), True, self._reset_step))
+            return
+
+        m = WAIT_TIMEOUT_RE.match(message)
+        if m:
+            self._pending_waits.append((m.group(1), int(m.group(2)), int(m.group(3)), False, self._reset_step))
+            return
+
+        m = BATTLE_PRESSES_RE.match(message)
+        if m:
+            self.battle_presses.add(int(m.group(1)))
+            return
+
+        m = NODE_RE.match(message)
+        if m:
+            self._finish_node(ts, m.group(1) == "OK", m.group(2), m.group(3), int(m.group(4)))
+
+    def _finish_node(self, ts: float, ok: bool, node: str, action: str, elapsed: int):
+        series = self.nodes.setdefault(node, Series())
+        series.add(elapsed)
+        if not ok:
+            series.failures += 1
+
+        wait_total = 0
+        for name, wait_ms, polls, hit, reset_step in self._pending_waits:
+            key = f"{node} / {name}"
+            self.steps.setdefault(key, Series()).add(wait_ms)
+            self.step_polls.setdefault(key, Series()).add(polls)
+            if not hit:
+                self.steps[key].failures += 1
+            if action == "ResetCharacterPosition" and reset_step:
+                retries = self.reset_retries.setdefault(reset_step, Series())
+                retries.add(polls - 1)
+                if not hit:
+                    retries.failures += 1
+            if action == "AutoBattle":
+                self.battle_polls.add(polls)
+            wait_total += wait_ms
+        self._pending_waits = []
+        self._reset_step = None
+
+        iteration = self._iteration
+        iteration["wait"] += wait_total
+        iteration["node"] += elapsed
+        iteration["nodes"] += 1
+
+        if self.boundary.search(action) or self.boundary.fullmatch(node):
+            wall = int((ts - self._iteration_start) * 1000)
+            self.iterations.append({
+                "wall": wall,
+                "wait": iteration["wait"],
+                "act": max(0, iteration["node"] - iteration["wait"]),
+                "framework": max(0, wall - iteration["node"]),
+                "nodes": iteration["nodes"],
+            })
+            self._iteration_start = ts
+            self._iteration = {"wait": 0, "node": 0, "nodes": 0}
+
+    def feed_file(self, path: Path):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            for line in f:
+                self.feed(line)
+
+    def summary(self) -> dict:
+        walls = [it["wall"] for it in self.iterations]
+        total_wall = sum(walls) or 1
+        return {
+            "lines": self.lines,
+            "sessions": self.sessions,
+            "iterations": {
+                "count": len(self.iterations),
+                "p50": percentile(walls, 50),
+                "p95": percentile(walls, 95),
+                "wait_share": sum(it["wait"] for it in self.iterations) / total_wall,
+                "act_share": sum(it["act"] for it in self.iterations) / total_wall,
+                "framework_share": sum(it["framework"] for it in self.iterations) / total_wall,
+            },
+            "nodes": {name: s.to_dict() for name, s in sorted(self.nodes.items())},
+            "steps": {name: s.to_dict() for name, s in sorted(self.steps.items())},
+            "step_polls": {name: s.to_dict() for name, s in sorted(self.step_polls.items())},
+            "reset_retries": {name: s.to_dict() for name, s in sorted(self.reset_retries.items())},
+            "auto_battle": {"polls": self.battle_polls.to_dict(), "e_presses": self.battle_presses.to_dict()},
+        }
+
+
+def print_report(summary: dict, baseline: dict = None):
+    def delta(section, name, value):
+        if not baseline:
+            return ""
+        old = baseline.get(section, {}).get(name)
+        if not old:
+            return "  (新增)"
+        diff = value - old["p50"]
+        return f"  ({'+' if diff >= 0 else ''}{diff}ms)"
+
+    it = summary["iterations"]
+    print(f"共 {summary['lines']} 行，{summary['sessions']} 次启动，{it['count']} 轮")
+    if it["count"]:
+        print(f"每轮用时: p50 {it['p50']}ms, p95 {it['p95']}ms")
+        print(f"时间占比: 等待 {it['wait_share']:.1%}，动作 {it['act_share']:.1%}，框架/识别 {it['framework_share']:.1%}")
+
+    print("\n节点耗时 (ms):")
+    print(f"  {'节点':<36} {'次数':>6} {'失败':>4} {'p50':>8} {'p95':>8}")
+    for name, s in summary["nodes"].items():
+        print(f"  {name:<36} {s['count']:>6} {s['failures']:>4} {s['p50']:>8} {s['p95']:>8}{delta('nodes', name, s['p50'])}")
+
+    print("\n等待步骤 (ms / 轮询次数):")
+    for name, s in summary["steps"].items():
+        polls = summary["step_polls"][name]
+        print(f"  {name:<48} {s['count']:>5} 次  超时 {s['failures']:>3}  p50 {s['p50']:>6}ms  p95 {s['p95']:>6}ms"
+              f"  轮询 p50 {polls['p50']:>3} p95 {polls['p95']:>3}{delta('steps', name, s['p50'])}")
+
+    if summary["reset_retries"]:
+        print("\nResetCharacterPosition 重试次数:")
+        for name, s in summary["reset_retries"].items():
+            print(f"  {name:<24} {s['count']:>5} 次  失败 {s['failures']:>3}  总重试 {s['total']:>5}"
+                  f"  p50 {s['p50']:>3}  p95 {s['p95']:>3}")
+
+    battle = summary["auto_battle"]
+    if battle["polls"]["count"]:
+        print(f"\nAutoBattle: {battle['polls']['count']} 次，检测轮询 p50 {battle['polls']['p50']} 次 / "
+              f"p95 {battle['polls']['p95']} 次，按 E 键 p50 {battle['e_presses']['p50']} 次")
+
+
+def collect_files(paths):
+    files = []
+    for path in map(Path, paths or [DEFAULT_LOG_DIR]):
+        if path.is_dir():
+            files.extend(sorted(path.glob("agent_*.log")))
+        elif path.exists():
+            files.append(path)
+    return files
+
+
+def main():
+    parser = argparse.ArgumentParser(description="agent 运行日志分析")
+    parser.add_argument("paths", nargs="*", help=f"日志文件或目录（默认 {DEFAULT_LOG_DIR}）")
+    parser.add_argument("--boundary", default="AutoBattle", help="一轮结束的动作类型或节点名（正则）")
+    parser.add_argument("--json", help="把统计结果保存为 JSON（作为基线）")
+    parser.add_argument("--baseline", help="与之前保存的 JSON 基线对比 p50")
+    args = parser.parse_args()
+
+    files = collect_files(args.paths)
+    if not files:
+        print("未找到日志文件")
+        return 1
+
+    analyzer = LogAnalyzer(args.boundary)
+    for path in files:
+        analyzer.feed_file(path)
+    summary = analyzer.summary()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(summary, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        print(f"\n统计结果已保存: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# 截图帧访问内存分配基准测试
+# 对比 ImageBuffer.get() 的 deepcopy 路径、FrameReader 的只读借用视图和预分配数组池
+# 每次轮询分配的字节数（tracemalloc 统计的峰值增量）和耗时。
+# 原生截图缓冲区用一块 ctypes 内存模拟，不需要连接游戏。
+#
+# 使用方法（项目根目录，需要安装 maafw）:
+#     python tools/bench_frame_access.py [--width 1280] [--height 720] [--loops 200]
+import argparse
+import copy
+import ctypes
+import importlib.util
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+agent_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent")
+# 被测模块依赖 agent 目录下的其他模块（tracing）
+sys.path.insert(0, agent_dir)
+spec = importlib.util.spec_from_file_location("frame_access", os.path.join(agent_dir, "frame_access.py"))
+frame_access = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(frame_access)
+
+
+def legacy_get(data_ptr, height, width, channels):
+    """ImageBuffer.get() 的实现（按 maa/buffer.py 复刻）"""
+    return copy.deepcopy(
+        np.ctypeslib.as_array(
+            ctypes.cast(data_ptr, ctypes.POINTER(ctypes.c_uint8)), shape=(height, width, channels)
+        )
+    )
+
+
+def measure(name, read_frame, loops):
+    """返回 (每轮分配字节数, 每轮耗时秒)"""
+    # 预热（数组池在这里完成首次分配）
+    for _ in range(3):
+        read_frame()
+
+    tracemalloc.start()
+    total_bytes = 0
+    for _ in range(loops):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        frame = read_frame()
+        # 模拟轮询中对帧的使用（读取一个像素）
+        int(frame[0, 0, 0])
+        _, peak = tracemalloc.get_traced_memory()
+        total_bytes += peak - before
+        del frame
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(loops):
+        read_frame()
+    elapsed = time.perf_counter() - start
+
+    print(f"  {name:<24} {total_bytes / loops:14,.0f} B/轮  {elapsed / loops * 1e6:10.1f} us/轮")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="截图帧访问内存分配基准测试")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--loops", type=int, default=200)
+    args = parser.parse_args()
+
+    height, width, channels = args.height, args.width, 3
+    native = (ctypes.c_uint8 * (height * width * channels))()
+    data_ptr = ctypes.addressof(native)
+    pool = frame_access.FramePool(2)
+
+    print(f"帧尺寸 {width}x{height}x{channels} ({height * width * channels:,} B)，每种方式 {args.loops} 轮")
+    measure("deepcopy (ImageBuffer.get)", lambda: legacy_get(data_ptr, height, width, channels), args.loops)
+    measure("只读借用视图", lambda: frame_access.borrow_view(data_ptr, height, width, channels), args.loops)
+    measure("预分配数组池", lambda: pool.copy(frame_access.borrow_view(data_ptr, height, width, channels)), args.loops)
+    print(f"数组池总分配次数: {pool.allocations}")
+
+
+if __name__ == "__main__":
+    main()
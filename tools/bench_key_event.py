@@ -0,0 +1,75 @@
+# PostMessageInputHelper 单次按键事件开销基准测试
+# 对比旧实现（字典查找 + MapVirtualKey 回退 + 逐位构造 lParam + 调试 f-string）
+# 与预计算查找表实现的每事件开销。PostMessage 被替换为空函数，只测量 Python 侧开销。
+#
+# 使用方法（Windows，项目根目录）:
+#     python tools/bench_key_event.py
+import importlib.util
+import logging
+import os
+import sys
+import timeit
+
+import win32api
+
+agent_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent")
+# 被测模块依赖 agent 目录下的其他模块（tracing）
+sys.path.insert(0, agent_dir)
+spec = importlib.util.spec_from_file_location(
+    "input_helper", os.path.join(agent_dir, "postmessage", "input_helper.py")
+)
+input_helper = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(input_helper)
+
+PostMessageInputHelper = input_helper.PostMessageInputHelper
+logger = logging.getLogger("bench")
+
+# 常用按键：W/A/S/D、空格、左 Shift、方向键上
+KEYS = [0x57, 0x41, 0x53, 0x44, 0x20, 0xA0, 0x26]
+ROUNDS = 200_000
+
+
+def noop_post_message(hwnd, msg, wparam, lparam):
+    pass
+
+
+def legacy_key_down(hwnd, vk_code):
+    """旧实现的按下路径（按基线代码复刻）"""
+    if vk_code in PostMessageInputHelper.VK_TO_SCAN_CODE:
+        scan_code = PostMessageInputHelper.VK_TO_SCAN_CODE[vk_code]
+    else:
+        scan_code = win32api.MapVirtualKey(vk_code, 0)
+        if scan_code == 0:
+            scan_code = 0x1E
+    lparam = 1
+    lparam |= (scan_code << 16)
+    noop_post_message(hwnd, 0x100, vk_code, lparam)
+    logger.debug(f"[PostMessageInputHelper] key_down: VK={vk_code}, "
+                 f"ScanCode=0x{scan_code:02X}, lParam=0x{lparam:08X}")
+
+
+def legacy_loop():
+    for vk_code in KEYS:
+        legacy_key_down(1, vk_code)
+
+
+def table_loop():
+    for vk_code in KEYS:
+        helper.key_down(vk_code, activate=False)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    input_helper._post_message = noop_post_message
+    global helper
+    helper = PostMessageInputHelper(1)
+
+    events = ROUNDS * len(KEYS)
+    print(f"每种实现发送 {events} 个按键事件（PostMessage 为空操作）")
+    for name, loop in (("旧实现(字典+MapVirtualKey+f-string)", legacy_loop), ("查找表", table_loop)):
+        best = min(timeit.repeat(loop, number=ROUNDS, repeat=5))
+        print(f"  {name:<36} {best / events * 1e9:8.1f} ns/事件")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# 日志发出开销基准测试
+# 对比直接挂 FileHandler + StreamHandler（旧 setup_logging）与队列日志（log_queue）时，
+# 发出日志的线程每条 logger.info 的耗时分布。控制台用一个每次写入阻塞 --console-delay 毫秒的流模拟
+# （GBK 包装的 Windows 控制台在窗口被选中/滚动时会阻塞写入），文件写到临时目录。
+#
+# 使用方法（项目根目录）:
+#     python tools/bench_logging.py [--count 2000] [--console-delay 0.2]
+import argparse
+import importlib.util
+import logging
+import os
+import tempfile
+import time
+
+agent_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "agent")
+spec = importlib.util.spec_from_file_location("log_queue", os.path.join(agent_dir, "log_queue.py"))
+log_queue = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(log_queue)
+
+LOG_FORMAT = '%(asctime)s.%(msecs)03d - %(name)s - %(levelname)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class SlowConsole:
+    """每次写入阻塞固定时间的控制台"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.writes = 0
+
+    def write(self, text):
+        self.writes += 1
+        time.sleep(self.delay)
+
+    def flush(self):
+        pass
+
+
+def make_handlers(log_file, console):
+    formatter = logging.Formatter(LOG_FORMAT, datefmt=DATE_FORMAT)
+    handlers = [logging.FileHandler(log_file, encoding='utf-8'), logging.StreamHandler(console)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+
+def emit(count):
+    """模拟 RunWithJump 在动作循环中逐次输出日志，返回每条日志的耗时（秒）"""
+    logger = logging.getLogger("actions")
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        logger.info(f"[RunWithJump] 第 {i + 1} 次跳跃 (已运行 {i * 0.5:.2f}s)")
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def report(name, durations, drain):
+    durations = sorted(durations)
+    p50 = durations[len(durations) // 2]
+    p99 = durations[int(len(durations) * 0.99)]
+    print(f"  {name:<8} p50 {p50 * 1e6:9.1f} us  p99 {p99 * 1e6:9.1f} us  max {durations[-1] * 1e6:9.1f} us"
+          f"  总计 {sum(durations) * 1000:8.1f} ms  写完 {drain * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="日志发出开销基准测试")
+    parser.add_argument("--count", type=int, default=2000, help="每种方式输出的日志条数")
+    parser.add_argument("--console-delay", type=float, default=0.2, help="模拟控制台每次写入的阻塞时间（毫秒）")
+    args = parser.parse_args()
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    print(f"{args.count} 条日志，控制台每次写入阻塞 {args.console_delay} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # 直接输出（旧实现）
+        console = SlowConsole(args.console_delay / 1000)
+        handlers = make_handlers(os.path.join(tmp, "direct.log"), console)
+        for handler in handlers:
+            root.addHandler(handler)
+        start = time.perf_counter()
+        durations = emit(args.count)
+        report("直接输出", durations, time.perf_counter() - start)
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+        # 队列输出
+        console = SlowConsole(args.console_delay / 1000)
+        handlers = make_handlers(os.path.join(tmp, "queued.log"), console)
+        log_queue.start_queued_logging(handlers)
+        start = time.perf_counter()
+        durations = emit(args.count)
+        log_queue.stop_queued_logging()
+        report("队列输出", durations, time.perf_counter() - start)
+
+        with open(os.path.join(tmp, "queued.log"), encoding='utf-8') as f:
+            lines = sum(1 for _ in f)
+        print(f"队列输出写入 {lines}/{args.count} 行，控制台写入 {console.writes} 次")
+
+
+if __name__ == "__main__":
+    main()
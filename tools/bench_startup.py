@@ -0,0 +1,165 @@
+# agent 启动耗时基准测试
+# 在子进程中运行 agent/main.py，测量从启动进程到 AgentServer.start_up（日志"等待任务"）的时间。
+# 可在 Linux 上运行：win32gui/win32api/win32con 等 Windows 模块和管理员检查用桩代替
+# （桩模块在被导入时才创建，--win32-delay 可模拟 pywin32 的 DLL 加载耗时），
+# AgentServer.start_up/join 用桩代替（记录就绪时刻后立即返回），其余（maa 导入、注册、
+# Toolkit 初始化、动作参数预校验、模板加载）与实际启动相同。
+# 每种代码先运行一次预热（生成模板缓存、预校验缓存），之后取 --runs 次的中位数。
+# --compare 可同时测量某个 git 版本的 agent 目录（如改动前的提交），对比启动时间。
+#
+# 使用方法（项目根目录）:
+#     python tools/bench_startup.py [--runs 10] [--compare HEAD~1] [--win32-delay 0] [--profile]
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+from pathlib import Path
+
+project_dir = Path(__file__).resolve().parent.parent
+
+# 子进程入口：安装桩后以 __main__ 身份运行 main.py
+BOOTSTRAP = r'''
+import ctypes, importlib.abc, importlib.machinery, os, runpy, sys, time, types, zlib
+
+WIN32_MODULES = {"win32gui", "win32api", "win32con", "win32process", "win32clipboard", "pywintypes"}
+WIN32_DELAY = float(os.environ.get("BENCH_WIN32_DELAY", "0")) / 1000
+
+
+def _stub_attr(name):
+    if name.startswith("__"):
+        raise AttributeError(name)
+    if name.isupper():
+        return zlib.crc32(name.encode()) & 0xFF
+    return lambda *args, **kwargs: 0
+
+
+class Win32Stubs(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    def find_spec(self, fullname, path, target=None):
+        if fullname in WIN32_MODULES:
+            return importlib.machinery.ModuleSpec(fullname, self)
+        return None
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        time.sleep(WIN32_DELAY)
+        module.__getattr__ = _stub_attr
+
+
+sys.meta_path.insert(0, Win32Stubs())
+ctypes.windll = types.SimpleNamespace(
+    shell32=types.SimpleNamespace(IsUserAnAdmin=lambda: 1),
+    kernel32=types.SimpleNamespace(GetConsoleOutputCP=lambda: 65001,
+                                   SetConsoleOutputCP=lambda cp: 1, SetConsoleCP=lambda cp: 1),
+)
+
+from maa.agent.agent_server import AgentServer
+
+
+def start_up(identifier):
+    with open(os.environ["BENCH_READY_FILE"], "w") as f:
+        f.write(repr(time.time()))
+    return True
+
+
+AgentServer.start_up = staticmethod(start_up)
+AgentServer.join = staticmethod(lambda: None)
+AgentServer.shut_down = staticmethod(lambda: None)
+
+main_path = sys.argv[1]
+sys.argv = [main_path, "bench_socket"]
+runpy.run_path(main_path, run_name="__main__")
+'''
+
+
+def export_agent(rev, dest):
+    """导出某个 git 版本的 agent 目录"""
+    archive = subprocess.run(["git", "archive", "--format=tar", rev, "agent"],
+                             cwd=project_dir, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(dest)
+    return Path(dest) / "agent"
+
+
+def run_once(agent_dir, work_dir, bootstrap, env):
+    """运行一次，返回从启动进程到 start_up 的时间（秒）"""
+    ready_file = Path(work_dir) / "ready.txt"
+    if ready_file.exists():
+        ready_file.unlink()
+    env = dict(env, BENCH_READY_FILE=str(ready_file))
+    launch = time.time()
+    result = subprocess.run([sys.executable, bootstrap, str(agent_dir / "main.py")],
+                            cwd=work_dir, env=env, capture_output=True)
+    if not ready_file.exists():
+        sys.stderr.write(result.stdout.decode("gbk", "replace")[-2000:])
+        sys.stderr.write(result.stderr.decode("utf-8", "replace")[-2000:])
+        raise RuntimeError(f"{agent_dir} 未运行到 AgentServer.start_up (退出码 {result.returncode})")
+    return float(ready_file.read_text()) - launch
+
+
+def bench(name, agent_dir, work_dir, bootstrap, env, runs):
+    run_once(agent_dir, work_dir, bootstrap, env)  # 预热
+    times = sorted(run_once(agent_dir, work_dir, bootstrap, env) for _ in range(runs))
+    print(f"  {name:<24} 中位数 {statistics.median(times) * 1000:7.1f} ms  "
+          f"最快 {times[0] * 1000:7.1f} ms  最慢 {times[-1] * 1000:7.1f} ms")
+    return statistics.median(times)
+
+
+def print_profile(work_dir):
+    # main.py 的日志目录写作 .\logs_agent，在 Linux 上是一个名字带反斜杠的目录
+    logs = sorted(Path(work_dir).glob("*logs_agent/agent_*.log"))
+    if not logs:
+        return
+    print(f"\n启动分析（{logs[-1].name}）:")
+    with open(logs[-1], encoding="utf-8") as f:
+        for line in f:
+            if "[StartupProfile]" in line:
+                print("  " + line.split("[StartupProfile]", 1)[1].rstrip())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="agent 启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=10, help="每种代码的测量次数")
+    parser.add_argument("--compare", metavar="REV", help="同时测量该 git 版本的 agent 目录")
+    parser.add_argument("--win32-delay", type=float, default=0, help="模拟每个 win32 模块的导入耗时（毫秒）")
+    parser.add_argument("--profile", action="store_true", help="设置 MDA_STARTUP_PROFILE=1 并输出最后一次运行的启动分析")
+    args = parser.parse_args()
+
+    env = dict(os.environ, BENCH_WIN32_DELAY=str(args.win32_delay), PYTHONDONTWRITEBYTECODE="")
+    env.pop("MDA_TRACE", None)
+    if args.profile:
+        env["MDA_STARTUP_PROFILE"] = "1"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bootstrap = tmp / "bootstrap.py"
+        bootstrap.write_text(BOOTSTRAP, encoding="utf-8")
+
+        # 工作目录中放资源包链接，main.find_resource_bundle 从当前目录找到资源包
+        variants = [("当前代码", project_dir / "agent")]
+        if args.compare:
+            variants.insert(0, (args.compare, export_agent(args.compare, tmp / "rev")))
+
+        print(f"{args.runs} 次运行（另有 1 次预热），win32 模块导入耗时 {args.win32_delay} ms")
+        results = []
+        for index, (name, agent_dir) in enumerate(variants):
+            work_dir = tmp / f"work{index}"
+            work_dir.mkdir()
+            os.symlink(project_dir / "assets" / "resource", work_dir / "resource", target_is_directory=True)
+            os.symlink(project_dir / "assets" / "interface.json", work_dir / "interface.json")
+            results.append(bench(name, agent_dir, work_dir, str(bootstrap), env, args.runs))
+
+        if len(results) == 2 and results[0] > 0:
+            print(f"启动时间变化: {(results[1] - results[0]) * 1000:+.1f} ms ({results[1] / results[0] - 1:+.1%})")
+        if args.profile:
+            print_profile(work_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# 批量模板匹配基准测试
+# 对比 N 个模板逐个匹配（模拟 N 个兄弟 TemplateMatch 节点：每个节点各自裁剪 ROI、灰度化并做一次匹配）
+# 与 BatchTemplateMatcher 一次批量匹配的耗时，并检查两者的排序结果一致。
+# TemplateMatch 本身由 MaaFramework（OpenCV）执行，这里无法脱离游戏调用，逐个匹配使用同一套归一化互相关实现，
+# 因此差异只来自 ROI 预处理和相关计算是否共享。
+# 默认使用 assets/resource/image/jjb 下的小地图模板，帧为随机噪声上贴入其中一个模板。
+#
+# 使用方法（项目根目录）:
+#     python tools/bench_template_match.py [--loops 50] [--count 10]
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+root_dir = Path(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, str(root_dir / "agent"))
+
+from image_io import load_png, to_gray  # noqa: E402
+from template_match import BatchTemplateMatcher  # noqa: E402
+
+
+def sequential(frame, roi, matchers):
+    """逐个节点匹配：每个模板单独裁剪、灰度化 ROI 并计算相关（各节点的匹配器预先创建，模板频谱同样缓存）"""
+    x, y, w, h = roi
+    results = []
+    for matcher in matchers:
+        crop = to_gray(frame[y:y + h, x:x + w], rgb=False)
+        results.extend(matcher.match(crop))
+    return sorted(results, key=lambda result: result.score, reverse=True)
+
+
+def batched(frame, roi, matcher):
+    """批量匹配：ROI 只裁剪、灰度化一次"""
+    x, y, w, h = roi
+    return matcher.match(to_gray(frame[y:y + h, x:x + w], rgb=False))
+
+
+def measure(name, func, loops):
+    func()  # 预热
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    elapsed = (time.perf_counter() - start) / loops
+    print(f"  {name:<12} {elapsed * 1000:8.2f} ms/次")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量模板匹配基准测试")
+    parser.add_argument("--image-dir", default=str(root_dir / "assets" / "resource" / "image"))
+    parser.add_argument("--loops", type=int, default=50)
+    parser.add_argument("--count", type=int, default=10, help="参与匹配的模板数")
+    args = parser.parse_args()
+
+    image_dir = Path(args.image_dir)
+    paths = sorted((image_dir / "jjb").rglob("*.png"))[:args.count]
+    if not paths:
+        print(f"未找到模板: {image_dir / 'jjb'}")
+        return 1
+    colors = {path.relative_to(image_dir).as_posix(): load_png(path) for path in paths}
+    templates = {label: to_gray(image) for label, image in colors.items()}
+
+    # 构造 1280x720 的 BGR 帧，在 ROI 中贴入第一个模板
+    th, tw = next(iter(templates.values())).shape
+    roi = (1000, 0, tw + 100, th + 100)
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 256, (720, 1280, 3), dtype=np.uint8)
+    expected, image = next(iter(colors.items()))
+    frame[roi[1] + 40:roi[1] + 40 + th, roi[0] + 30:roi[0] + 30 + tw] = image[..., :3][..., ::-1]
+
+    matcher = BatchTemplateMatcher(templates)
+    matchers = [BatchTemplateMatcher({label: gray}) for label, gray in templates.items()]
+    print(f"{len(templates)} 个模板 ({tw}x{th})，ROI {roi[2]}x{roi[3]}，每种方式 {args.loops} 次")
+    seq_time = measure("逐个匹配", lambda: sequential(frame, roi, matchers), args.loops)
+    batch_time = measure("批量匹配", lambda: batched(frame, roi, matcher), args.loops)
+    print(f"加速: {seq_time / batch_time:.1f}x")
+
+    seq_result = sequential(frame, roi, matchers)
+    batch_result = batched(frame, roi, matcher)
+    same = [r.label for r in seq_result] == [r.label for r in batch_result]
+    print(f"最匹配: {batch_result[0].label} ({batch_result[0].score:.3f}) @ {batch_result[0].box}，"
+          f"期望 {expected}，排序一致: {same}")
+    return 0 if same and batch_result[0].label == expected else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())